@@ -1,9 +1,10 @@
+import re
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
-from app.common.config import Config
+from app.common.config import get_config
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -25,6 +26,15 @@ from app.common.db import Base  # noqa
 
 target_metadata = Base.metadata
 
+# Partitions are created along with their tables, see app.common.db, and the
+# unpartitioned url_mappings is kept after the swap until dropped by hand
+IGNORED_TABLES = re.compile(r".+_p\d+|url_mappings_unpartitioned")
+
+
+def include_name(name, type_, parent_names) -> bool:
+    return type_ != "table" or not IGNORED_TABLES.fullmatch(name)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -43,12 +53,14 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    app_config = Config()
+    app_config = get_config()
     context.configure(
         url=str(app_config.DATABASE_URI),
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -62,7 +74,7 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    app_config = Config()
+    app_config = get_config()
     configuration = config.get_section(config.config_ini_section)
     assert configuration
     configuration["sqlalchemy.url"] = str(app_config.DATABASE_URI)
@@ -73,7 +85,14 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # Each revision commits on its own, so that a failing one, e.g. the
+            # partition swap before the backfill, keeps the ones before it
+            transaction_per_migration=True,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
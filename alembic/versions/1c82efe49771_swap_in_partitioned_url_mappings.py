@@ -0,0 +1,144 @@
+"""Swap in partitioned url_mappings
+
+Renames the tables filled since revision 7243f446da48 into place. Refuses to
+run until python -m tools.backfill_url_partitions has copied the rows that
+predate it, rather than copying them while url_mappings is locked. The old
+table is kept as url_mappings_unpartitioned, to be dropped by hand.
+
+Revision ID: 1c82efe49771
+Revises: 7243f446da48
+Create Date: 2026-10-18 09:15:39.891989
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "1c82efe49771"
+down_revision: Union[str, None] = "7243f446da48"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.models.urls.URL_PARTITIONS
+PARTITIONS = 16
+
+MIRROR_FUNCTION = """
+CREATE FUNCTION url_mappings_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD IS NOT DISTINCT FROM NEW THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM url_mappings_partitioned WHERE short_code = OLD.short_code;
+        DELETE FROM url_lookups
+        WHERE url_hash = OLD.url_hash AND short_code = OLD.short_code;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO url_mappings_partitioned (id, original_url, url_hash, short_code)
+        VALUES (NEW.id, NEW.original_url, NEW.url_hash, NEW.short_code)
+        ON CONFLICT DO NOTHING;
+        INSERT INTO url_lookups (url_hash, short_code)
+        VALUES (NEW.url_hash, NEW.short_code)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def check_backfilled() -> None:
+    last_id, until_id = (
+        op.get_bind()
+        .execute(sa.text("SELECT last_id, until_id FROM url_mappings_backfill"))
+        .one()
+    )
+    if last_id < until_id:
+        raise RuntimeError(
+            f"url_mappings is backfilled up to id {last_id} of {until_id}, run "
+            "python -m tools.backfill_url_partitions, then alembic upgrade head"
+        )
+
+
+def rename_partition(old: str, new: str, remainder: int) -> None:
+    op.execute(f"ALTER TABLE {old}_p{remainder} RENAME TO {new}_p{remainder}")
+    op.execute(f"ALTER INDEX {old}_p{remainder}_pkey RENAME TO {new}_p{remainder}_pkey")
+    op.execute(
+        f"ALTER INDEX {old}_p{remainder}_id_idx RENAME TO {new}_p{remainder}_id_idx"
+    )
+
+
+def upgrade() -> None:
+    # Backfill progress only moves forward, so checked before taking the locks
+    check_backfilled()
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute(
+        "LOCK TABLE url_mappings, url_mappings_partitioned, url_lookups "
+        "IN ACCESS EXCLUSIVE MODE"
+    )
+
+    op.execute("DROP TRIGGER url_mappings_mirror ON url_mappings")
+    op.execute("DROP FUNCTION url_mappings_mirror()")
+    op.drop_table("url_mappings_backfill")
+
+    # The old table's other constraints and indexes don't clash with the new
+    op.execute("ALTER TABLE url_mappings RENAME TO url_mappings_unpartitioned")
+    op.execute(
+        "ALTER INDEX url_mappings_pkey RENAME TO url_mappings_unpartitioned_pkey"
+    )
+    op.execute("ALTER TABLE url_mappings_partitioned RENAME TO url_mappings")
+    op.execute("ALTER INDEX url_mappings_partitioned_pkey RENAME TO url_mappings_pkey")
+    op.execute(
+        "ALTER INDEX ix_url_mappings_partitioned_id RENAME TO ix_url_mappings_id"
+    )
+    for remainder in range(PARTITIONS):
+        rename_partition("url_mappings_partitioned", "url_mappings", remainder)
+    op.execute("ALTER SEQUENCE url_mappings_id_seq OWNED BY url_mappings.id")
+
+
+def downgrade() -> None:
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute(
+        "LOCK TABLE url_mappings, url_mappings_unpartitioned, url_lookups "
+        "IN ACCESS EXCLUSIVE MODE"
+    )
+    # Rows created since the swap, others are in the old table already
+    op.execute(
+        "INSERT INTO url_mappings_unpartitioned "
+        "(id, original_url, url_hash, short_code) "
+        "SELECT id, original_url, url_hash, short_code FROM url_mappings "
+        "WHERE id > (SELECT coalesce(max(id), 0) FROM url_mappings_unpartitioned) "
+        "ORDER BY id ON CONFLICT DO NOTHING"
+    )
+
+    for remainder in range(PARTITIONS):
+        rename_partition("url_mappings", "url_mappings_partitioned", remainder)
+    op.execute(
+        "ALTER INDEX ix_url_mappings_id RENAME TO ix_url_mappings_partitioned_id"
+    )
+    op.execute("ALTER INDEX url_mappings_pkey RENAME TO url_mappings_partitioned_pkey")
+    op.execute("ALTER TABLE url_mappings RENAME TO url_mappings_partitioned")
+    op.execute(
+        "ALTER INDEX url_mappings_unpartitioned_pkey RENAME TO url_mappings_pkey"
+    )
+    op.execute("ALTER TABLE url_mappings_unpartitioned RENAME TO url_mappings")
+    op.execute("ALTER SEQUENCE url_mappings_id_seq OWNED BY url_mappings.id")
+
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER url_mappings_mirror "
+        "AFTER INSERT OR UPDATE OR DELETE ON url_mappings "
+        "FOR EACH ROW EXECUTE FUNCTION url_mappings_mirror()"
+    )
+    op.execute(
+        "CREATE TABLE url_mappings_backfill "
+        "(last_id bigint NOT NULL, until_id bigint NOT NULL)"
+    )
+    op.execute(
+        "INSERT INTO url_mappings_backfill (last_id, until_id) "
+        "SELECT coalesce(max(id), 0), coalesce(max(id), 0) FROM url_mappings"
+    )
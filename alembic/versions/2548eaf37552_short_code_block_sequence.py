@@ -0,0 +1,28 @@
+"""Short code block sequence
+
+Revision ID: 2548eaf37552
+Revises: 18d6ce65adc4
+Create Date: 2026-10-18 08:20:37.752510
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateSequence, DropSequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2548eaf37552"
+down_revision: Union[str, None] = "18d6ce65adc4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(CreateSequence(sa.Sequence("short_code_block_seq")))
+
+
+def downgrade() -> None:
+    op.execute(DropSequence(sa.Sequence("short_code_block_seq")))
@@ -0,0 +1,57 @@
+"""URL mapping expiry
+
+The index is built on each partition concurrently and then attached, so
+url_mappings is only locked briefly to add the column.
+
+Revision ID: 6a3225cbdb87
+Revises: 1c82efe49771
+Create Date: 2026-10-18 10:02:11.482913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6a3225cbdb87"
+down_revision: Union[str, None] = "1c82efe49771"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.models.urls.URL_PARTITIONS
+PARTITIONS = 16
+
+
+def upgrade() -> None:
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.add_column(
+        "url_mappings",
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        "CREATE INDEX ix_url_mappings_expires_at ON ONLY url_mappings (expires_at) "
+        "WHERE expires_at IS NOT NULL"
+    )
+
+    with op.get_context().autocommit_block():
+        for remainder in range(PARTITIONS):
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                f"url_mappings_p{remainder}_expires_at_idx "
+                f"ON url_mappings_p{remainder} (expires_at) "
+                "WHERE expires_at IS NOT NULL"
+            )
+
+    for remainder in range(PARTITIONS):
+        op.execute(
+            "ALTER INDEX ix_url_mappings_expires_at "
+            f"ATTACH PARTITION url_mappings_p{remainder}_expires_at_idx"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_url_mappings_expires_at", table_name="url_mappings")
+    op.drop_column("url_mappings", "expires_at")
@@ -0,0 +1,120 @@
+"""Hash partitioned url_mappings and url_lookups
+
+Creates the partitioned tables next to url_mappings, without locking it for
+longer than it takes to add a trigger. The trigger mirrors every write to
+url_mappings into them from then on, rows written before are copied by
+python -m tools.backfill_url_partitions. Revision 1c82efe49771 then swaps
+them in.
+
+Revision ID: 7243f446da48
+Revises: 4287760750e1
+Create Date: 2026-10-18 09:15:39.891989
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7243f446da48"
+down_revision: Union[str, None] = "4287760750e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.models.urls.URL_PARTITIONS
+PARTITIONS = 16
+
+MIRROR_FUNCTION = """
+CREATE FUNCTION url_mappings_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD IS NOT DISTINCT FROM NEW THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM url_mappings_partitioned WHERE short_code = OLD.short_code;
+        DELETE FROM url_lookups
+        WHERE url_hash = OLD.url_hash AND short_code = OLD.short_code;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO url_mappings_partitioned (id, original_url, url_hash, short_code)
+        VALUES (NEW.id, NEW.original_url, NEW.url_hash, NEW.short_code)
+        ON CONFLICT DO NOTHING;
+        INSERT INTO url_lookups (url_hash, short_code)
+        VALUES (NEW.url_hash, NEW.short_code)
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def create_partitions(table: str, modulus: int) -> None:
+    for remainder in range(modulus):
+        op.execute(
+            f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+        )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "url_mappings_partitioned",
+        sa.Column(
+            "id",
+            sa.BigInteger(),
+            server_default=sa.text("nextval('url_mappings_id_seq')"),
+            nullable=False,
+        ),
+        sa.Column("original_url", sa.String(), nullable=False),
+        sa.Column("url_hash", sa.LargeBinary(), nullable=False),
+        sa.Column("short_code", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("short_code"),
+        postgresql_partition_by="HASH (short_code)",
+    )
+    create_partitions("url_mappings_partitioned", PARTITIONS)
+    op.create_index(
+        "ix_url_mappings_partitioned_id", "url_mappings_partitioned", ["id"]
+    )
+
+    op.create_table(
+        "url_lookups",
+        sa.Column("url_hash", sa.LargeBinary(), nullable=False),
+        sa.Column("short_code", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("url_hash"),
+        postgresql_partition_by="HASH (url_hash)",
+    )
+    create_partitions("url_lookups", PARTITIONS)
+
+    # Backfill progress: rows up to until_id predate the trigger
+    op.create_table(
+        "url_mappings_backfill",
+        sa.Column("last_id", sa.BigInteger(), nullable=False),
+        sa.Column("until_id", sa.BigInteger(), nullable=False),
+    )
+
+    # Don't queue up writes behind a long running transaction on the table
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute(MIRROR_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER url_mappings_mirror "
+        "AFTER INSERT OR UPDATE OR DELETE ON url_mappings "
+        "FOR EACH ROW EXECUTE FUNCTION url_mappings_mirror()"
+    )
+    # Creating the trigger waited for in-flight writes, which are all
+    # committed below this id
+    op.execute(
+        "INSERT INTO url_mappings_backfill (last_id, until_id) "
+        "SELECT 0, coalesce(max(id), 0) FROM url_mappings"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER url_mappings_mirror ON url_mappings")
+    op.execute("DROP FUNCTION url_mappings_mirror()")
+    op.drop_table("url_mappings_backfill")
+    op.drop_table("url_lookups")
+    op.drop_table("url_mappings_partitioned")
@@ -0,0 +1,258 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from enum import IntEnum
+from typing import Mapping
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.common.config import Config, config
+from app.common.metrics import registry, request_timings
+
+
+class Priority(IntEnum):
+    # Lower values are admitted first
+    HIGH = 0
+    LOW = 1
+
+
+class AIMDLimit:
+    """
+    Concurrency limit adjusted additively up and multiplicatively down.
+
+    Each completed request reports its DB latency. Above `target` the limit
+    is multiplied by `backoff`, at most once per round of requests, i.e.
+    only for requests started after the last decrease. Below it, the limit
+    grows by about one per `limit` requests, as long as at least half of it
+    is in use.
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        min_limit: float,
+        max_limit: float,
+        target: float,
+        backoff: float = 0.9,
+    ):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target = target
+        self.backoff = backoff
+        self._last_decrease = 0.0
+
+    def __int__(self) -> int:
+        return max(int(self.value), 1)
+
+    def observe(self, latency: float, started: float, in_flight: int) -> None:
+        if latency > self.target:
+            if started > self._last_decrease:
+                self.decrease()
+        elif in_flight * 2 >= self.value:
+            self.value = min(self.value + 1 / self.value, self.max_limit)
+
+    def decrease(self) -> None:
+        self.value = max(self.value * self.backoff, self.min_limit)
+        self._last_decrease = time.perf_counter()
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+
+
+class AdmissionController:
+    """
+    Limits concurrent requests to `limit`. Requests over the limit queue,
+    higher priorities first, up to `queue_sizes[priority]` waiting ones and
+    for up to `queue_timeout` seconds, after which they are shed.
+    """
+
+    def __init__(
+        self,
+        limit: AIMDLimit,
+        queue_sizes: Mapping[Priority, int],
+        queue_timeout: float,
+        enabled: bool = True,
+    ):
+        self.limit = limit
+        self.queue_sizes = queue_sizes
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+        self.in_flight = 0
+        self.stats = AdmissionStats()
+        self._queues: dict[Priority, deque[asyncio.Future[None]]] = {
+            priority: deque() for priority in sorted(Priority)
+        }
+
+    def queued(self, priority: Priority) -> int:
+        return len(self._queues[priority])
+
+    async def acquire(self, priority: Priority) -> bool:
+        """
+        Waits for a slot and returns True, or False when the request is shed
+        """
+        if self.in_flight < int(self.limit) and not any(self._queues.values()):
+            self.in_flight += 1
+            self.stats.admitted += 1
+            return True
+
+        queue = self._queues[priority]
+        if len(queue) >= self.queue_sizes[priority]:
+            self.stats.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except TimeoutError:
+            self._abandon(queue, waiter)
+            self.stats.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            self._abandon(queue, waiter)
+            raise
+
+        self.stats.admitted += 1
+        return True
+
+    def release(self, started: float, latency: float | None = None) -> None:
+        """
+        Frees the slot of a request started at `started`, and adjusts the
+        limit by its DB latency unless it has none, e.g. a cache hit
+        """
+        if latency is not None:
+            self.limit.observe(latency, started, self.in_flight)
+        self._release_slot()
+
+    def _abandon(
+        self, queue: deque[asyncio.Future[None]], waiter: asyncio.Future[None]
+    ) -> None:
+        if waiter in queue:
+            queue.remove(waiter)
+        # Handed a slot just as the wait was given up
+        elif not waiter.cancelled():
+            self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        for queue in self._queues.values():
+            while queue and self.in_flight < int(self.limit):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self.in_flight += 1
+                    waiter.set_result(None)
+
+
+class AdmissionMiddleware:
+    """
+    Admits requests to the routes named in `priorities` through the
+    controller. Shed requests get a 503 with a Retry-After header. Must run
+    inside MetricsMiddleware, whose timings provide the DB latency.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        router: Router,
+        priorities: Mapping[str, Priority],
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.controller = controller
+        self.router = router
+        self.priorities = priorities
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        priority = self.priority(scope)
+        if priority is None or not self.controller.enabled:
+            return await self.app(scope, receive, send)
+
+        if not await self.controller.acquire(priority):
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry later."},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            return await response(scope, receive, send)
+
+        started = time.perf_counter()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = self.db_latency()
+        except Exception:
+            # Failures, e.g. pool timeouts, count as overload
+            latency = float("inf")
+            raise
+        finally:
+            self.controller.release(started, latency)
+
+    def priority(self, scope: Scope) -> Priority | None:
+        if scope["type"] != "http":
+            return None
+
+        # The same matching the router does next, to learn the route's name
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return self.priorities.get(getattr(route, "name", ""))
+        return None
+
+    @staticmethod
+    def db_latency() -> float | None:
+        """
+        Pool wait plus mean query time of the request, None without queries
+        """
+        timings = request_timings.get()
+        if timings is None or not timings.queries:
+            return None
+        return timings.pool_wait + timings.db_time / timings.queries
+
+
+def create_admission_controller(config: Config) -> AdmissionController:
+    return AdmissionController(
+        AIMDLimit(
+            initial=config.ADMISSION_INITIAL_LIMIT,
+            min_limit=config.ADMISSION_MIN_LIMIT,
+            max_limit=config.ADMISSION_MAX_LIMIT,
+            target=config.ADMISSION_TARGET_LATENCY,
+            backoff=config.ADMISSION_BACKOFF,
+        ),
+        queue_sizes={
+            Priority.HIGH: config.ADMISSION_QUEUE_SIZE,
+            Priority.LOW: config.ADMISSION_LOW_PRIORITY_QUEUE_SIZE,
+        },
+        queue_timeout=config.ADMISSION_QUEUE_TIMEOUT,
+        enabled=config.ADMISSION_CONTROL,
+    )
+
+
+admission_controller = create_admission_controller(config)
+registry.gauges(
+    "admission",
+    "Admission control of DB bound requests",
+    lambda: {
+        "limit": admission_controller.limit.value,
+        "in_flight": admission_controller.in_flight,
+        **{
+            f"queued_{priority.name.lower()}": admission_controller.queued(priority)
+            for priority in Priority
+        },
+    },
+)
+registry.counters(
+    "admission",
+    "Requests admitted, rejected for full queues and timed out in them",
+    lambda: asdict(admission_controller.stats),
+)
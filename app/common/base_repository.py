@@ -1,12 +1,28 @@
-from typing import Generic, Optional, Sequence, Type, TypeVar
+import copy
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Optional,
+    Self,
+    Sequence,
+    Type,
+    TypeVar,
+)
 
 from fastapi import Depends
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import Executable, Row, Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.common.db import Base, get_async_session
+from app.common.db import Base, SessionFactory, get_request_session
+from app.common.replicas import REPLICA_ERRORS, ReplicaSet, get_replica_set
 
 ModelType = TypeVar("ModelType", bound=Base)
+T = TypeVar("T")
 
 
 class AsyncBaseRepository(Generic[ModelType]):
@@ -14,31 +30,126 @@ class AsyncBaseRepository(Generic[ModelType]):
     def __init__(
         self,
         model: Type[ModelType],
-        session: async_sessionmaker[AsyncSession] = Depends(get_async_session),
+        session: SessionFactory = Depends(get_request_session),
+        replicas: ReplicaSet = Depends(get_replica_set),
     ):
         self.model = model
         self._async_session = session
+        self._replicas = replicas
+
+    def with_session(self, session: SessionFactory) -> Self:
+        """
+        The same repository on another session source, e.g. for work shared
+        between requests, which must not depend on one request's session
+        """
+        repository = copy.copy(self)
+        repository._async_session = session
+        return repository
 
     async def get(self, obj_id: int) -> Optional[ModelType]:
-        async with self._async_session() as session:
-            stmt = select(self.model).where(self.model.id == obj_id)
-            result = await session.execute(stmt)
-            return result.scalars().first()
+        stmt = select(self.model).where(self.model.id == obj_id)
+        return await self._read_scalar(stmt, [self._id_key(obj_id)])
 
     async def get_all(self, page: int, limit: int) -> Sequence[ModelType]:
-        async with self._async_session() as session:
-            stmt = select(self.model).limit(limit).offset((page - 1) * limit)
-            result = await session.execute(stmt)
-            return result.scalars().all()
+        stmt = (
+            select(self.model)
+            .order_by(self.model.id)
+            .limit(limit)
+            .offset((page - 1) * limit)
+        )
+        return await self._read_scalars(stmt)
+
+    async def get_page(
+        self, limit: int, after_id: int | None = None
+    ) -> Sequence[ModelType]:
+        """
+        Keyset pagination: up to `limit` rows ordered by id, starting after
+        `after_id`. Unlike get_all, deep pages cost the same as the first.
+        """
+        stmt = select(self.model).order_by(self.model.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(self.model.id > after_id)
+        return await self._read_scalars(stmt)
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[ModelType]:
+        """
+        Yields every row ordered by id from a server-side cursor, holding at
+        most `batch_size` rows in memory. Runs on a replica when available,
+        without failover once started.
+        """
+        stmt = select(self.model).order_by(self.model.id)
+        async for (obj,) in self._stream(stmt, batch_size):
+            yield obj
 
     async def add(self, obj: ModelType) -> ModelType:
         async with self._async_session() as session:
             session.add(obj)
             await session.commit()
             await session.refresh(obj)
+        self._replicas.stick([self._id_key(obj.id)])
         return obj
 
     async def delete(self, obj: ModelType) -> None:
         async with self._async_session.begin() as session:
             await session.delete(obj)
+        self._replicas.stick([self._id_key(obj.id)])
         return None
+
+    async def _stream(
+        self, stmt: Select[Any], batch_size: int
+    ) -> AsyncIterator[Row[Any]]:
+        """
+        Yields the rows of a read-only query from a server-side cursor, on a
+        replica when available, without failover once started
+        """
+        replica = self._replicas.pick()
+        sessionmaker = replica.sessionmaker if replica else self._async_session
+
+        async with sessionmaker() as session:
+            stmt = stmt.execution_options(yield_per=batch_size)
+            async for row in await session.stream(stmt):
+                yield row
+
+    async def _read(
+        self,
+        query: Callable[[AsyncSession], Awaitable[T]],
+        keys: Iterable[Hashable] = (),
+    ) -> T:
+        """
+        Runs a read-only query on a replica, or on the primary when no replica
+        is healthy, one fails, or any of the keys was written recently.
+        """
+        replica = self._replicas.pick(keys)
+        if replica is not None:
+            try:
+                async with replica.sessionmaker() as session:
+                    return await query(session)
+            except REPLICA_ERRORS:
+                self._replicas.mark_down(replica)
+
+        async with self._async_session() as session:
+            return await query(session)
+
+    async def _read_scalar(
+        self, stmt: Executable, keys: Iterable[Hashable] = ()
+    ) -> Any:
+        return await self._read(lambda session: session.scalar(stmt), keys)
+
+    async def _read_first(
+        self, stmt: Executable, keys: Iterable[Hashable] = ()
+    ) -> Row[Any] | None:
+        async def query(session: AsyncSession) -> Row[Any] | None:
+            return (await session.execute(stmt)).first()
+
+        return await self._read(query, keys)
+
+    async def _read_scalars(
+        self, stmt: Executable, keys: Iterable[Hashable] = ()
+    ) -> Sequence[Any]:
+        async def query(session: AsyncSession) -> Sequence[Any]:
+            return (await session.scalars(stmt)).all()
+
+        return await self._read(query, keys)
+
+    def _id_key(self, obj_id: int) -> Hashable:
+        return (self.model.__tablename__, obj_id)
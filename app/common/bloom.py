@@ -0,0 +1,86 @@
+import hashlib
+import math
+import struct
+import zlib
+
+# Magic, capacity, error rate, count and the CRC32 of the bits
+_HEADER = struct.Struct("<4sQdQI")
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    """
+    Set membership with false positives but no false negatives.
+
+    Sized for `capacity` keys at a false positive rate of `error_rate`. Each
+    key is hashed once with BLAKE2b and its bit positions are derived from
+    that digest by double hashing. Keys can't be removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / max(capacity, 1) * math.log(2)))
+        # Keys that set at least one bit, an estimate of the distinct keys
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self._bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._positions(key))
+
+    def add(self, key: bytes) -> None:
+        added = False
+        bits = self._bits
+        for i in self._positions(key):
+            mask = 1 << (i & 7)
+            if not bits[i >> 3] & mask:
+                bits[i >> 3] |= mask
+                added = True
+        self.count += added
+
+    @property
+    def false_positive_rate(self) -> float:
+        """
+        Expected false positive rate at the current count
+        """
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def to_bytes(self) -> bytes:
+        bits = bytes(self._bits)
+        header = _HEADER.pack(
+            _MAGIC, self.capacity, self.error_rate, self.count, zlib.crc32(bits)
+        )
+        return header + bits
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> "BloomFilter":
+        """
+        Raises ValueError if the data is not a complete, intact filter
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Truncated Bloom filter")
+        magic, capacity, error_rate, count, crc = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a Bloom filter")
+
+        bloom = cls(capacity, error_rate)
+        bits = data[_HEADER.size :]
+        if len(bits) != len(bloom._bits) or zlib.crc32(bits) != crc:
+            raise ValueError("Corrupt Bloom filter")
+        bloom._bits[:] = bits
+        bloom.count = count
+        return bloom
+
+    def _positions(self, key: bytes) -> list[int]:
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(key, digest_size=16).digest())
+        # Odd, so the positions don't collapse onto a few when size is even
+        h2 |= 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
@@ -0,0 +1,155 @@
+from abc import ABC, abstractmethod
+from typing import Any, Mapping, Sequence, cast
+
+from app.common.cache import MISSING, TTLCache
+from app.common.config import Config
+
+
+class CacheBackend(ABC):
+    """
+    Shared cache tier, e.g. Redis, reachable by all workers.
+
+    Keys and values are plain strings, serialization is up to the caller.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, str]:
+        values = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    async def set_many(self, items: Mapping[str, str], ttl: float) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    def reset_after_fork(self) -> None:
+        """
+        Drops connections inherited from the parent process, without closing
+        them for the parent
+        """
+        return None
+
+
+class NullCacheBackend(CacheBackend):
+    """
+    No shared tier - every lookup is a miss
+    """
+
+    async def get(self, key: str) -> str | None:
+        return None
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        return None
+
+    async def delete(self, key: str) -> None:
+        return None
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, str]:
+        return {}
+
+    async def set_many(self, items: Mapping[str, str], ttl: float) -> None:
+        return None
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Process local stand-in for a shared backend, used in tests and single
+    worker deployments.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self._cache: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=0)
+
+    async def get(self, key: str) -> str | None:
+        value = self._cache.get(key)
+        return None if value is MISSING else value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache backend speaking the Redis protocol (Redis, Valkey, KeyDB, ...)
+    """
+
+    def __init__(self, client: Any, key_prefix: str = ""):
+        self._redis = client
+        self._prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url: str, key_prefix: str = "") -> "RedisCacheBackend":
+        from redis import asyncio as aioredis
+
+        return cls(aioredis.from_url(url, decode_responses=True), key_prefix)
+
+    async def get(self, key: str) -> str | None:
+        return cast(str | None, await self._redis.get(self._prefix + key))
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._redis.set(self._prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self._prefix + key)
+
+    async def get_many(self, keys: Sequence[str]) -> dict[str, str]:
+        if not keys:
+            return {}
+
+        values = await self._redis.mget([self._prefix + key for key in keys])
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    async def set_many(self, items: Mapping[str, str], ttl: float) -> None:
+        if not items:
+            return None
+
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(self._prefix + key, value, px=max(int(ttl * 1000), 1))
+            await pipe.execute()
+
+    async def ping(self) -> bool:
+        return bool(await self._redis.ping())
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+    def reset_after_fork(self) -> None:
+        self._redis.connection_pool.reset()
+
+
+def create_cache_backend(config: Config) -> CacheBackend:
+    match config.CACHE_BACKEND:
+        case "redis":
+            if config.REDIS_URI is None:
+                raise ValueError("REDIS_URI is required for the redis cache backend")
+            return RedisCacheBackend.from_url(
+                str(config.REDIS_URI), key_prefix=config.CACHE_KEY_PREFIX
+            )
+        case "memory":
+            return InMemoryCacheBackend(maxsize=config.URL_CACHE_MAXSIZE)
+        case _:
+            return NullCacheBackend()
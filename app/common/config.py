@@ -1,6 +1,8 @@
 import os
+from functools import lru_cache
+from typing import Literal
 
-from pydantic import AnyHttpUrl, PostgresDsn, ValidationError
+from pydantic import AnyHttpUrl, PostgresDsn, RedisDsn, ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,21 +14,172 @@ class Config(BaseSettings):
     API_PREFIX: str = "api/v1"
 
     SHORT_CODE_LENGTH: int = 8
+    SHORT_CODE_GENERATOR: Literal["random", "block"] = "random"
+    SHORT_CODE_BLOCK_SIZE: int = 1000
+    # Secret scrambling "block" codes, so they cannot be enumerated. Codes
+    # created under another key may collide, so it must never change.
+    SHORT_CODE_KEY: str | None = None
+    SHORT_CODE_MAX_ATTEMPTS: int = 5
+
+    # REDIRECTS
+    # "json" answers GET /{short_code} with {"original_url": ...}, "redirect"
+    # with a REDIRECT_STATUS_CODE response. Overridable per request.
+    REDIRECT_MODE: Literal["json", "redirect"] = "json"
+    REDIRECT_STATUS_CODE: Literal[301, 302, 307, 308] = 302
+    # Cache-Control of redirects only. JSON answers get RESOLVE_CACHE_CONTROL,
+    # as shared caches should not keep API responses past a delete.
+    REDIRECT_CACHE_CONTROL: str = "public, max-age=3600"
+    RESOLVE_CACHE_CONTROL: str = "private, no-cache"
+
+    # BULK OPERATIONS
+    BULK_MAX_ITEMS: int = 100_000
+    BULK_CHUNK_SIZE: int = 1000
+    BULK_RESOLVE_MAX_ITEMS: int = 1000
+
+    # LISTING
+    PAGE_DEFAULT_LIMIT: int = 100
+    PAGE_MAX_LIMIT: int = 1000
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # CLICK TRACKING
+    CLICK_TRACKING: bool = True
+    CLICK_QUEUE_MAXSIZE: int = 100_000
+    CLICK_FLUSH_INTERVAL: float = 1.0
+    CLICK_FLUSH_BATCH_SIZE: int = 1000
+    # What happens to clicks while the queue is full: "drop" them, or "spill"
+    # them into an aggregate bounded to CLICK_SPILL_MAXSIZE short codes
+    CLICK_OVERFLOW_POLICY: Literal["drop", "spill"] = "spill"
+    CLICK_SPILL_MAXSIZE: int = 100_000
+
+    # CACHE
+    URL_CACHE_MAXSIZE: int = 100_000
+    URL_CACHE_TTL: float = 3600.0
+    URL_CACHE_NEGATIVE_TTL: float = 5.0
+    CACHE_BACKEND: Literal["none", "memory", "redis"] = "none"
+    CACHE_KEY_PREFIX: str = "url:"
+    REDIS_URI: RedisDsn | None = None
+
+    # CACHE WARM-UP
+    # Short codes preloaded into the in-process cache at startup, the most
+    # "clicks" or most "recent" ones. /healthcheck reports "warming" meanwhile.
+    CACHE_WARMUP: Literal["none", "clicks", "recent"] = "clicks"
+    CACHE_WARMUP_LIMIT: int = 10_000
+    # Approximate bytes of cached entries to stop at
+    CACHE_WARMUP_MEMORY_BUDGET: int = 16 * 1024 * 1024
+    CACHE_WARMUP_BATCH_SIZE: int = 1000
+
+    # URL FILTER
+    # Bloom filter answering lookups of unknown short codes and URLs without
+    # querying the database. Codes created by other workers are only known to
+    # it after its next sync, or through the shared CACHE_BACKEND.
+    URL_FILTER: bool = False
+    # URL mappings the filter is sized for, at the given false positive rate
+    URL_FILTER_CAPACITY: int = 1_000_000
+    URL_FILTER_ERROR_RATE: float = 0.01
+    URL_FILTER_SYNC_INTERVAL: float = 5.0
+    # Seconds syncs keep reading rows again for, longer than inserts take to
+    # commit and replicas to catch up with them
+    URL_FILTER_SYNC_OVERLAP: float = 60.0
+    URL_FILTER_BATCH_SIZE: int = 1000
+    # Saved every URL_FILTER_SNAPSHOT_INTERVAL seconds and on shutdown, to
+    # start from on restart instead of scanning the whole table
+    URL_FILTER_SNAPSHOT_PATH: str | None = None
+    URL_FILTER_SNAPSHOT_INTERVAL: float = 300.0
+
+    # URL EXPIRY
+    # Expired URL mappings stop resolving right away and are deleted in the
+    # background, URL_PURGE_BATCH_SIZE rows per transaction and at most
+    # URL_PURGE_MAX_RATE rows per second per worker. Once none are left, the
+    # next check is URL_PURGE_INTERVAL seconds later.
+    URL_PURGE: bool = True
+    URL_PURGE_INTERVAL: float = 60.0
+    URL_PURGE_BATCH_SIZE: int = 500
+    URL_PURGE_MAX_RATE: float = 1000.0
 
     # DATABASE
     DATABASE_URI: PostgresDsn
     ASYNC_DB_DRIVER: str = "postgresql+asyncpg"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds after which connections are replaced, -1 keeps them forever
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = True
+    # Prepared statements cached per connection, 0 behind transaction pooling
+    # proxies such as PgBouncer
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # "asyncpg" serves short code and URL lookups with prepared statements on
+    # the pooled asyncpg connection instead of the ORM
+    URL_REPOSITORY: Literal["orm", "asyncpg"] = "orm"
+
+    # Read replicas for lookups, as a JSON list of DSNs
+    DATABASE_REPLICA_URIS: list[PostgresDsn] = []
+    # Reads of recently written rows go to the primary for this long
+    REPLICA_STICKY_SECONDS: float = 5.0
+    REPLICA_STICKY_MAXSIZE: int = 100_000
+    REPLICA_HEALTH_CHECK_INTERVAL: float = 5.0
 
     @property
     def ASYNC_DATABASE_URI(self):
-        path = self.DATABASE_URI.path
+        return self.async_uri(self.DATABASE_URI)
+
+    @property
+    def ASYNC_REPLICA_URIS(self):
+        return [self.async_uri(uri) for uri in self.DATABASE_REPLICA_URIS]
+
+    def async_uri(self, uri: PostgresDsn):
+        path = uri.path
         if path is None:
             raise ValidationError("Improper DATABASE_URI configuration, missing path")
         path = path.lstrip("/")
 
-        return self.DATABASE_URI.build(
-            scheme=self.ASYNC_DB_DRIVER, path=path, **self.DATABASE_URI.hosts()[0]
-        )
+        return uri.build(scheme=self.ASYNC_DB_DRIVER, path=path, **uri.hosts()[0])
+
+    # SERIALIZATION
+    # Encoder of JSON responses, falls back to "stdlib" when not installed.
+    # msgspec is an optional extra: poetry install -E msgspec
+    JSON_ENCODER: Literal["orjson", "msgspec", "stdlib"] = "orjson"
+
+    # HEALTH CHECKS
+    # /readyz and /healthcheck answer from checks run in the background
+    HEALTH_CHECK_INTERVAL: float = 2.0
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    # Share of the pool's DB_POOL_SIZE + DB_MAX_OVERFLOW connections in use
+    # at which the worker reports not ready
+    HEALTH_POOL_SATURATION: float = 1.0
+
+    # ADMISSION CONTROL
+    # Concurrency limit of each worker's redirects and creates, lowered while
+    # their pool wait plus mean query time exceeds ADMISSION_TARGET_LATENCY
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_INITIAL_LIMIT: int = 20
+    ADMISSION_MIN_LIMIT: int = 2
+    ADMISSION_MAX_LIMIT: int = 200
+    ADMISSION_TARGET_LATENCY: float = 0.1
+    ADMISSION_BACKOFF: float = 0.9
+    # Requests over the limit waiting for a slot, beyond which they get a 503.
+    # Redirects have ADMISSION_QUEUE_SIZE places, creates the low priority ones.
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_LOW_PRIORITY_QUEUE_SIZE: int = 10
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_RETRY_AFTER: int = 1
+
+    # SERVER
+    # Production server settings, read by docker/gunicorn.conf.py. Each worker
+    # has its own DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+    # Number of worker processes, 0 for one per CPU the container may use
+    WEB_CONCURRENCY: int = 0
+    SERVER_BIND: str = "0.0.0.0:8000"
+    # SO_REUSEPORT, so a new server can bind the port while the old one drains
+    SERVER_REUSE_PORT: bool = False
+    # Seconds stopped workers get to finish in-flight requests
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # Requests after which a worker is replaced, 0 for never
+    SERVER_MAX_REQUESTS: int = 0
+
+    # MONITORING
+    # Report per request DB and total timings in a Server-Timing header
+    SERVER_TIMING: bool = False
 
     # LOGGING
     LOGGING_CONF_FILE: str = "logging.conf"
@@ -37,4 +190,12 @@ class Config(BaseSettings):
     )
 
 
-config = Config()
+@lru_cache
+def get_config() -> Config:
+    """
+    The settings, read from the environment and env file once per process
+    """
+    return Config()
+
+
+config = get_config()
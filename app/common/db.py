@@ -1,38 +1,274 @@
 import datetime
-from typing import Annotated, Any, Dict, Generator, Iterable
+import os
+import time
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Dict,
+    Generator,
+    Iterable,
+    Protocol,
+)
 
-from sqlalchemy import BigInteger, DateTime, create_engine, inspect, text
+from sqlalchemy import DDL, BigInteger, DateTime, QueuePool, Table, event, inspect, text
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase, mapped_column, sessionmaker
-
-from app.common.config import Config
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, mapped_column
 
-app_config = Config()
+from app.common.config import Config, config
+from app.common.metrics import (
+    db_pool_wait,
+    instrument_engine,
+    registry,
+    request_timings,
+)
 
 # Types shortcuts
 big_int_pk = Annotated[int, mapped_column(primary_key=True)]
 datetime_now = Annotated[datetime.datetime, mapped_column(server_default=text("now()"))]
 jsonb = Annotated[Dict[str, Any], mapped_column()]
 
-# Sync engine
-engine = create_engine(
-    str(app_config.DATABASE_URI), pool_pre_ping=True, pool_size=5, echo=False
-)
-session = sessionmaker(engine, autocommit=False, autoflush=False)
 
+def pool_options(config: Config) -> dict[str, Any]:
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
 
-# Async engine
-async_engine = create_async_engine(
-    str(app_config.ASYNC_DATABASE_URI), pool_pre_ping=True, pool_size=5, echo=False
-)
-async_session = async_sessionmaker(
-    async_engine, expire_on_commit=False, autoflush=False
+
+def create_pooled_async_engine(uri: str, config: Config) -> AsyncEngine:
+    return create_async_engine(
+        uri,
+        echo=False,
+        # asyncpg's own statement cache and SQLAlchemy's prepared statement cache
+        connect_args={
+            "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+        },
+        **pool_options(config),
+    )
+
+
+class SessionFactory(Protocol):
+    """
+    What repositories need from a session source, satisfied by both
+    async_sessionmaker and RequestSession.
+    """
+
+    def __call__(self) -> AbstractAsyncContextManager[AsyncSession]:
+        raise NotImplementedError
+
+    def begin(self) -> AbstractAsyncContextManager[AsyncSession]:
+        raise NotImplementedError
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Connection pool usage. Wait times are measured from asking for a
+    connection until it is usable, so they include pre-ping and connects.
+    """
+
+    engine: AsyncEngine | None = None
+    acquisitions: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquisitions += 1
+        self.wait_time_total += seconds
+        self.wait_time_max = max(self.wait_time_max, seconds)
+        db_pool_wait.observe(seconds)
+
+        timings = request_timings.get()
+        if timings is not None:
+            timings.pool_wait += seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.usage(), "acquisitions": self.acquisitions}
+
+    def usage(self) -> dict[str, Any]:
+        """
+        The snapshot without the acquisitions, which only ever go up
+        """
+        pool = self.engine.pool if self.engine else None
+        if isinstance(pool, QueuePool):
+            # overflow() is negative while the pool itself is not full yet
+            usage = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            }
+        else:
+            usage = {"size": 0, "checked_out": 0, "overflow": 0}
+
+        return {
+            **usage,
+            "wait_time_avg": (
+                self.wait_time_total / self.acquisitions if self.acquisitions else 0.0
+            ),
+            "wait_time_max": self.wait_time_max,
+        }
+
+
+class Database:
+    """
+    Engine and sessionmaker of the primary, created on first use rather than
+    on import. Importing the app therefore opens nothing, and a process can
+    load it before forking workers: children drop the inherited engine and
+    each create their own, as asyncpg connections can't be shared between
+    processes. Usable wherever a SessionFactory is.
+    """
+
+    def __init__(self, config: Config, metrics: PoolMetrics):
+        self.config = config
+        self.metrics = metrics
+        self._engine: AsyncEngine | None = None
+        self._sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = create_pooled_async_engine(
+                str(self.config.ASYNC_DATABASE_URI), self.config
+            )
+            instrument_engine(self._engine)
+            self.metrics.engine = self._engine
+        return self._engine
+
+    @property
+    def sessionmaker(self) -> async_sessionmaker[AsyncSession]:
+        if self._sessionmaker is None:
+            self._sessionmaker = async_sessionmaker(
+                self.engine, expire_on_commit=False, autoflush=False
+            )
+        return self._sessionmaker
+
+    def __call__(self) -> AsyncSession:
+        return self.sessionmaker()
+
+    def begin(self) -> AbstractAsyncContextManager[AsyncSession]:
+        return self.sessionmaker.begin()
+
+    async def dispose(self) -> None:
+        """
+        Closes the pooled connections, a later use creates a new engine
+        """
+        engine = self._engine
+        self._reset()
+        if engine is not None:
+            await engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        """
+        Forgets an engine inherited from the parent process. Its connections
+        are left open, closing them would close the parent's as well.
+        """
+        if self._engine is not None:
+            self._engine.sync_engine.dispose(close=False)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._engine = None
+        self._sessionmaker = None
+        self.metrics.engine = None
+
+
+pool_metrics = PoolMetrics()
+registry.gauges("db_pool", "Connection pool usage", pool_metrics.usage)
+registry.counters(
+    "db_pool",
+    "Connections handed out by the pool",
+    lambda: {"acquisitions": pool_metrics.acquisitions},
 )
 
+database = Database(config, pool_metrics)
+os.register_at_fork(after_in_child=database.reset_after_fork)
+
 
 def get_async_session() -> Generator[async_sessionmaker[AsyncSession], None, None]:
-    yield async_session
+    yield database.sessionmaker
+
+
+class RequestSession:
+    """
+    Session source scoped to one request: every repository call shares a
+    single AsyncSession, and with it a single pooled connection, which is
+    only checked out on first use.
+
+    Reads run in the session's implicit transaction, begin() commits it when
+    the block exits and rolls it back on error. Once closed, calls fall back
+    to a fresh session each, e.g. for responses streamed after the request.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        metrics: PoolMetrics | None = None,
+    ):
+        self._sessionmaker = sessionmaker
+        self._metrics = metrics
+        self._session: AsyncSession | None = None
+        self._closed = False
+
+    def __call__(self) -> AbstractAsyncContextManager[AsyncSession]:
+        if self._closed:
+            return self._sessionmaker()
+        return self._use()
+
+    def begin(self) -> AbstractAsyncContextManager[AsyncSession]:
+        if self._closed:
+            return self._sessionmaker.begin()
+        return self._begin()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def _use(self) -> AsyncIterator[AsyncSession]:
+        yield await self._get()
+
+    @asynccontextmanager
+    async def _begin(self) -> AsyncIterator[AsyncSession]:
+        session = await self._get()
+        try:
+            yield session
+        except BaseException:
+            await session.rollback()
+            raise
+        await session.commit()
+
+    async def _get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._sessionmaker()
+            started = time.perf_counter()
+            await self._session.connection()
+            if self._metrics is not None:
+                self._metrics.record_wait(time.perf_counter() - started)
+        return self._session
+
+
+async def get_request_session() -> AsyncGenerator[RequestSession, None]:
+    request_session = RequestSession(database.sessionmaker, pool_metrics)
+    try:
+        yield request_session
+    finally:
+        await request_session.close()
 
 
 class Base(DeclarativeBase):
@@ -61,3 +297,19 @@ class Base(DeclarativeBase):
             for column in columns
             if column in model_cols and column not in exclude
         }
+
+
+def hash_partitions(table: Table, modulus: int) -> None:
+    """
+    Creates the partitions of a table declared with postgresql_partition_by
+    "HASH (...)" right after the table itself, named <table>_p<remainder>
+    """
+    for remainder in range(modulus):
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TABLE {table.name}_p{remainder} PARTITION OF {table.name} "
+                f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+            ).execute_if(dialect="postgresql"),
+        )
@@ -1,8 +1,10 @@
-from typing import Self
+from typing import Any, Self
 
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from app.common.config import config
+from app.common.serialization import json_encoder
 
 
 class RouterBuilder:
@@ -15,3 +17,15 @@ class RouterBuilder:
 
     def build(self) -> APIRouter:
         return self._router
+
+
+class ModelResponse(JSONResponse):
+    """
+    Renders content, including pydantic models, straight to JSON bytes with
+    the JSON_ENCODER. Returned from a route it skips FastAPI's response_model
+    validation, which would parse every URL in DTOs built with
+    model_construct() again.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_encoder(content)
@@ -1,21 +1,192 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.common.db import get_async_session
+from app.common.config import Config, config
+from app.common.db import (
+    Database,
+    PoolMetrics,
+    database,
+    get_async_session,
+    pool_metrics,
+)
+from app.common.fastapi_utils import ModelResponse
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+# Startup work traffic should wait for, such as cache warm-up
+warming: set[str] = set()
+
+
+class Unhealthy(Exception):
+    pass
+
+
+class HealthMonitor:
+    """
+    Runs the registered checks every `interval` seconds in the background
+    and keeps their results, so probes answer from memory without I/O.
+    A check fails by raising, or by taking longer than `timeout`. Failed
+    non-critical checks, of dependencies the app can do without, only
+    degrade the status.
+    """
+
+    def __init__(self, interval: float = 2.0, timeout: float = 1.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.checks: dict[str, Check] = {}
+        self.critical: set[str] = set()
+        # Check name -> "OK" or the reason it failed
+        self.results: dict[str, str] = {}
+        self.checked_at: float | None = None
+
+    def add_check(self, name: str, check: Check, critical: bool = True) -> None:
+        self.checks[name] = check
+        if critical:
+            self.critical.add(name)
+
+    async def check(self) -> None:
+        names = list(self.checks)
+        outcomes = await asyncio.gather(*(self._run(name) for name in names))
+        results = dict(zip(names, outcomes))
+
+        for name, result in results.items():
+            previous = self.results.get(name, "OK")
+            if result != "OK" and previous == "OK":
+                logger.warning("Health check %s failed: %s", name, result)
+            elif result == "OK" and previous != "OK":
+                logger.info("Health check %s recovered", name)
+
+        self.results = results
+        self.checked_at = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def readiness(self) -> tuple[bool, dict[str, Any]]:
+        """
+        Whether the worker should get traffic, and the probe response body
+        """
+        if self.checked_at is None:
+            return False, {"status": "starting"}
+
+        checks = dict(self.results)
+        failed = {name for name, result in checks.items() if result != "OK"}
+        critical = self.critical | {"monitor"}
+        # The monitor itself stopped, the results can't be trusted any more
+        if time.monotonic() - self.checked_at > 3 * (self.interval + self.timeout):
+            checks["monitor"] = "stale"
+            failed.add("monitor")
+
+        if failed & critical:
+            return False, {"status": "NOK", "checks": checks}
+        if warming:
+            return False, {
+                "status": "warming",
+                "checks": checks,
+                "warming": sorted(warming),
+            }
+        return True, {"status": "degraded" if failed else "OK", "checks": checks}
+
+    async def _run(self, name: str) -> str:
+        try:
+            async with asyncio.timeout(self.timeout):
+                await self.checks[name]()
+        except TimeoutError:
+            return f"timed out after {self.timeout}s"
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return "OK"
+
+
+def database_check(database: Database) -> Check:
+    async def check() -> None:
+        async with database.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    return check
+
+
+def pool_check(metrics: PoolMetrics, capacity: int, saturation: float) -> Check:
+    async def check() -> None:
+        checked_out = metrics.snapshot()["checked_out"]
+        if capacity and checked_out >= capacity * saturation:
+            raise Unhealthy(f"saturated, {checked_out}/{capacity} connections in use")
+
+    return check
+
+
+def create_health_monitor(config: Config) -> HealthMonitor:
+    monitor = HealthMonitor(config.HEALTH_CHECK_INTERVAL, config.HEALTH_CHECK_TIMEOUT)
+    # Before the database check, so its own connection is not counted
+    monitor.add_check(
+        "pool",
+        pool_check(
+            pool_metrics,
+            config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW,
+            config.HEALTH_POOL_SATURATION,
+        ),
+    )
+    monitor.add_check("database", database_check(database))
+    return monitor
+
+
+health_monitor = create_health_monitor(config)
 
 router = APIRouter()
 
 
+@router.get("/livez", tags=["healthcheck"])
+async def livez():
+    """
+    The process is up and its event loop responsive
+    """
+    return {"status": "OK"}
+
+
+@router.get("/readyz", tags=["healthcheck"])
+async def readyz():
+    """
+    Whether to route traffic here, as of the health monitor's last checks
+    """
+    ready, body = health_monitor.readiness()
+    return ModelResponse(body, status_code=200 if ready else 503)
+
+
 @router.get("/healthcheck", tags=["healthcheck"])
 async def healthcheck(
     session: async_sessionmaker[AsyncSession] = Depends(get_async_session),
 ):
+    """
+    The original probe, queried live with its original responses. /readyz
+    reports the health monitor's checks.
+    """
     try:
         async with session() as async_session:
             await async_session.execute(text("SELECT 1"))
-            return {"status": "OK", "database": "connected"}
     except Exception:
         raise HTTPException(
             status_code=500, detail={"status": "NOK", "database": "disconnected"}
         )
+
+    if warming:
+        return ModelResponse(
+            {"status": "warming", "database": "connected", "warming": sorted(warming)},
+            status_code=503,
+        )
+
+    return {"status": "OK", "database": "connected"}
+
+
+@router.get("/healthcheck/pool", tags=["healthcheck"])
+async def healthcheck_pool():
+    return pool_metrics.snapshot()
@@ -0,0 +1,279 @@
+import bisect
+import math
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Literal, Mapping, Sequence
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Labels = tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket plus +Inf, then the sum
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts, total = self._values.setdefault(
+            labels, ([0] * (len(self.buckets) + 1), [0.0])
+        )
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else str(bound)
+                bucket_labels = _labels((*self.labels, "le"), (*labels, le))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            suffix = _labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{suffix} {total[0]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Gauges:
+    """
+    Gauges read at scrape time from `collect`, keyed by the gauge name suffix.
+    With kind "counter", the values are totals since startup instead, named
+    with a _total suffix, so that rate() handles process restarts.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        help: str,
+        collect: Callable[[], Mapping[str, float]],
+        kind: Literal["gauge", "counter"] = "gauge",
+    ):
+        self.prefix = prefix
+        self.help = help
+        self.collect = collect
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        suffix = "_total" if self.kind == "counter" else ""
+        lines = []
+        for key, value in self.collect().items():
+            name = f"{self.prefix}_{key}{suffix}"
+            lines += [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}"]
+            lines.append(f"{name} {float(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram | Gauges] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauges(
+        self, prefix: str, help: str, collect: Callable[[], Mapping[str, float]]
+    ) -> Gauges:
+        return self._add(Gauges(prefix, help, collect))
+
+    def counters(
+        self, prefix: str, help: str, collect: Callable[[], Mapping[str, float]]
+    ) -> Gauges:
+        """
+        Like gauges, for totals kept elsewhere, e.g. in a stats dataclass
+        """
+        return self._add(Gauges(prefix, help, collect, kind="counter"))
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format
+        """
+        return "\n".join(line for metric in self._metrics for line in metric.render())
+
+    def _add(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+
+def _labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duration of SQL statements"
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests",
+    labels=["method", "route", "status"],
+)
+db_pool_wait = registry.histogram(
+    "db_pool_wait_seconds", "Time to get a usable pooled connection"
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "SQL statements run by one HTTP request",
+    labels=["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 100),
+)
+
+
+@dataclass
+class RequestTimings:
+    started: float
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+
+    def server_timing(self) -> str:
+        total = time.perf_counter() - self.started
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f"pool;dur={self.pool_wait * 1000:.2f}, "
+            f"app;dur={total * 1000:.2f}"
+        )
+
+
+# Timings of the HTTP request being handled, None outside of requests
+request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Times every statement run on the engine and adds it to the current
+    request's timings
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        record_query(time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        started = (context.connection.info if context.connection else {}).get(
+            "query_started"
+        )
+        if started:
+            record_query(time.perf_counter() - started.pop())
+
+
+def record_query(elapsed: float) -> None:
+    db_query_duration.observe(elapsed)
+
+    timings = request_timings.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.db_time += elapsed
+
+
+class MetricsMiddleware:
+    """
+    Records latency and DB usage per route. With `server_timing`, also
+    reports them to the client in a Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = RequestTimings(started=time.perf_counter())
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing", timings.server_timing()
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
+            # The route template, so metrics are not labeled per short code
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration.observe(
+                time.perf_counter() - timings.started,
+                scope["method"],
+                route,
+                str(status),
+            )
+            db_queries_per_request.observe(timings.queries, route)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", tags=["metrics"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render() + "\n", media_type="text/plain; version=0.0.4"
+    )
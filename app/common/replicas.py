@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from typing import Generator, Hashable, Iterable, Sequence
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.common.cache import MISSING, TTLCache
+from app.common.config import Config, config
+from app.common.db import create_pooled_async_engine
+from app.common.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+# Errors meaning the replica itself is unusable, as opposed to a bad query
+REPLICA_ERRORS = (
+    OSError,
+    TimeoutError,
+    exc.OperationalError,
+    exc.InterfaceError,
+    exc.TimeoutError,
+)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    healthy: bool = True
+
+    def __post_init__(self):
+        self.sessionmaker = async_sessionmaker(
+            self.engine, expire_on_commit=False, autoflush=False
+        )
+
+
+class ReplicaSet:
+    """
+    Read replicas with failover to the primary.
+
+    Reads are spread round-robin over healthy replicas. A replica failing a
+    read is taken out of rotation until a health check finds it reachable
+    again. Keys written recently are sticky: their reads go to the primary
+    for `sticky_ttl` seconds, so a create-then-read does not hit replica lag.
+    Stickiness is per process.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Replica] = (),
+        sticky_ttl: float = 5.0,
+        sticky_maxsize: int = 100_000,
+    ):
+        self.replicas = list(replicas)
+        self._sticky: TTLCache[Hashable, bool] = TTLCache(
+            maxsize=sticky_maxsize, ttl=sticky_ttl
+        )
+        self._next = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def stick(self, keys: Iterable[Hashable]) -> None:
+        if self.replicas:
+            for key in keys:
+                self._sticky.set(key, True)
+
+    def pick(self, keys: Iterable[Hashable] = ()) -> Replica | None:
+        """
+        Returns the replica to read from, or None to read from the primary
+        """
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if any(self._sticky.get(key) is not MISSING for key in keys):
+            return None
+
+        return healthy[next(self._next) % len(healthy)]
+
+    def mark_down(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Replica %s is down, reading from primary", replica.name)
+        replica.healthy = False
+
+    async def check(self, timeout: float = 5.0) -> None:
+        for replica in self.replicas:
+            try:
+                async with asyncio.timeout(timeout):
+                    async with replica.sessionmaker() as session:
+                        await session.execute(text("SELECT 1"))
+            except REPLICA_ERRORS:
+                self.mark_down(replica)
+                continue
+            except Exception:
+                logger.exception("Health check of replica %s failed", replica.name)
+                self.mark_down(replica)
+                continue
+
+            if not replica.healthy:
+                logger.info("Replica %s is back up", replica.name)
+            replica.healthy = True
+
+    async def run_health_checks(self, interval: float) -> None:
+        while True:
+            # Replicas marked down only come back through these checks, so
+            # they must outlive any error
+            try:
+                await self.check(timeout=interval)
+            except Exception:
+                logger.exception("Replica health checks failed")
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def reset_after_fork(self) -> None:
+        """
+        Replaces the pools inherited from the parent process without closing
+        their connections, which the parent still uses
+        """
+        for replica in self.replicas:
+            replica.engine.sync_engine.dispose(close=False)
+
+
+def create_replica_set(config: Config) -> ReplicaSet:
+    replicas = []
+    for uri in config.ASYNC_REPLICA_URIS:
+        host = uri.hosts()[0]
+        engine = create_pooled_async_engine(str(uri), config)
+        instrument_engine(engine)
+        replicas.append(
+            Replica(name=f"{host['host']}:{host['port'] or 5432}", engine=engine)
+        )
+
+    return ReplicaSet(
+        replicas,
+        sticky_ttl=config.REPLICA_STICKY_SECONDS,
+        sticky_maxsize=config.REPLICA_STICKY_MAXSIZE,
+    )
+
+
+replica_set = create_replica_set(config)
+os.register_at_fork(after_in_child=replica_set.reset_after_fork)
+
+
+def get_replica_set() -> Generator[ReplicaSet, None, None]:
+    yield replica_set
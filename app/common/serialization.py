@@ -0,0 +1,78 @@
+import datetime
+import json
+import logging
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from app.common.config import Config, config
+
+logger = logging.getLogger(__name__)
+
+JSONEncoder = Callable[[Any], bytes]
+
+
+def _fields(obj: Any) -> Any:
+    """
+    Encodes pydantic models as their field values, skipping pydantic's own
+    serializer. The DTOs only hold JSON native values, datetimes and other
+    DTOs, without aliases or custom serializers.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    if isinstance(obj, datetime.datetime):
+        return _isoformat(obj)
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _isoformat(value: datetime.datetime) -> str:
+    """
+    ISO 8601 with UTC as Z, the way orjson with OPT_UTC_Z, msgspec and
+    pydantic write datetimes, so responses don't depend on the encoder
+    """
+    if value.utcoffset() == datetime.timedelta(0):
+        return value.replace(tzinfo=None).isoformat() + "Z"
+    return value.isoformat()
+
+
+def stdlib_encoder() -> JSONEncoder:
+    encoder = json.JSONEncoder(
+        ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_fields
+    )
+    return lambda content: encoder.encode(content).encode()
+
+
+def orjson_encoder() -> JSONEncoder:
+    import orjson
+
+    return lambda content: orjson.dumps(
+        content, default=_fields, option=orjson.OPT_UTC_Z
+    )
+
+
+def msgspec_encoder() -> JSONEncoder:
+    import msgspec
+
+    return msgspec.json.Encoder(enc_hook=_fields).encode
+
+
+def create_json_encoder(config: Config) -> JSONEncoder:
+    match config.JSON_ENCODER:
+        case "orjson":
+            factory = orjson_encoder
+        case "msgspec":
+            factory = msgspec_encoder
+        case _:
+            return stdlib_encoder()
+
+    try:
+        return factory()
+    except ImportError:
+        logger.warning(
+            "%s is not installed, encoding JSON with the standard library",
+            config.JSON_ENCODER,
+        )
+        return stdlib_encoder()
+
+
+json_encoder = create_json_encoder(config)
@@ -0,0 +1,68 @@
+import math
+import os
+from pathlib import Path
+
+from uvicorn_worker import UvicornWorker as BaseUvicornWorker
+
+from app.common.config import Config
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def cpu_quota(cgroup_root: Path = CGROUP_ROOT) -> float | None:
+    """
+    CPUs the process may use according to its cgroup's CPU limit, e.g. 1.5
+    for docker run --cpus 1.5, or None when there is no limit. Reads cgroup
+    v2's cpu.max, falling back to v1's CFS quota and period.
+    """
+    try:
+        quota, period = (cgroup_root / "cpu.max").read_text().split()
+    except OSError:
+        try:
+            quota = (cgroup_root / "cpu" / "cpu.cfs_quota_us").read_text().strip()
+            period = (cgroup_root / "cpu" / "cpu.cfs_period_us").read_text().strip()
+        except OSError:
+            return None
+
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus(cgroup_root: Path = CGROUP_ROOT) -> int:
+    """
+    CPUs the process may run on, bounded by its CPU quota rounded up
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    quota = cpu_quota(cgroup_root)
+    if quota is not None:
+        cpus = min(cpus, max(math.ceil(quota), 1))
+    return cpus
+
+
+def worker_count(config: Config, cgroup_root: Path = CGROUP_ROOT) -> int:
+    return config.WEB_CONCURRENCY or available_cpus(cgroup_root)
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Gunicorn worker serving the app on uvloop and httptools.
+
+    A stopped worker finishes its in-flight requests and runs the lifespan
+    shutdown, flushing click counts, within gunicorn's graceful_timeout.
+    """
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    # Seconds of graceful_timeout left for the lifespan shutdown
+    SHUTDOWN_MARGIN = 5
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(
+            self.cfg.graceful_timeout - self.SHUTDOWN_MARGIN, 1
+        )
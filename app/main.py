@@ -1,19 +1,96 @@
+import asyncio
 import logging.config
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 
-from app.common.config import Config
-from app.common.fastapi_utils import RouterBuilder
+from app.common.admission import AdmissionMiddleware, admission_controller
+from app.common.config import get_config
+from app.common.db import database
+from app.common.fastapi_utils import ModelResponse, RouterBuilder
+from app.common.healthcheck import health_monitor
 from app.common.healthcheck import router as healthcheck_router
-from app.url.routes import url_router
+from app.common.metrics import MetricsMiddleware
+from app.common.metrics import router as metrics_router
+from app.common.replicas import replica_set
+from app.url.cache import url_cache
+from app.url.clicks import click_tracker
+from app.url.filter import url_filter
+from app.url.purge import url_purger
+from app.url.routes import url_route_priorities, url_router
+from app.url.warmup import cache_warmer
 
-app_config = Config()
+app_config = get_config()
 
 logging.config.fileConfig(app_config.LOGGING_CONF_FILE, disable_existing_loggers=False)
 
-app = FastAPI(title=app_config.PROJECT_NAME)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_checks = None
+    if replica_set:
+        health_checks = asyncio.create_task(
+            replica_set.run_health_checks(app_config.REPLICA_HEALTH_CHECK_INTERVAL)
+        )
+
+    await health_monitor.check()
+    health_monitoring = asyncio.create_task(health_monitor.run())
+    click_flusher = asyncio.create_task(click_tracker.run())
+    warmup = cache_warmer.start()
+    filter_sync = url_filter.start()
+    purge = url_purger.start()
+
+    yield
+
+    if warmup is not None:
+        warmup.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup
+    if filter_sync is not None:
+        filter_sync.cancel()
+        with suppress(asyncio.CancelledError):
+            await filter_sync
+        await url_filter.save_snapshot()
+    if purge is not None:
+        purge.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge
+    click_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await click_flusher
+    await click_tracker.flush()
+    if health_checks is not None:
+        health_checks.cancel()
+        with suppress(asyncio.CancelledError):
+            await health_checks
+    health_monitoring.cancel()
+    with suppress(asyncio.CancelledError):
+        await health_monitoring
+    await replica_set.dispose()
+    await database.dispose()
+    await url_cache.close()
+
+
+app = FastAPI(
+    title=app_config.PROJECT_NAME,
+    lifespan=lifespan,
+    default_response_class=ModelResponse,
+)
+# Added first, so it runs inside MetricsMiddleware and sees the DB timings
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission_controller,
+    router=app.router,
+    priorities=url_route_priorities,
+    retry_after=app_config.ADMISSION_RETRY_AFTER,
+)
+app.add_middleware(MetricsMiddleware, server_timing=app_config.SERVER_TIMING)
 
 
 app.include_router(
-    RouterBuilder().with_router(healthcheck_router).with_router(url_router).build()
+    RouterBuilder()
+    .with_router(healthcheck_router)
+    .with_router(metrics_router)
+    .with_router(url_router)
+    .build()
 )
@@ -1 +1,2 @@
-from .urls import URLMapping
+from .clicks import URLClickCounter
+from .urls import URLLookup, URLMapping
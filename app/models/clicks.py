@@ -0,0 +1,20 @@
+import datetime
+
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.common.db import Base
+
+
+class URLClickCounter(Base):
+    """
+    Aggregated redirect hits per short code, written in batches by the click
+    tracker
+    """
+
+    __tablename__ = "url_click_counters"
+
+    short_code: Mapped[str] = mapped_column(primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, default=0)
+    first_clicked_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    last_clicked_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
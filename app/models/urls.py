@@ -1,15 +1,84 @@
+import datetime
+import hashlib
+
+from sqlalchemy import BigInteger, DateTime, Index, LargeBinary, Sequence
+from sqlalchemy.engine.default import DefaultExecutionContext
 from sqlalchemy.orm import Mapped, mapped_column
 
-from app.common.db import Base, big_int_pk
+from app.common.db import Base, hash_partitions
+
+# Hands out blocks of ids for collision free short code generation
+short_code_block_seq = Sequence("short_code_block_seq", metadata=Base.metadata)
+
+# Ids of URL mappings. Not the primary key, which on a hash partitioned table
+# has to include the partition key, but still unique as they come from here.
+url_mappings_id_seq = Sequence("url_mappings_id_seq", metadata=Base.metadata)
+
+# Partitions of url_mappings and url_lookups. Changing it needs a migration
+# repartitioning both tables.
+URL_PARTITIONS = 16
+
+
+def url_digest(original_url: str) -> bytes:
+    """
+    Computes URLMapping.url_hash for an original URL, already normalized by
+    HttpUrl validation. Equivalent to sha256(convert_to(original_url, 'UTF8'))
+    in Postgres.
+    """
+    return hashlib.sha256(original_url.encode()).digest()
+
+
+def _url_hash_default(context: DefaultExecutionContext) -> bytes:
+    return url_digest(context.get_current_parameters()["original_url"])
 
 
 class URLMapping(Base):
     """
-    Represents a URL mapping in the database
+    Represents a URL mapping in the database, hash partitioned by short code
+    so that lookups by short code only touch one partition
     """
 
     __tablename__ = "url_mappings"
+    __table_args__ = (
+        # Only expiring mappings, in the order they are purged
+        Index(
+            "ix_url_mappings_expires_at",
+            "expires_at",
+            postgresql_where="expires_at IS NOT NULL",
+        ),
+        {"postgresql_partition_by": "HASH (short_code)"},
+    )
+
+    id: Mapped[int] = mapped_column(
+        BigInteger,
+        url_mappings_id_seq,
+        server_default=url_mappings_id_seq.next_value(),
+        index=True,
+    )
+    original_url: Mapped[str]
+    # Fixed width digest of original_url, see URLLookup
+    url_hash: Mapped[bytes] = mapped_column(LargeBinary, default=_url_hash_default)
+    short_code: Mapped[str] = mapped_column(primary_key=True)
+    # Not found by lookups from then on, and deleted by the purge worker.
+    # Expiring mappings have no URLLookup, their URLs are not deduplicated.
+    expires_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime(timezone=True)
+    )
+
+
+class URLLookup(Base):
+    """
+    Maps original URLs, by their url_hash, to their non-expiring short code.
+    Keeps original URLs unique, which a constraint on url_mappings can't as
+    it is partitioned by short code.
+    """
+
+    __tablename__ = "url_lookups"
+    __table_args__ = {"postgresql_partition_by": "HASH (url_hash)"}
+
+    url_hash: Mapped[bytes] = mapped_column(LargeBinary, primary_key=True)
+    short_code: Mapped[str]
+
 
-    id: Mapped[big_int_pk]
-    original_url: Mapped[str] = mapped_column(unique=True)
-    short_code: Mapped[str] = mapped_column(unique=True)
+hash_partitions(URLMapping.__table__, URL_PARTITIONS)  # type: ignore[arg-type]
+hash_partitions(URLLookup.__table__, URL_PARTITIONS)  # type: ignore[arg-type]
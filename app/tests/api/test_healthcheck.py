@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.common import healthcheck
+from app.common.config import config
+from app.common.db import get_async_session
+from app.common.healthcheck import HealthMonitor, Unhealthy, health_monitor
+from app.main import app
+
+
+async def ok() -> None:
+    return None
+
+
+async def failing() -> None:
+    raise Unhealthy("down")
+
+
+async def hanging() -> None:
+    await asyncio.sleep(10)
+
+
+@pytest.fixture
+def monitor_results(monkeypatch):
+    def set_results(**results: str) -> None:
+        monkeypatch.setattr(health_monitor, "results", results)
+        monkeypatch.setattr(health_monitor, "checked_at", time.monotonic())
+
+    return set_results
+
+
+@pytest.mark.asyncio
+class TestHealthMonitor:
+    async def test_check(self):
+        # Arrange
+        monitor = HealthMonitor(timeout=0.01)
+        monitor.add_check("ok", ok)
+        monitor.add_check("failing", failing)
+        monitor.add_check("hanging", hanging)
+
+        # Act
+        await monitor.check()
+
+        # Assert
+        assert monitor.results == {
+            "ok": "OK",
+            "failing": "down",
+            "hanging": "timed out after 0.01s",
+        }
+        assert monitor.readiness() == (
+            False,
+            {"status": "NOK", "checks": monitor.results},
+        )
+
+    async def test_degraded(self):
+        # Arrange
+        monitor = HealthMonitor()
+        monitor.add_check("ok", ok)
+        monitor.add_check("optional", failing, critical=False)
+        await monitor.check()
+
+        # Act
+        ready, body = monitor.readiness()
+
+        # Assert
+        assert ready
+        assert body == {
+            "status": "degraded",
+            "checks": {"ok": "OK", "optional": "down"},
+        }
+
+    async def test_not_ready_before_first_check(self):
+        # Act & Assert
+        assert HealthMonitor().readiness() == (False, {"status": "starting"})
+
+    async def test_stale_results(self):
+        # Arrange
+        monitor = HealthMonitor(interval=1, timeout=1)
+        monitor.add_check("ok", ok)
+        await monitor.check()
+        assert monitor.checked_at is not None
+        monitor.checked_at -= 10
+
+        # Act
+        ready, body = monitor.readiness()
+
+        # Assert
+        assert not ready
+        assert body["checks"] == {"ok": "OK", "monitor": "stale"}
+
+
+class TestProbes:
+    def test_livez(self, client):
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/livez")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"status": "OK"}
+
+    def test_readyz(self, client, monitor_results):
+        # Arrange
+        monitor_results(database="OK", pool="OK")
+
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/readyz")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "OK",
+            "checks": {"database": "OK", "pool": "OK"},
+        }
+
+    def test_readyz_failed_check(self, client, monitor_results):
+        # Arrange
+        monitor_results(database="OK", pool="saturated")
+
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/readyz")
+
+        # Assert
+        assert response.status_code == 503
+        assert response.json()["status"] == "NOK"
+
+
+class TestHealthcheck:
+    def test_warming(self, client, async_db_session, monkeypatch):
+        # Arrange
+        app.dependency_overrides[get_async_session] = lambda: async_db_session
+        monkeypatch.setattr(healthcheck, "warming", {"url_cache"})
+
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/healthcheck")
+        app.dependency_overrides.clear()
+
+        # Assert
+        assert response.status_code == 503
+        assert response.json() == {
+            "status": "warming",
+            "database": "connected",
+            "warming": ["url_cache"],
+        }
+
+    def test_healthy(self, client, async_db_session):
+        # Arrange
+        app.dependency_overrides[get_async_session] = lambda: async_db_session
+
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/healthcheck")
+        app.dependency_overrides.clear()
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"status": "OK", "database": "connected"}
+
+    def test_database_down(self, client):
+        # Arrange
+        engine = create_async_engine(
+            "postgresql+asyncpg://postgres@127.0.0.1:1/test", poolclass=NullPool
+        )
+        app.dependency_overrides[get_async_session] = lambda: async_sessionmaker(engine)
+
+        # Act
+        response = client.get(f"/{config.API_PREFIX}/healthcheck")
+        app.dependency_overrides.clear()
+
+        # Assert
+        assert response.status_code == 500
+        assert response.json()["detail"] == {
+            "status": "NOK",
+            "database": "disconnected",
+        }
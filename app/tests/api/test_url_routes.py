@@ -0,0 +1,208 @@
+import datetime
+
+import pytest
+
+from app.common.config import config
+from app.main import app
+from app.models import URLMapping
+from app.url.clicks import get_click_tracker
+from app.url.repositories import URLTarget
+from app.url.services import URLMappingService
+
+
+@pytest.fixture
+def url_client(client, service, click_tracker):
+    app.dependency_overrides[URLMappingService] = lambda: service
+    app.dependency_overrides[get_click_tracker] = lambda: click_tracker
+    yield client
+    app.dependency_overrides.clear()
+
+
+class TestRedirectURL:
+    def test_json_response(self, url_client, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        response = url_client.get(f"/{config.API_PREFIX}/json1")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"original_url": "https://example.com/"}
+        assert response.headers["cache-control"] == config.RESOLVE_CACHE_CONTROL
+
+    def test_redirect_response(self, url_client, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        response = url_client.get(
+            f"/{config.API_PREFIX}/redir1",
+            params={"redirect": True},
+            follow_redirects=False,
+        )
+
+        # Assert
+        assert response.status_code == config.REDIRECT_STATUS_CODE
+        assert response.headers["location"] == "https://example.com/"
+        assert response.headers["cache-control"] == config.REDIRECT_CACHE_CONTROL
+        assert response.content == b""
+
+    @pytest.mark.parametrize("redirect", [True, False])
+    def test_expiring_url(self, url_client, mock_url_repository, redirect):
+        # Arrange
+        expires_at = datetime.datetime(2099, 1, 2, 3, 4, 5, tzinfo=datetime.UTC)
+        mock_url_repository.get_target.return_value = URLTarget(
+            "https://example.com/", expires_at
+        )
+
+        # Act
+        response = url_client.get(
+            f"/{config.API_PREFIX}/expiring{int(redirect)}",
+            params={"redirect": redirect},
+            follow_redirects=False,
+        )
+
+        # Assert
+        assert response.headers["cache-control"] == "private, no-store"
+        assert response.headers["expires"] == "Fri, 02 Jan 2099 03:04:05 GMT"
+
+    def test_records_click(self, url_client, mock_url_repository, click_tracker):
+        # Arrange
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        url_client.get(f"/{config.API_PREFIX}/click1")
+
+        # Assert
+        assert click_tracker.stats.recorded == 1
+
+    def test_missing_short_code(self, url_client, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_target.return_value = None
+
+        # Act
+        response = url_client.get(
+            f"/{config.API_PREFIX}/missing1", params={"redirect": True}
+        )
+
+        # Assert
+        assert response.status_code == 404
+
+
+class TestCreateShortURL:
+    def test_expires_at(self, url_client, mock_url_repository):
+        # Arrange
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=1)
+        mock_url_repository.insert_many.side_effect = lambda mappings, _: mappings
+
+        # Act
+        response = url_client.post(
+            f"/{config.API_PREFIX}/short-url",
+            params={
+                "original_url": "https://example.com/",
+                "expires_at": expires_at.isoformat(),
+            },
+        )
+
+        # Assert
+        assert response.status_code == 201
+        assert (
+            datetime.datetime.fromisoformat(response.json()["expires_at"]) == expires_at
+        )
+        mock_url_repository.upsert.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "expires_at", ["2000-01-01T00:00:00+00:00", "2999-01-01T00:00:00"]
+    )
+    def test_invalid_expires_at(self, url_client, expires_at):
+        # Act
+        response = url_client.post(
+            f"/{config.API_PREFIX}/short-url",
+            params={"original_url": "https://example.com/", "expires_at": expires_at},
+        )
+
+        # Assert
+        assert response.status_code == 422
+
+
+class TestURLMappingListing:
+    def test_list(self, url_client, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_page.return_value = [
+            URLMapping(id=1, original_url="https://example.com/", short_code="abc123")
+        ]
+
+        # Act
+        response = url_client.get(f"/{config.API_PREFIX}/short-url")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [{"short_code": "abc123", "original_url": "https://example.com/"}],
+            "next_cursor": None,
+        }
+
+    def test_list_invalid_cursor(self, url_client):
+        # Act
+        response = url_client.get(
+            f"/{config.API_PREFIX}/short-url", params={"cursor": "nope"}
+        )
+
+        # Assert
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "format, expected",
+        [
+            (
+                "ndjson",
+                '{"short_code":"abc123","original_url":"https://example.com/"}\n'
+                '{"short_code":"def456","original_url":"https://test.com/"}\n',
+            ),
+            (
+                "csv",
+                "short_code,original_url\r\n"
+                "abc123,https://example.com/\r\n"
+                "def456,https://test.com/\r\n",
+            ),
+        ],
+    )
+    def test_export(
+        self, url_client, mock_url_repository, monkeypatch, format, expected
+    ):
+        # Arrange
+        async def stream_all(batch_size):
+            yield URLMapping(original_url="https://example.com/", short_code="abc123")
+            yield URLMapping(original_url="https://test.com/", short_code="def456")
+
+        monkeypatch.setattr(mock_url_repository, "stream_all", stream_all)
+
+        # Act
+        response = url_client.get(
+            f"/{config.API_PREFIX}/short-url/export", params={"format": format}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.text == expected
+
+
+class TestMetrics:
+    def test_metrics(self, url_client, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+        url_client.get(f"/{config.API_PREFIX}/metric1")
+
+        # Act
+        response = url_client.get(f"/{config.API_PREFIX}/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert (
+            'http_request_duration_seconds_count{method="GET",'
+            f'route="/{config.API_PREFIX}/{{short_code}}",status="200"}}'
+        ) in response.text
+        assert "db_pool_size" in response.text
+        assert "url_cache_local_hits_total" in response.text
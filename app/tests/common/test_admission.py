@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.common.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AIMDLimit,
+    Priority,
+)
+from app.common.config import config
+from app.common.metrics import MetricsMiddleware, record_query
+from app.main import app
+from app.url.routes import url_route_priorities
+
+
+def controller(limit: int = 1, queue_size: int = 10, queue_timeout: float = 1.0):
+    return AdmissionController(
+        AIMDLimit(initial=limit, min_limit=1, max_limit=10, target=0.1),
+        queue_sizes={Priority.HIGH: queue_size, Priority.LOW: queue_size},
+        queue_timeout=queue_timeout,
+    )
+
+
+class TestAIMDLimit:
+    def test_decreases_once_per_round(self):
+        # Arrange
+        limit = AIMDLimit(initial=10, min_limit=1, max_limit=20, target=0.1)
+        started = time.perf_counter()
+
+        # Act
+        limit.observe(0.5, started, in_flight=10)
+        limit.observe(0.5, started, in_flight=9)
+
+        # Assert
+        assert limit.value == 9.0
+        limit.observe(0.5, time.perf_counter(), in_flight=9)
+        assert limit.value == pytest.approx(8.1)
+
+    def test_increases_while_used(self):
+        # Arrange
+        limit = AIMDLimit(initial=4, min_limit=1, max_limit=20, target=0.1)
+
+        # Act
+        for _ in range(4):
+            limit.observe(0.01, time.perf_counter(), in_flight=4)
+        limit.observe(0.01, time.perf_counter(), in_flight=1)
+
+        # Assert
+        assert 4.9 < limit.value < 5.0
+
+    def test_bounded(self):
+        # Arrange
+        limit = AIMDLimit(initial=2, min_limit=2, max_limit=2, target=0.1)
+
+        # Act
+        limit.decrease()
+        limit.observe(0.01, time.perf_counter(), in_flight=2)
+
+        # Assert
+        assert limit.value == 2
+
+
+@pytest.mark.asyncio
+class TestAdmissionController:
+    async def test_high_priority_admitted_first(self):
+        # Arrange
+        admission = controller(limit=1)
+        assert await admission.acquire(Priority.LOW)
+        low = asyncio.create_task(admission.acquire(Priority.LOW))
+        high = asyncio.create_task(admission.acquire(Priority.HIGH))
+        await asyncio.sleep(0)
+
+        # Act
+        admission.release(time.perf_counter())
+        await high
+
+        # Assert
+        assert high.result() is True
+        assert not low.done()
+        admission.release(time.perf_counter())
+        assert await low is True
+        assert admission.in_flight == 1
+
+    async def test_sheds_over_queue_size(self):
+        # Arrange
+        admission = controller(limit=1, queue_size=0)
+        await admission.acquire(Priority.HIGH)
+
+        # Act
+        admitted = await admission.acquire(Priority.HIGH)
+
+        # Assert
+        assert admitted is False
+        assert admission.stats.rejected == 1
+
+    async def test_sheds_after_queue_timeout(self):
+        # Arrange
+        admission = controller(limit=1, queue_timeout=0.01)
+        await admission.acquire(Priority.HIGH)
+
+        # Act
+        admitted = await admission.acquire(Priority.HIGH)
+
+        # Assert
+        assert admitted is False
+        assert admission.stats.timed_out == 1
+        assert admission.queued(Priority.HIGH) == 0
+        admission.release(time.perf_counter())
+        assert admission.in_flight == 0
+
+    async def test_cancelled_waiter_frees_its_slot(self):
+        # Arrange
+        admission = controller(limit=1)
+        await admission.acquire(Priority.HIGH)
+        waiter = asyncio.create_task(admission.acquire(Priority.HIGH))
+        await asyncio.sleep(0)
+
+        # Act
+        admission.release(time.perf_counter())
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        # Assert
+        assert admission.in_flight == 0
+
+
+class TestAdmissionMiddleware:
+    def test_sheds_with_retry_after(self):
+        # Arrange
+        admission = controller(limit=1, queue_size=0)
+        admission.in_flight = 1
+        test_app = FastAPI()
+        test_app.add_middleware(
+            AdmissionMiddleware,
+            controller=admission,
+            router=test_app.router,
+            priorities={"limited": Priority.HIGH},
+            retry_after=3,
+        )
+        test_app.get("/limited", name="limited")(lambda: {})
+        test_app.get("/other", name="other")(lambda: {})
+        client = TestClient(test_app)
+
+        # Act
+        response = client.get("/limited")
+
+        # Assert
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert client.get("/other").status_code == 200
+
+    def test_slow_queries_lower_limit(self):
+        # Arrange
+        admission = controller(limit=5)
+        test_app = FastAPI()
+        test_app.add_middleware(
+            AdmissionMiddleware,
+            controller=admission,
+            router=test_app.router,
+            priorities={"slow": Priority.HIGH},
+        )
+        test_app.add_middleware(MetricsMiddleware)
+
+        @test_app.get("/slow", name="slow")
+        async def slow():
+            record_query(0.5)
+            return {}
+
+        # Act
+        response = TestClient(test_app).get("/slow")
+
+        # Assert
+        assert response.status_code == 200
+        assert admission.limit.value == 4.5
+        assert admission.in_flight == 0
+
+    @pytest.mark.parametrize(
+        "method, path, priority",
+        [
+            ("GET", "abc123", Priority.HIGH),
+            ("POST", "short-url", Priority.LOW),
+            ("POST", "short-url/bulk", Priority.LOW),
+            ("GET", "short-url", None),
+            ("GET", "readyz", None),
+        ],
+    )
+    def test_url_route_priorities(self, method, path, priority):
+        # Arrange
+        middleware = AdmissionMiddleware(
+            app, controller(), app.router, url_route_priorities
+        )
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": f"/{config.API_PREFIX}/{path}",
+            "root_path": "",
+        }
+
+        # Act & Assert
+        assert middleware.priority(scope) == priority
@@ -0,0 +1,70 @@
+import pytest
+
+from app.common.bloom import BloomFilter
+
+
+@pytest.mark.asyncio
+class TestBloomFilter:
+    async def test_no_false_negatives(self):
+        # Arrange
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"key{i}".encode() for i in range(1000)]
+
+        # Act
+        for key in keys:
+            bloom.add(key)
+
+        # Assert
+        assert all(key in bloom for key in keys)
+        # Keys whose bits were all set already are not counted
+        assert 990 <= bloom.count <= 1000
+
+    async def test_false_positive_rate(self):
+        # Arrange
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"key{i}".encode())
+
+        # Act
+        false_positives = sum(f"other{i}".encode() in bloom for i in range(10_000))
+
+        # Assert
+        assert false_positives / 10_000 < 0.03
+        assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.5)
+
+    async def test_counts_distinct_keys(self):
+        # Arrange
+        bloom = BloomFilter(100)
+
+        # Act
+        bloom.add(b"key")
+        bloom.add(b"key")
+
+        # Assert
+        assert bloom.count == 1
+
+    async def test_round_trip(self):
+        # Arrange
+        bloom = BloomFilter(100, 0.001)
+        bloom.add(b"key")
+
+        # Act
+        loaded = BloomFilter.from_bytes(bloom.to_bytes())
+
+        # Assert
+        assert b"key" in loaded
+        assert (loaded.capacity, loaded.error_rate, loaded.count) == (100, 0.001, 1)
+
+    @pytest.mark.parametrize(
+        "corrupt",
+        [lambda data: data[:-1], lambda data: data[:-1] + b"\xff", lambda data: b""],
+        ids=["truncated", "flipped", "empty"],
+    )
+    async def test_corrupt(self, corrupt):
+        # Arrange
+        bloom = BloomFilter(100)
+        bloom.add(b"key")
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            BloomFilter.from_bytes(corrupt(bloom.to_bytes()))
@@ -0,0 +1,66 @@
+from app.common.cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    def test_get_set(self):
+        # Arrange
+        cache: TTLCache[str, str] = TTLCache(maxsize=10, ttl=60)
+
+        # Act
+        cache.set("abc123", "https://example.com")
+
+        # Assert
+        assert cache.get("abc123") == "https://example.com"
+        assert cache.get("def456") is MISSING
+        assert cache.stats.hits == 1
+        assert cache.stats.misses == 1
+
+    def test_entries_expire(self):
+        # Arrange
+        clock = FakeClock()
+        cache: TTLCache[str, str | None] = TTLCache(maxsize=10, ttl=60, clock=clock)
+        cache.set("abc123", "https://example.com")
+        cache.set("def456", None, ttl=5)
+
+        # Act
+        clock.now = 10
+
+        # Assert
+        assert cache.get("abc123") == "https://example.com"
+        assert cache.get("def456") is MISSING
+        assert cache.stats.expirations == 1
+
+    def test_least_recently_used_is_evicted(self):
+        # Arrange
+        cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        # Act
+        cache.get("a")
+        cache.set("c", 3)
+
+        # Assert
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+        assert cache.stats.evictions == 1
+
+    def test_zero_maxsize_disables_cache(self):
+        # Arrange
+        cache: TTLCache[str, int] = TTLCache(maxsize=0, ttl=60)
+
+        # Act
+        cache.set("a", 1)
+
+        # Assert
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
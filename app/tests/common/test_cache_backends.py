@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from app.common.cache_backends import InMemoryCacheBackend, RedisCacheBackend
+from app.common.singleflight import SingleFlight
+
+
+@pytest.fixture
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCacheBackend(
+        fakeredis.FakeAsyncRedis(decode_responses=True), key_prefix="url:"
+    )
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "redis":
+        return request.getfixturevalue("redis_backend")
+    return InMemoryCacheBackend()
+
+
+@pytest.mark.asyncio
+class TestCacheBackend:
+    async def test_get_set_delete(self, backend):
+        # Act
+        await backend.set("abc123", "https://example.com", ttl=60)
+
+        # Assert
+        assert await backend.get("abc123") == "https://example.com"
+        await backend.delete("abc123")
+        assert await backend.get("abc123") is None
+
+    async def test_get_many_set_many(self, backend):
+        # Act
+        await backend.set_many(
+            {"abc123": "https://example.com", "def456": "https://test.com"}, ttl=60
+        )
+
+        # Assert
+        assert await backend.get_many(["abc123", "def456", "missing"]) == {
+            "abc123": "https://example.com",
+            "def456": "https://test.com",
+        }
+
+    async def test_usable_after_fork_reset(self, backend):
+        # Arrange
+        await backend.set("abc123", "https://example.com", ttl=60)
+
+        # Act
+        backend.reset_after_fork()
+
+        # Assert
+        assert await backend.get("abc123") == "https://example.com"
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_execution(self):
+        # Arrange
+        single_flight: SingleFlight[str, int] = SingleFlight()
+        calls = 0
+
+        async def load() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        # Act
+        results = await asyncio.gather(
+            *(single_flight.do("key", load) for _ in range(5))
+        )
+
+        # Assert
+        assert results == [42] * 5
+        assert calls == 1
+        assert len(single_flight) == 0
+
+    async def test_errors_are_shared_and_not_cached(self):
+        # Arrange
+        single_flight: SingleFlight[str, int] = SingleFlight()
+
+        async def fail() -> int:
+            raise RuntimeError("boom")
+
+        async def succeed() -> int:
+            return 1
+
+        # Act & Assert
+        with pytest.raises(RuntimeError):
+            await single_flight.do("key", fail)
+        assert await single_flight.do("key", succeed) == 1
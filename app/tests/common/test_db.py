@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import func, select, text
+
+from app.common.config import config
+from app.common.db import Database, PoolMetrics, RequestSession
+from app.models import URLMapping
+from app.url.errors import Duplicate
+from app.url.repositories import AsyncURLMappingRepository, URLTarget
+
+
+async def backend_pid(request_session: RequestSession) -> int:
+    async with request_session() as session:
+        return (await session.execute(text("SELECT pg_backend_pid()"))).scalar_one()
+
+
+@pytest.mark.asyncio
+class TestRequestSession:
+    async def test_calls_share_one_connection(self, async_db_session, async_db_engine):
+        # Arrange
+        metrics = PoolMetrics(async_db_engine)
+        request_session = RequestSession(async_db_session, metrics)
+
+        # Act
+        first = await backend_pid(request_session)
+        second = await backend_pid(request_session)
+        await request_session.close()
+
+        # Assert
+        assert first == second
+        assert metrics.acquisitions == 1
+
+    async def test_begin_commits(self, async_db_session, replica_set, clean_db):
+        # Arrange
+        request_session = RequestSession(async_db_session)
+        repository = AsyncURLMappingRepository(request_session, replica_set)
+
+        # Act
+        await repository.get_target("abc123")
+        await repository.upsert("https://example.com", "abc123")
+        await request_session.close()
+
+        # Assert
+        async with async_db_session() as session:
+            count = await session.scalar(select(func.count(URLMapping.id)))
+        assert count == 1
+
+    async def test_usable_after_failed_write(
+        self, async_db_session, replica_set, clean_db
+    ):
+        # Arrange
+        request_session = RequestSession(async_db_session)
+        repository = AsyncURLMappingRepository(request_session, replica_set)
+        await repository.upsert("https://example.com", "abc123")
+
+        # Act
+        with pytest.raises(Duplicate):
+            await repository.upsert("https://test.com", "abc123")
+        short_code = await repository.upsert("https://test.com", "def456")
+        await request_session.close()
+
+        # Assert
+        assert short_code == "def456"
+        assert await repository.get_target("def456") == URLTarget("https://test.com")
+
+    async def test_falls_back_to_fresh_sessions_once_closed(self, async_db_session):
+        # Arrange
+        request_session = RequestSession(async_db_session)
+        await request_session.close()
+
+        # Act
+        first = await backend_pid(request_session)
+        second = await backend_pid(request_session)
+
+        # Assert
+        assert first and second
+
+
+@pytest.mark.asyncio
+class TestDatabase:
+    async def test_engine_created_on_first_use(self):
+        # Arrange
+        metrics = PoolMetrics()
+        database = Database(config, metrics)
+        assert metrics.engine is None
+
+        # Act
+        engine = database.engine
+
+        # Assert
+        assert database.engine is engine
+        assert metrics.engine is engine
+        assert database.sessionmaker.kw["bind"] is engine
+
+    async def test_recreated_after_fork(self):
+        # Arrange
+        database = Database(config, PoolMetrics())
+        engine = database.engine
+
+        # Act
+        database.reset_after_fork()
+
+        # Assert
+        assert database.metrics.engine is None
+        assert database.engine is not engine
+        assert database.sessionmaker.kw["bind"] is database.engine
+
+    async def test_recreated_after_dispose(self):
+        # Arrange
+        database = Database(config, PoolMetrics())
+        engine = database.engine
+
+        # Act
+        await database.dispose()
+
+        # Assert
+        assert database.engine is not engine
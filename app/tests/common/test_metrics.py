@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.common.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    RequestTimings,
+    instrument_engine,
+    request_timings,
+)
+
+
+class TestMetricsRegistry:
+    def test_render(self):
+        # Arrange
+        registry = MetricsRegistry()
+        requests = registry.counter("requests_total", "Requests", labels=["route"])
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        registry.gauges("pool", "Pool usage", lambda: {"size": 5})
+        registry.counters("pool", "Pool acquisitions", lambda: {"acquisitions": 3})
+        requests.inc("/a")
+        requests.inc("/a")
+        latency.observe(0.05)
+        latency.observe(2.0)
+
+        # Act
+        output = registry.render()
+
+        # Assert
+        assert 'requests_total{route="/a"} 2.0' in output
+        assert 'latency_seconds_bucket{le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{le="1"} 1' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 2' in output
+        assert "latency_seconds_sum 2.05" in output
+        assert "latency_seconds_count 2" in output
+        assert "# TYPE pool_size gauge\npool_size 5.0" in output
+        assert (
+            "# TYPE pool_acquisitions_total counter\npool_acquisitions_total 3.0"
+            in output
+        )
+
+    def test_histogram_escapes_labels(self):
+        # Arrange
+        histogram = Histogram("h", "Help", labels=["route"], buckets=(1,))
+
+        # Act
+        histogram.observe(0.5, '/a"b')
+
+        # Assert
+        assert 'h_count{route="/a\\"b"} 1' in histogram.render()
+
+
+@pytest.mark.asyncio
+class TestInstrumentEngine:
+    async def test_counts_request_queries(self, async_db_engine):
+        # Arrange
+        instrument_engine(async_db_engine)
+        timings = RequestTimings(started=time.perf_counter())
+        token = request_timings.set(timings)
+
+        # Act
+        try:
+            async with async_db_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+        finally:
+            request_timings.reset(token)
+
+        # Assert
+        assert timings.queries == 2
+        assert timings.db_time > 0
+
+
+class TestMetricsMiddleware:
+    def test_server_timing(self):
+        # Arrange
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, server_timing=True)
+        app.get("/ping")(lambda: {})
+
+        # Act
+        response = TestClient(app).get("/ping")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith(
+            'db;dur=0.00;desc="0 queries", pool;dur=0.00, app;dur='
+        )
+
+    def test_server_timing_disabled(self):
+        # Arrange
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+        app.get("/ping")(lambda: {})
+
+        # Act
+        response = TestClient(app).get("/ping")
+
+        # Assert
+        assert "server-timing" not in response.headers
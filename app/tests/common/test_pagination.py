@@ -0,0 +1,18 @@
+import pytest
+
+from app.common.pagination import decode_cursor, encode_cursor
+
+
+class TestCursor:
+    def test_round_trip(self):
+        # Act
+        cursor = encode_cursor(12345)
+
+        # Assert
+        assert decode_cursor(cursor) == 12345
+
+    @pytest.mark.parametrize("cursor", ["", "nope", "!!!", "e30", "eyJpZCI6dHJ1ZX0"])
+    def test_invalid(self, cursor):
+        # Act & Assert
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
@@ -0,0 +1,157 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import NullPool, event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.common.replicas import Replica, ReplicaSet
+from app.url.repositories import AsyncURLMappingRepository, URLTarget
+
+
+@pytest_asyncio.fixture
+async def replica(db_container):
+    # Same database as the primary, queries are told apart by counting them
+    connection_url = db_container.get_connection_url().replace(
+        "postgresql+psycopg2", "postgresql+asyncpg"
+    )
+    engine = create_async_engine(connection_url, poolclass=NullPool)
+    replica = Replica(name="replica", engine=engine)
+    replica.queries = 0  # type: ignore[attr-defined]
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(*args):
+        replica.queries += 1  # type: ignore[attr-defined]
+
+    yield replica
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def unreachable_replica():
+    engine = create_async_engine(
+        "postgresql+asyncpg://postgres@127.0.0.1:1/test", poolclass=NullPool
+    )
+    yield Replica(name="unreachable", engine=engine)
+    await engine.dispose()
+
+
+class TestReplicaSet:
+    def test_pick_round_robin_over_healthy(self):
+        # Arrange
+        replicas = [Replica(name=name, engine=None) for name in "abc"]  # type: ignore
+        replicas[1].healthy = False
+        replica_set = ReplicaSet(replicas)
+
+        # Act
+        picked = [replica_set.pick().name for _ in range(4)]  # type: ignore
+
+        # Assert
+        assert picked == ["a", "c", "a", "c"]
+
+    def test_pick_primary_for_sticky_keys(self):
+        # Arrange
+        replica_set = ReplicaSet([Replica(name="a", engine=None)])  # type: ignore
+
+        # Act
+        replica_set.stick([("short_code", "abc123")])
+
+        # Assert
+        assert replica_set.pick([("short_code", "abc123")]) is None
+        assert replica_set.pick([("short_code", "def456")]) is not None
+
+    def test_pick_primary_without_replicas(self):
+        # Assert
+        assert ReplicaSet().pick() is None
+
+
+@pytest.mark.asyncio
+class TestReplicaRouting:
+    async def test_reads_go_to_replica(
+        self, async_db_session, replica, sample_url_mappings
+    ):
+        # Arrange
+        repository = AsyncURLMappingRepository(async_db_session, ReplicaSet([replica]))
+
+        # Act
+        target = await repository.get_target("abc123")
+        mapping = await repository.get_by_short_code("def456")
+
+        # Assert
+        assert target == URLTarget("https://example.com")
+        assert mapping is not None and mapping.original_url == "https://test.com"
+        assert replica.queries == 2
+
+    async def test_read_after_write_goes_to_primary(
+        self, async_db_session, replica, clean_db
+    ):
+        # Arrange
+        repository = AsyncURLMappingRepository(async_db_session, ReplicaSet([replica]))
+        await repository.upsert("https://example.com", "abc123")
+
+        # Act
+        target = await repository.get_target("abc123")
+        mapping = await repository.get_by_url("https://example.com")
+
+        # Assert
+        assert target == URLTarget("https://example.com")
+        assert mapping is not None
+        assert replica.queries == 0
+
+    async def test_fails_over_to_primary(
+        self, async_db_session, unreachable_replica, sample_url_mappings
+    ):
+        # Arrange
+        replica_set = ReplicaSet([unreachable_replica])
+        repository = AsyncURLMappingRepository(async_db_session, replica_set)
+
+        # Act
+        target = await repository.get_target("abc123")
+
+        # Assert
+        assert target == URLTarget("https://example.com")
+        assert not unreachable_replica.healthy
+        assert replica_set.pick() is None
+
+    async def test_health_check(self, replica, unreachable_replica):
+        # Arrange
+        replica.healthy = False
+        replica_set = ReplicaSet([replica, unreachable_replica])
+
+        # Act
+        await replica_set.check(timeout=5)
+
+        # Assert
+        assert replica.healthy
+        assert not unreachable_replica.healthy
+
+    async def test_health_check_unexpected_error(self, replica):
+        # Arrange
+        broken = Replica(name="broken", engine=replica.engine)
+        broken.sessionmaker = Mock(side_effect=RuntimeError("engine disposed"))
+        replica.healthy = False
+        replica_set = ReplicaSet([broken, replica])
+
+        # Act
+        await replica_set.check(timeout=5)
+
+        # Assert
+        assert not broken.healthy
+        assert replica.healthy
+
+    async def test_health_checks_survive_errors(self):
+        # Arrange
+        replica_set = ReplicaSet()
+
+        # Act
+        with patch.object(
+            replica_set, "check", side_effect=RuntimeError("boom")
+        ) as check:
+            task = asyncio.create_task(replica_set.run_health_checks(interval=0))
+            while check.call_count < 2:
+                await asyncio.sleep(0)
+
+        # Assert
+        assert not task.done()
+        task.cancel()
@@ -0,0 +1,118 @@
+import datetime
+import json
+import sys
+
+import pytest
+
+from app.common.config import config
+from app.common.serialization import (
+    create_json_encoder,
+    msgspec_encoder,
+    orjson_encoder,
+    stdlib_encoder,
+)
+from app.url.dto.url_dto import ClickStatsSchema, URLMappingPageSchema, URLMappingSchema
+
+
+def _encoders():
+    yield pytest.param(stdlib_encoder, id="stdlib")
+    for name, factory in (("orjson", orjson_encoder), ("msgspec", msgspec_encoder)):
+        marks = [] if _installed(name) else [pytest.mark.skip(f"{name} missing")]
+        yield pytest.param(factory, id=name, marks=marks)
+
+
+def _installed(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+
+class TestJSONEncoders:
+    @pytest.mark.parametrize("factory", _encoders())
+    def test_encodes_dtos(self, factory):
+        # Arrange
+        encode = factory()
+        clicked_at = datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.UTC)
+        content = {
+            "page": URLMappingPageSchema.model_construct(
+                items=[
+                    URLMappingSchema.model_construct(
+                        short_code="abc123", original_url="https://example.com/ü"
+                    )
+                ],
+                next_cursor=None,
+            ),
+            "stats": ClickStatsSchema(
+                short_code="abc123", clicks=2, last_clicked_at=clicked_at
+            ),
+        }
+
+        # Act
+        result = encode(content)
+
+        # Assert
+        assert isinstance(result, bytes)
+        decoded = json.loads(result)
+        last_clicked_at = decoded["stats"].pop("last_clicked_at")
+        assert datetime.datetime.fromisoformat(last_clicked_at) == clicked_at
+        assert decoded == {
+            "page": {
+                "items": [
+                    {"short_code": "abc123", "original_url": "https://example.com/ü"}
+                ],
+                "next_cursor": None,
+            },
+            "stats": {
+                "short_code": "abc123",
+                "clicks": 2,
+                "first_clicked_at": None,
+            },
+        }
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            datetime.datetime(2025, 1, 2, 3, 4, 5, 6, tzinfo=datetime.UTC),
+            datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            datetime.datetime(
+                2025,
+                1,
+                2,
+                3,
+                4,
+                5,
+                tzinfo=datetime.timezone(datetime.timedelta(hours=2)),
+            ),
+        ],
+    )
+    def test_encoders_agree_on_datetimes(self, value):
+        # Arrange
+        encoders = [param.values[0]() for param in _encoders() if not param.marks]
+        content = ClickStatsSchema(
+            short_code="abc123", clicks=1, first_clicked_at=value
+        )
+
+        # Act
+        results = {encode(content) for encode in encoders}
+
+        # Assert
+        assert results == {content.model_dump_json().encode()}
+
+    @pytest.mark.parametrize("factory", _encoders())
+    def test_rejects_unknown_types(self, factory):
+        # Act & Assert
+        with pytest.raises(TypeError):
+            factory()({"value": object()})
+
+    def test_falls_back_to_stdlib(self, monkeypatch):
+        # Arrange
+        monkeypatch.setattr(config, "JSON_ENCODER", "msgspec")
+        monkeypatch.setitem(sys.modules, "msgspec", None)
+
+        # Act
+        encode = create_json_encoder(config)
+
+        # Assert
+        assert encode({"a": "ü"}) == '{"a":"ü"}'.encode()
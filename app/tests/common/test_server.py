@@ -0,0 +1,52 @@
+import pytest
+
+from app.common.config import config
+from app.common.server import available_cpus, cpu_quota, worker_count
+
+
+@pytest.fixture
+def cgroup_v2(tmp_path):
+    def limit(cpu_max: str):
+        (tmp_path / "cpu.max").write_text(cpu_max)
+        return tmp_path
+
+    return limit
+
+
+class TestCPUQuota:
+    def test_cgroup_v2(self, cgroup_v2):
+        assert cpu_quota(cgroup_v2("150000 100000\n")) == 1.5
+
+    def test_cgroup_v2_unlimited(self, cgroup_v2):
+        assert cpu_quota(cgroup_v2("max 100000\n")) is None
+
+    def test_cgroup_v1(self, tmp_path):
+        # Arrange
+        (tmp_path / "cpu").mkdir()
+        (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("200000\n")
+        (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+
+        # Act & Assert
+        assert cpu_quota(tmp_path) == 2.0
+
+    def test_no_cgroup(self, tmp_path):
+        assert cpu_quota(tmp_path) is None
+
+
+class TestWorkerCount:
+    def test_bounded_by_quota(self, cgroup_v2, monkeypatch):
+        # Arrange
+        monkeypatch.setattr("os.sched_getaffinity", lambda pid: set(range(8)))
+
+        # Act & Assert
+        assert available_cpus(cgroup_v2("150000 100000")) == 2
+        assert available_cpus(cgroup_v2("10000 100000")) == 1
+        assert available_cpus(cgroup_v2("max 100000")) == 8
+
+    def test_web_concurrency(self, cgroup_v2):
+        # Arrange
+        configured = config.model_copy(update={"WEB_CONCURRENCY": 3})
+
+        # Act & Assert
+        assert worker_count(configured, cgroup_v2("100000 100000")) == 3
+        assert worker_count(config, cgroup_v2("100000 100000")) == 1
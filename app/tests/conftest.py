@@ -14,11 +14,24 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import Session, sessionmaker
 from testcontainers.postgres import PostgresContainer
 
+from app.common.cache import TTLCache
+from app.common.cache_backends import InMemoryCacheBackend
+from app.common.config import config
 from app.common.db import Base
+from app.common.replicas import ReplicaSet
 from app.main import app
-from app.models import URLMapping
-from app.url.repositories import AsyncURLMappingRepository
+from app.models import URLClickCounter, URLLookup, URLMapping
+from app.models.urls import url_digest
+from app.url.cache import URLLookupCache
+from app.url.clicks import ClickTracker
+from app.url.filter import URLMappingFilter
+from app.url.repositories import (
+    AsyncClickCounterRepository,
+    AsyncpgURLMappingRepository,
+    AsyncURLMappingRepository,
+)
 from app.url.services.url_service import URLMappingService
+from app.url.short_codes import RandomShortCodeGenerator
 
 postgres = PostgresContainer("postgres:16-alpine", dbname="test")
 
@@ -82,19 +95,70 @@ def db_session(sync_db_engine) -> Generator[sessionmaker[Session], None, None]:
     yield session
 
 
-@pytest_asyncio.fixture(scope="function")
-async def repository(async_db_session: async_sessionmaker[AsyncSession]):
-    return AsyncURLMappingRepository(async_db_session)
+@pytest.fixture
+def replica_set() -> ReplicaSet:
+    return ReplicaSet()
+
+
+@pytest_asyncio.fixture(
+    scope="function",
+    params=[AsyncURLMappingRepository, AsyncpgURLMappingRepository],
+    ids=["orm", "asyncpg"],
+)
+async def repository(
+    request,
+    async_db_session: async_sessionmaker[AsyncSession],
+    replica_set: ReplicaSet,
+):
+    return request.param(async_db_session, replica_set)
 
 
 @pytest.fixture(scope="session")
 def mock_url_repository() -> AsyncMock:
-    return AsyncMock(spec=AsyncURLMappingRepository)
+    repository = AsyncMock(spec=AsyncURLMappingRepository)
+    repository.with_session.return_value = repository
+    return repository
+
+
+@pytest.fixture
+def mock_click_repository() -> AsyncMock:
+    return AsyncMock(spec=AsyncClickCounterRepository)
+
+
+@pytest.fixture
+def click_tracker(mock_click_repository) -> ClickTracker:
+    return ClickTracker(mock_click_repository, maxsize=10, spill_maxsize=2)
+
+
+@pytest.fixture
+def cache_backend() -> InMemoryCacheBackend:
+    return InMemoryCacheBackend()
+
+
+@pytest.fixture
+def url_cache(cache_backend) -> URLLookupCache:
+    return URLLookupCache(
+        local=TTLCache(maxsize=100, ttl=60),
+        backend=cache_backend,
+        ttl=60,
+        negative_ttl=5,
+    )
+
+
+@pytest.fixture
+def url_filter(mock_url_repository) -> URLMappingFilter:
+    return URLMappingFilter(mock_url_repository, capacity=100)
 
 
 @pytest.fixture
-def service(mock_url_repository):
-    return URLMappingService(url_repository=mock_url_repository)
+def service(mock_url_repository, url_cache, mock_click_repository, url_filter):
+    return URLMappingService(
+        url_repository=mock_url_repository,
+        url_cache=url_cache,
+        short_code_generator=RandomShortCodeGenerator(config.SHORT_CODE_LENGTH),
+        click_repository=mock_click_repository,
+        url_filter=url_filter,
+    )
 
 
 @pytest.fixture
@@ -109,6 +173,8 @@ def mock_url_service():
 async def clean_db(async_db_engine):
     async with async_db_engine.begin() as conn:
         await conn.execute(URLMapping.__table__.delete())  # type: ignore
+        await conn.execute(URLLookup.__table__.delete())  # type: ignore
+        await conn.execute(URLClickCounter.__table__.delete())  # type: ignore
     yield
 
 
@@ -124,6 +190,12 @@ async def sample_url_mappings(
         ]
         for mapping in url_mappings:
             session.add(mapping)
+            session.add(
+                URLLookup(
+                    url_hash=url_digest(mapping.original_url),
+                    short_code=mapping.short_code,
+                )
+            )
         await session.commit()
 
         for mapping in url_mappings:
@@ -0,0 +1,44 @@
+import datetime
+
+import pytest
+import pytest_asyncio
+
+from app.url.repositories import AsyncClickCounterRepository, ClickCount
+
+
+def at(minute: int) -> datetime.datetime:
+    return datetime.datetime(2024, 1, 1, 12, minute, tzinfo=datetime.UTC)
+
+
+@pytest_asyncio.fixture
+async def click_repository(async_db_session, replica_set):
+    return AsyncClickCounterRepository(async_db_session, replica_set)
+
+
+@pytest.mark.asyncio
+class TestAsyncClickCounterRepository:
+    async def test_increment_many(self, click_repository, clean_db):
+        # Act
+        await click_repository.increment_many(
+            {
+                "abc123": ClickCount(2, at(10), at(20)),
+                "def456": ClickCount(1, at(5), at(5)),
+            }
+        )
+        await click_repository.increment_many({"abc123": ClickCount(3, at(1), at(15))})
+
+        # Assert
+        counter = await click_repository.get_by_short_code("abc123")
+        assert counter is not None
+        assert counter.clicks == 5
+        assert counter.first_clicked_at == at(1)
+        assert counter.last_clicked_at == at(20)
+        other = await click_repository.get_by_short_code("def456")
+        assert other is not None and other.clicks == 1
+
+    async def test_get_by_short_code_not_clicked(self, click_repository, clean_db):
+        # Act
+        result = await click_repository.get_by_short_code("abc123")
+
+        # Assert
+        assert result is None
@@ -1,8 +1,22 @@
+import asyncio
+import datetime
 import uuid
+from unittest.mock import Mock
 
 import pytest
+from sqlalchemy import func, select
 
-from app.models import URLMapping
+from app.common.config import config
+from app.models import URLClickCounter, URLMapping
+from app.models.urls import url_digest
+from app.url.errors import Duplicate
+from app.url.repositories import (
+    AsyncpgURLMappingRepository,
+    AsyncURLMappingRepository,
+    URLMappingRecord,
+    URLTarget,
+    get_url_repository,
+)
 
 
 @pytest.mark.asyncio
@@ -29,6 +43,20 @@ class TestAsyncURLMappingRepository:
         # Assert
         assert result is None
 
+    async def test_url_hash_matches_database_digest(
+        self, async_db_session, sample_url_mappings
+    ):
+        # Act
+        async with async_db_session() as session:
+            stmt = select(
+                URLMapping.url_hash
+                == func.sha256(func.convert_to(URLMapping.original_url, "UTF8"))
+            )
+            result = (await session.execute(stmt)).scalars().all()
+
+        # Assert
+        assert result == [True] * len(sample_url_mappings)
+
     async def test_get_by_short_code_existing(self, repository, sample_url_mappings):
         # Arrange
         short_code = "def456"
@@ -51,8 +79,37 @@ class TestAsyncURLMappingRepository:
         # Assert
         assert result is None
 
+    async def test_get_target(self, repository, sample_url_mappings):
+        # Act
+        result = await repository.get_target("ghi789")
+
+        # Assert
+        assert result == URLTarget("https://another.com")
+
+    async def test_get_target_not_existing(self, repository, clean_db):
+        # Act
+        result = await repository.get_target("nonexistent")
+
+        # Assert
+        assert result is None
+
     # Data from AsyncBaseRepository tests
 
+    async def test_with_session(
+        self, repository, async_db_session, sample_url_mappings
+    ):
+        # Arrange
+        broken = repository.with_session(Mock(side_effect=RuntimeError("closed")))
+
+        # Act
+        result = await broken.with_session(async_db_session).get_target("abc123")
+
+        # Assert
+        assert result == URLTarget("https://example.com")
+        assert type(broken) is type(repository)
+        with pytest.raises(RuntimeError):
+            await broken.get_target("abc123")
+
     async def test_get_existing(self, repository, sample_url_mappings):
         # Arrange
         url_mapping = sample_url_mappings[0]
@@ -89,6 +146,70 @@ class TestAsyncURLMappingRepository:
         result_page3 = await repository.get_all(page=3, limit=2)
         assert len(result_page3) == 0
 
+    async def test_get_page(self, repository, sample_url_mappings):
+        # Act
+        first_page = await repository.get_page(limit=2)
+        second_page = await repository.get_page(limit=2, after_id=first_page[-1].id)
+
+        # Assert
+        assert [m.short_code for m in first_page] == ["abc123", "def456"]
+        assert [m.short_code for m in second_page] == ["ghi789"]
+
+    async def test_stream_all(self, repository, sample_url_mappings):
+        # Act
+        result = [mapping async for mapping in repository.stream_all(batch_size=2)]
+
+        # Assert
+        assert [m.short_code for m in result] == ["abc123", "def456", "ghi789"]
+
+    async def test_stream_hottest_by_clicks(
+        self, repository, async_db_session, sample_url_mappings
+    ):
+        # Arrange
+        now = datetime.datetime.now(datetime.UTC)
+        async with async_db_session.begin() as session:
+            session.add_all(
+                URLClickCounter(
+                    short_code=short_code,
+                    clicks=clicks,
+                    first_clicked_at=now,
+                    last_clicked_at=now,
+                )
+                for short_code, clicks in [("abc123", 5), ("ghi789", 9)]
+            )
+
+        # Act
+        result = [pair async for pair in repository.stream_hottest(10, "clicks")]
+
+        # Assert
+        assert result == [
+            ("ghi789", URLTarget("https://another.com")),
+            ("abc123", URLTarget("https://example.com")),
+        ]
+
+    async def test_stream_hottest_recent(self, repository, sample_url_mappings):
+        # Act
+        result = [pair async for pair in repository.stream_hottest(2, "recent")]
+
+        # Assert
+        assert result == [
+            ("ghi789", URLTarget("https://another.com")),
+            ("def456", URLTarget("https://test.com")),
+        ]
+
+    async def test_stream_keys(self, repository, sample_url_mappings):
+        # Arrange
+        first = sample_url_mappings[0]
+
+        # Act
+        result = [row async for row in repository.stream_keys(first.id)]
+
+        # Assert
+        assert result == [
+            (mapping.id, mapping.short_code, url_digest(mapping.original_url))
+            for mapping in sample_url_mappings[1:]
+        ]
+
     async def test_add(self, repository, clean_db):
         # Arrange
         unique_url = f"https://new-example-{uuid.uuid4()}.com"
@@ -148,3 +269,230 @@ class TestAsyncURLMappingRepository:
             "unique constraint" in str(exc_info.value).lower()
             or "duplicate key" in str(exc_info.value).lower()
         )
+
+    async def test_next_short_code_block(self, repository):
+        # Act
+        first = await repository.next_short_code_block()
+        second = await repository.next_short_code_block()
+
+        # Assert
+        assert second > first
+
+    async def test_upsert_new_url(self, repository, clean_db):
+        # Act
+        result = await repository.upsert("https://new.com", "new123")
+
+        # Assert
+        assert result == "new123"
+        retrieved = await repository.get_by_url("https://new.com")
+        assert retrieved is not None
+        assert retrieved.short_code == "new123"
+
+    async def test_upsert_existing_url(self, repository, sample_url_mappings):
+        # Act
+        result = await repository.upsert("https://example.com", "other1")
+
+        # Assert
+        assert result == "abc123"
+        assert await repository.get_by_short_code("other1") is None
+
+    async def test_upsert_taken_short_code(self, repository, sample_url_mappings):
+        # Act & Assert
+        with pytest.raises(Duplicate):
+            await repository.upsert("https://unique-url.com", "abc123")
+        assert await repository.get_by_url("https://unique-url.com") is None
+
+    async def test_upsert_concurrent_same_url(self, repository, clean_db):
+        # Act
+        results = await asyncio.gather(
+            *(repository.upsert("https://race.com", f"race{i}") for i in range(5))
+        )
+
+        # Assert
+        assert len(set(results)) == 1
+
+    async def test_get_by_urls(self, repository, sample_url_mappings):
+        # Act
+        result = await repository.get_by_urls(
+            ["https://example.com", "https://test.com", "https://nonexistent.com"]
+        )
+
+        # Assert
+        assert {mapping.short_code for mapping in result} == {"abc123", "def456"}
+
+    async def test_get_by_short_codes(self, repository, sample_url_mappings):
+        # Act
+        result = await repository.get_by_short_codes(["abc123", "ghi789", "missing"])
+
+        # Assert
+        assert {mapping.original_url for mapping in result} == {
+            "https://example.com",
+            "https://another.com",
+        }
+
+    async def test_insert_many_skips_conflicts(self, repository, sample_url_mappings):
+        # Act
+        result = await repository.insert_many(
+            {
+                "https://new.com": "new123",
+                "https://example.com": "new456",
+                "https://other.com": "abc123",
+            }
+        )
+
+        # Assert
+        assert result == {"https://new.com": "new123"}
+        retrieved = await repository.get_by_short_code("new123")
+        assert retrieved is not None
+        assert retrieved.original_url == "https://new.com"
+
+    async def test_insert_many_retries_taken_short_code(
+        self, repository, sample_url_mappings
+    ):
+        # Arrange
+        await repository.insert_many({"https://other.com": "abc123"})
+
+        # Act
+        result = await repository.insert_many({"https://other.com": "new789"})
+
+        # Assert
+        assert result == {"https://other.com": "new789"}
+        retrieved = await repository.get_by_url("https://other.com")
+        assert retrieved is not None
+        assert retrieved.short_code == "new789"
+
+    async def test_delete_frees_url(self, repository, sample_url_mappings):
+        # Act
+        await repository.delete(sample_url_mappings[0])
+
+        # Assert
+        assert await repository.get_by_url("https://example.com") is None
+        assert await repository.upsert("https://example.com", "new123") == "new123"
+
+    async def test_expired_not_found(self, repository, clean_db):
+        # Arrange
+        now = datetime.datetime.now(datetime.UTC)
+        await repository.insert_many(
+            {"https://old.com": "old123"}, now - datetime.timedelta(seconds=1)
+        )
+        await repository.insert_many(
+            {"https://new.com": "new123"}, now + datetime.timedelta(hours=1)
+        )
+
+        # Act
+        expired = await repository.get_target("old123")
+        mappings = await repository.get_by_short_codes(["old123", "new123"])
+
+        # Assert
+        assert expired is None
+        assert await repository.get_by_short_code("old123") is None
+        assert [m.short_code for m in mappings] == ["new123"]
+        assert await repository.get_target("new123") == URLTarget(
+            "https://new.com", now + datetime.timedelta(hours=1)
+        )
+
+    async def test_expired_not_listed(self, repository, clean_db):
+        # Arrange
+        now = datetime.datetime.now(datetime.UTC)
+        await repository.insert_many({"https://a.com": "live123"})
+        await repository.insert_many(
+            {"https://old.com": "old123"}, now - datetime.timedelta(seconds=1)
+        )
+        await repository.insert_many(
+            {"https://new.com": "new123"}, now + datetime.timedelta(hours=1)
+        )
+
+        # Act
+        page = await repository.get_page(limit=10)
+        streamed = [mapping async for mapping in repository.stream_all()]
+
+        # Assert
+        assert [m.short_code for m in page] == ["live123", "new123"]
+        assert [m.short_code for m in streamed] == ["live123", "new123"]
+
+    async def test_insert_many_expiring_not_deduplicated(
+        self, repository, sample_url_mappings
+    ):
+        # Arrange
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=1)
+
+        # Act
+        result = await repository.insert_many(
+            {"https://example.com": "exp123"}, expires_at
+        )
+
+        # Assert
+        assert result == {"https://example.com": "exp123"}
+        mapping = await repository.get_by_url("https://example.com")
+        assert mapping is not None and mapping.short_code == "abc123"
+
+    async def test_purge_expired(self, repository, async_db_session, clean_db):
+        # Arrange
+        now = datetime.datetime.now(datetime.UTC)
+        expired = {f"https://old.com/{i}": f"old{i}" for i in range(3)}
+        await repository.insert_many(expired, now - datetime.timedelta(seconds=1))
+        await repository.insert_many(
+            {"https://new.com": "new123"}, now + datetime.timedelta(hours=1)
+        )
+        await repository.upsert("https://kept.com", "kept123")
+        async with async_db_session.begin() as session:
+            session.add(
+                URLClickCounter(
+                    short_code="old0",
+                    clicks=1,
+                    first_clicked_at=now,
+                    last_clicked_at=now,
+                )
+            )
+
+        # Act
+        first = await repository.purge_expired(batch_size=2)
+        second = await repository.purge_expired(batch_size=2)
+        third = await repository.purge_expired(batch_size=2)
+
+        # Assert
+        assert (first, second, third) == (2, 1, 0)
+        async with async_db_session() as session:
+            short_codes = await session.scalars(
+                select(URLMapping.short_code).order_by(URLMapping.short_code)
+            )
+            assert short_codes.all() == ["kept123", "new123"]
+            assert await session.get(URLClickCounter, "old0") is None
+        assert await repository.get_by_url("https://kept.com") is not None
+
+
+@pytest.mark.asyncio
+class TestAsyncpgURLMappingRepository:
+    async def test_returns_records(
+        self, async_db_session, replica_set, sample_url_mappings
+    ):
+        # Arrange
+        repository = AsyncpgURLMappingRepository(async_db_session, replica_set)
+        expected = sample_url_mappings[0]
+
+        # Act
+        result = await repository.get_by_short_code(expected.short_code)
+
+        # Assert
+        assert isinstance(result, URLMappingRecord)
+        assert (result.id, result.original_url, result.url_hash) == (
+            expected.id,
+            expected.original_url,
+            expected.url_hash,
+        )
+
+    @pytest.mark.parametrize(
+        "setting, repository_class",
+        [("orm", AsyncURLMappingRepository), ("asyncpg", AsyncpgURLMappingRepository)],
+    )
+    async def test_selected_by_config(
+        self, monkeypatch, async_db_session, replica_set, setting, repository_class
+    ):
+        # Arrange
+        monkeypatch.setattr(config, "URL_REPOSITORY", setting)
+
+        # Act
+        repository = get_url_repository(async_db_session, replica_set)
+
+        # Assert
+        assert type(repository) is repository_class
@@ -0,0 +1,90 @@
+import pytest
+
+from app.url.clicks import ClickTracker
+
+
+@pytest.mark.asyncio
+class TestClickTracker:
+    async def test_flush_aggregates_clicks(self, click_tracker, mock_click_repository):
+        # Arrange
+        for short_code in ["abc123", "def456", "abc123"]:
+            click_tracker.record(short_code)
+
+        # Act
+        await click_tracker.flush()
+
+        # Assert
+        (counts,) = mock_click_repository.increment_many.call_args.args
+        assert {code: count.clicks for code, count in counts.items()} == {
+            "abc123": 2,
+            "def456": 1,
+        }
+        assert click_tracker.stats.flushed == 3
+
+    async def test_flush_in_batches(self, mock_click_repository):
+        # Arrange
+        click_tracker = ClickTracker(mock_click_repository, batch_size=2)
+        for short_code in ["abc123", "def456", "ghi789"]:
+            click_tracker.record(short_code)
+
+        # Act
+        await click_tracker.flush()
+
+        # Assert
+        assert mock_click_repository.increment_many.call_count == 2
+
+    async def test_drop_when_full(self, mock_click_repository):
+        # Arrange
+        click_tracker = ClickTracker(mock_click_repository, maxsize=1, overflow="drop")
+
+        # Act
+        click_tracker.record("abc123")
+        click_tracker.record("abc123")
+
+        # Assert
+        assert click_tracker.stats.recorded == 1
+        assert click_tracker.stats.dropped == 1
+
+    async def test_spill_when_full(self, mock_click_repository):
+        # Arrange
+        click_tracker = ClickTracker(
+            mock_click_repository, maxsize=1, overflow="spill", spill_maxsize=1
+        )
+
+        # Act
+        for short_code in ["abc123", "abc123", "abc123", "def456"]:
+            click_tracker.record(short_code)
+        await click_tracker.flush()
+
+        # Assert
+        assert click_tracker.stats.spilled == 2
+        assert click_tracker.stats.dropped == 1
+        (counts,) = mock_click_repository.increment_many.call_args.args
+        assert counts["abc123"].clicks == 3
+
+    async def test_failed_flush_is_retried(self, click_tracker, mock_click_repository):
+        # Arrange
+        click_tracker.record("abc123")
+        mock_click_repository.increment_many.side_effect = ConnectionError
+
+        # Act
+        await click_tracker.flush()
+        mock_click_repository.increment_many.side_effect = None
+        click_tracker.record("abc123")
+        await click_tracker.flush()
+
+        # Assert
+        (counts,) = mock_click_repository.increment_many.call_args.args
+        assert counts["abc123"].clicks == 2
+        assert click_tracker.stats.flush_errors == 1
+
+    async def test_disabled(self, mock_click_repository):
+        # Arrange
+        click_tracker = ClickTracker(mock_click_repository, enabled=False)
+
+        # Act
+        click_tracker.record("abc123")
+        await click_tracker.flush()
+
+        # Assert
+        mock_click_repository.increment_many.assert_not_called()
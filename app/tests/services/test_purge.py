@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.url import purge as purge_module
+from app.url.purge import ExpiredURLPurger
+from app.url.repositories import AsyncURLMappingRepository
+
+
+@pytest.fixture
+def repository() -> AsyncMock:
+    return AsyncMock(spec=AsyncURLMappingRepository)
+
+
+@pytest.mark.asyncio
+class TestExpiredURLPurger:
+    async def test_purge(self, repository):
+        # Arrange
+        repository.purge_expired.return_value = 3
+        purger = ExpiredURLPurger(repository, batch_size=10)
+
+        # Act
+        purged = await purger.purge()
+
+        # Assert
+        assert purged == 3
+        repository.purge_expired.assert_called_once_with(10)
+        assert purger.stats.purged == 3
+        assert purger.stats.batches == 1
+
+    async def test_full_batches_rate_limited(self, repository):
+        # Arrange
+        purger = ExpiredURLPurger(
+            repository, interval=60.0, batch_size=100, max_rate=1000.0
+        )
+
+        # Act & Assert
+        assert purger.delay(100) == 0.1
+        assert purger.delay(99) == 60.0
+
+    async def test_failure_retried_after_interval(self, repository, monkeypatch):
+        # Arrange
+        repository.purge_expired.side_effect = ConnectionRefusedError()
+        purger = ExpiredURLPurger(repository, interval=60.0)
+        delays = []
+
+        async def stop(delay):
+            delays.append(delay)
+            raise asyncio.CancelledError()
+
+        monkeypatch.setattr(purge_module.asyncio, "sleep", stop)
+
+        # Act
+        with pytest.raises(asyncio.CancelledError):
+            await purger.run()
+
+        # Assert
+        assert purger.stats.errors == 1
+        assert delays == [60.0]
+
+    async def test_disabled(self, repository):
+        # Arrange
+        purger = ExpiredURLPurger(repository, enabled=False)
+
+        # Act & Assert
+        assert purger.start() is None
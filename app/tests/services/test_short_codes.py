@@ -0,0 +1,91 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.url.short_codes import ALPHABET, BlockShortCodeGenerator
+
+
+def decode(code: str) -> int:
+    value = 0
+    for char in code:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    return value
+
+
+@pytest.mark.asyncio
+class TestBlockShortCodeGenerator:
+    async def test_codes_are_unique_and_fixed_length(self):
+        # Arrange
+        generator = BlockShortCodeGenerator(length=6, block_size=100, key="secret")
+        lease = AsyncMock(side_effect=[1, 2, 3])
+
+        # Act
+        codes = [await generator.generate(lease) for _ in range(250)]
+
+        # Assert
+        assert len(set(codes)) == 250
+        assert all(len(code) == 6 for code in codes)
+        assert all(c in ALPHABET for code in codes for c in code)
+        assert lease.await_count == 3
+
+    async def test_blocks_from_different_workers_do_not_overlap(self):
+        # Arrange
+        first = BlockShortCodeGenerator(length=4, block_size=10, key="secret")
+        second = BlockShortCodeGenerator(length=4, block_size=10, key="secret")
+
+        # Act
+        first_codes = {
+            await first.generate(AsyncMock(return_value=1)) for _ in range(10)
+        }
+        second_codes = {
+            await second.generate(AsyncMock(return_value=2)) for _ in range(10)
+        }
+
+        # Assert
+        assert not first_codes & second_codes
+
+    async def test_encode_is_a_permutation(self):
+        # Arrange
+        generator = BlockShortCodeGenerator(length=2, block_size=1, key="secret")
+
+        # Act
+        codes = {generator.encode(i) for i in range(len(ALPHABET) ** 2)}
+
+        # Assert
+        assert len(codes) == len(ALPHABET) ** 2
+
+    async def test_codes_depend_on_key(self):
+        # Arrange
+        first = BlockShortCodeGenerator(length=6, block_size=1, key="secret")
+        second = BlockShortCodeGenerator(length=6, block_size=1, key="other")
+
+        # Act
+        first_codes = [first.encode(i) for i in range(1000, 1005)]
+        second_codes = [second.encode(i) for i in range(1000, 1005)]
+
+        # Assert
+        assert not set(first_codes) & set(second_codes)
+        values = [decode(code) for code in first_codes]
+        steps = {(b - a) % len(ALPHABET) ** 6 for a, b in zip(values, values[1:])}
+        assert len(steps) > 1
+
+    async def test_encode_raises_when_space_is_exhausted(self):
+        # Arrange
+        generator = BlockShortCodeGenerator(length=1, block_size=1, key="secret")
+
+        # Act & Assert
+        with pytest.raises(OverflowError):
+            generator.encode(len(ALPHABET))
+
+    async def test_reset_drops_leased_block(self):
+        # Arrange
+        generator = BlockShortCodeGenerator(length=6, block_size=100, key="secret")
+        lease = AsyncMock(side_effect=[1, 2])
+        await generator.generate(lease)
+
+        # Act
+        generator.reset()
+        await generator.generate(lease)
+
+        # Assert
+        assert lease.await_count == 2
@@ -0,0 +1,174 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models.urls import url_digest
+from app.url import filter as url_filter_module
+from app.url.filter import URLMappingFilter
+from app.url.repositories import AsyncURLMappingRepository
+
+ROWS = [(i, f"code{i}", url_digest(f"https://example.com/{i}")) for i in range(1, 4)]
+
+
+def stream(rows, reads):
+    async def stream_keys(after_id, batch_size):
+        reads.append(after_id)
+        for row in rows:
+            if row[0] > after_id:
+                yield row
+
+    return stream_keys
+
+
+@pytest.fixture
+def reads() -> list[int]:
+    return []
+
+
+@pytest.fixture
+def repository(reads) -> AsyncMock:
+    repository = AsyncMock(spec=AsyncURLMappingRepository)
+    repository.stream_keys = stream(ROWS, reads)
+    return repository
+
+
+@pytest.mark.asyncio
+class TestURLMappingFilter:
+    async def test_might_contain_everything_until_synced(self, repository):
+        # Arrange
+        url_filter = URLMappingFilter(repository, capacity=100)
+
+        # Act & Assert
+        assert url_filter.might_contain_short_code("unknown")
+        assert url_filter.might_contain_url("https://unknown.com/")
+
+    async def test_sync(self, repository):
+        # Arrange
+        url_filter = URLMappingFilter(repository, capacity=100)
+
+        # Act
+        await url_filter.sync()
+        url_filter.ready = True
+
+        # Assert
+        assert url_filter.synced_id == 3
+        assert url_filter.might_contain_short_code("code1")
+        assert url_filter.might_contain_url("https://example.com/2")
+        assert not url_filter.might_contain_short_code("unknown")
+        assert not url_filter.might_contain_url("https://unknown.com/")
+        assert url_filter.stats.short_codes_rejected == 1
+        assert url_filter.stats.urls_rejected == 1
+
+    async def test_sync_reads_again_for_overlap(self, repository, reads):
+        # Arrange
+        now = 0.0
+        url_filter = URLMappingFilter(
+            repository, capacity=100, sync_overlap=10, clock=lambda: now
+        )
+
+        # Act
+        for now in (0, 5, 10, 15):
+            await url_filter.sync()
+
+        # Assert
+        assert reads == [0, 0, 0, 3]
+
+    async def test_sync_finds_rows_committed_late(self, reads):
+        # Arrange
+        rows = list(ROWS)
+        repository = AsyncMock(spec=AsyncURLMappingRepository)
+        repository.stream_keys = stream(rows, reads)
+        now = 0.0
+        url_filter = URLMappingFilter(
+            repository, capacity=100, sync_overlap=10, clock=lambda: now
+        )
+        await url_filter.sync()
+        # Id 4 taken first, but committed after id 50_000
+        rows.append((50_000, "code50000", url_digest("https://example.com/50000")))
+        now = 5
+        await url_filter.sync()
+        rows.append((4, "late4", url_digest("https://example.com/4")))
+
+        # Act
+        now = 10
+        await url_filter.sync()
+        url_filter.ready = True
+
+        # Assert
+        assert url_filter.might_contain_short_code("late4")
+        assert url_filter.synced_id == 50_000
+
+    async def test_add(self, repository):
+        # Arrange
+        url_filter = URLMappingFilter(repository, capacity=100)
+        url_filter.ready = True
+
+        # Act
+        url_filter.add("new1", "https://new.com/")
+
+        # Assert
+        assert url_filter.might_contain_short_code("new1")
+        assert url_filter.might_contain_url("https://new.com/")
+
+    async def test_sync_failure_fails_open(self, repository, monkeypatch):
+        # Arrange
+        async def failing(*args):
+            raise ConnectionRefusedError()
+            yield
+
+        url_filter = URLMappingFilter(repository, capacity=100)
+        await url_filter.sync()
+        url_filter.ready = True
+        repository.stream_keys = failing
+
+        async def stop(delay):
+            raise asyncio.CancelledError()
+
+        monkeypatch.setattr(url_filter_module.asyncio, "sleep", stop)
+
+        # Act
+        with pytest.raises(asyncio.CancelledError):
+            await url_filter.run()
+
+        # Assert
+        assert not url_filter.ready
+        assert url_filter.stats.sync_errors == 1
+        assert url_filter.might_contain_short_code("unknown")
+
+    async def test_snapshot(self, repository, reads, tmp_path):
+        # Arrange
+        path = str(tmp_path / "url_filter.bin")
+        url_filter = URLMappingFilter(
+            repository, capacity=100, snapshot_path=path, sync_overlap=0
+        )
+        await url_filter.sync()
+        url_filter.ready = True
+        await url_filter.save_snapshot()
+        restarted = URLMappingFilter(repository, capacity=100, snapshot_path=path)
+
+        # Act
+        restarted.load_snapshot()
+        await restarted.sync()
+        restarted.ready = True
+
+        # Assert
+        assert reads == [0, 3]
+        assert restarted.might_contain_short_code("code3")
+        assert not restarted.might_contain_short_code("unknown")
+
+    async def test_snapshot_of_other_settings_ignored(self, repository, tmp_path):
+        # Arrange
+        path = str(tmp_path / "url_filter.bin")
+        url_filter = URLMappingFilter(repository, capacity=100, snapshot_path=path)
+        await url_filter.sync()
+        url_filter.ready = True
+        await url_filter.save_snapshot()
+        resized = URLMappingFilter(repository, capacity=1000, snapshot_path=path)
+
+        # Act
+        resized.load_snapshot()
+
+        # Assert
+        assert resized.bloom.count == 0
+        assert resized.synced_id == 0
@@ -1,12 +1,16 @@
+import asyncio
+import datetime
 import string
 from unittest.mock import patch
 
 import pytest
 
 from app.common.config import config
-from app.models import URLMapping
+from app.common.db import database
+from app.models import URLClickCounter, URLMapping
 from app.url.dto.url_dto import OriginalURLSchema, ShortURLSchema
-from app.url.errors import Missing
+from app.url.errors import Duplicate, Invalid, Missing
+from app.url.repositories import URLTarget
 from app.url.services.url_service import URL_PATH
 
 
@@ -15,10 +19,7 @@ class TestURLMappingService:
     async def test_get_original_url_existing(self, service, mock_url_repository):
         # Arrange
         short_code = "abc123"
-        url_mapping = URLMapping(
-            id=1, original_url="https://example.com", short_code=short_code
-        )
-        mock_url_repository.get_by_short_code.return_value = url_mapping
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
 
         # Act
         result = await service.get_original_url(short_code)
@@ -26,27 +27,102 @@ class TestURLMappingService:
         # Assert
         assert isinstance(result, OriginalURLSchema)
         assert str(result.original_url) == "https://example.com/"
-        mock_url_repository.get_by_short_code.assert_called_with(short_code=short_code)
+        mock_url_repository.get_target.assert_called_with(short_code)
 
     async def test_get_original_url_not_existing(self, service, mock_url_repository):
         # Arrange
         short_code = "nonexistent"
-        mock_url_repository.get_by_short_code.return_value = None
+        mock_url_repository.get_target.return_value = None
 
         # Act & Assert
         with pytest.raises(Missing) as exc_info:
             await service.get_original_url(short_code)
 
         assert "Short code not found" in str(exc_info.value)
-        mock_url_repository.get_by_short_code.assert_called_with(short_code=short_code)
+        mock_url_repository.get_target.assert_called_with(short_code)
+
+    async def test_get_original_url_served_from_cache(
+        self, service, mock_url_repository
+    ):
+        # Arrange
+        short_code = "cached1"
+        mock_url_repository.get_target.reset_mock()
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        await service.get_original_url(short_code)
+        result = await service.get_original_url(short_code)
+
+        # Assert
+        assert str(result.original_url) == "https://example.com/"
+        mock_url_repository.get_target.assert_called_once_with(short_code)
+
+    async def test_get_original_url_caches_missing(
+        self, service, mock_url_repository, url_cache
+    ):
+        # Arrange
+        short_code = "missing1"
+        mock_url_repository.get_target.reset_mock()
+        mock_url_repository.get_target.return_value = None
+
+        # Act & Assert
+        for _ in range(2):
+            with pytest.raises(Missing):
+                await service.get_original_url(short_code)
+
+        mock_url_repository.get_target.assert_called_once_with(short_code)
+        assert url_cache.local.get(short_code) is None
+
+    async def test_get_original_url_read_through_shared_cache(
+        self, service, mock_url_repository, cache_backend
+    ):
+        # Arrange
+        short_code = "shared1"
+        mock_url_repository.get_target.reset_mock()
+        await cache_backend.set(short_code, "https://example.com/", ttl=60)
+
+        # Act
+        result = await service.get_original_url(short_code)
+
+        # Assert
+        assert str(result.original_url) == "https://example.com/"
+        mock_url_repository.get_target.assert_not_called()
+
+    async def test_get_original_url_coalesces_concurrent_misses(
+        self, service, mock_url_repository
+    ):
+        # Arrange
+        short_code = "viral1"
+        mock_url_repository.get_target.reset_mock()
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        results = await asyncio.gather(
+            *(service.get_original_url(short_code) for _ in range(10))
+        )
+
+        # Assert
+        assert all(str(r.original_url) == "https://example.com/" for r in results)
+        mock_url_repository.get_target.assert_called_once_with(short_code)
+
+    async def test_get_original_url_loads_on_own_session(
+        self, service, mock_url_repository
+    ):
+        # Arrange
+        mock_url_repository.with_session.reset_mock()
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com/")
+
+        # Act
+        await service.get_original_url("own1")
+
+        # Assert
+        mock_url_repository.with_session.assert_called_once_with(database)
 
     async def test_create_short_code_existing_url(self, service, mock_url_repository):
         # Arrange
         original_url = "https://example.com"
-        existing_mapping = URLMapping(
-            id=1, original_url=original_url, short_code="abc123"
-        )
-        mock_url_repository.get_by_url.return_value = existing_mapping
+        mock_url_repository.upsert.reset_mock()
+        mock_url_repository.upsert.return_value = "abc123"
 
         # Act
         result = await service.create_short_code(original_url)
@@ -54,24 +130,23 @@ class TestURLMappingService:
         # Assert
         assert isinstance(result, ShortURLSchema)
         assert str(result.short_url) == f"{URL_PATH}abc123"
-        mock_url_repository.get_by_url.assert_called_with(original_url)
+        mock_url_repository.upsert.assert_called_once()
+        assert mock_url_repository.upsert.call_args[0][0] == original_url
         mock_url_repository.add.assert_not_called()
 
     @patch(
         "app.url.services.url_service.URLMappingService._URLMappingService__create_short_code"  # noqa: E501
     )
     async def test_create_short_code_new_url(
-        self, mock_create_short_code, service, mock_url_repository
+        self, mock_create_short_code, service, mock_url_repository, cache_backend
     ):
         # Arrange
         original_url = "https://newexample.com"
         short_code = "xyz789"
-        mock_url_repository.get_by_url.return_value = None
-        mock_url_repository.get_by_short_code.return_value = None
         mock_create_short_code.return_value = short_code
-
-        new_mapping = URLMapping(id=2, original_url=original_url, short_code=short_code)
-        mock_url_repository.add.return_value = new_mapping
+        mock_url_repository.get_by_short_code.reset_mock()
+        mock_url_repository.upsert.reset_mock()
+        mock_url_repository.upsert.return_value = short_code
 
         # Act
         result = await service.create_short_code(original_url)
@@ -79,16 +154,14 @@ class TestURLMappingService:
         # Assert
         assert isinstance(result, ShortURLSchema)
         assert str(result.short_url) == f"{URL_PATH}{short_code}"
-        mock_url_repository.get_by_url.assert_called_with(original_url)
-        mock_url_repository.get_by_short_code.assert_called_with(short_code)
-        mock_url_repository.add.assert_called_once()
-        added_mapping = mock_url_repository.add.call_args[0][0]
-        assert added_mapping.original_url == original_url
-        assert added_mapping.short_code == short_code
+        mock_url_repository.upsert.assert_called_once_with(original_url, short_code)
+        mock_url_repository.get_by_url.assert_not_called()
+        mock_url_repository.get_by_short_code.assert_not_called()
+        assert await cache_backend.get(short_code) == original_url
 
-    def test_create_short_code_method(self, service):
+    async def test_create_short_code_method(self, service):
         # Act
-        short_code = service._URLMappingService__create_short_code()
+        short_code = await service._URLMappingService__create_short_code()
 
         # Assert
         assert isinstance(short_code, str)
@@ -96,3 +169,305 @@ class TestURLMappingService:
 
         allowed_chars = set(string.ascii_letters + string.digits)
         assert all(c in allowed_chars for c in short_code)
+
+    async def test_create_short_code_retries_collisions(
+        self, service, mock_url_repository
+    ):
+        # Arrange
+        mock_url_repository.upsert.reset_mock()
+        mock_url_repository.upsert.side_effect = [
+            Duplicate(message="Short code already exists."),
+            Duplicate(message="Short code already exists."),
+            "xyz789",
+        ]
+
+        # Act
+        result = await service.create_short_code("https://newexample.com")
+
+        # Assert
+        assert str(result.short_url) == f"{URL_PATH}xyz789"
+        assert mock_url_repository.upsert.call_count == 3
+        mock_url_repository.upsert.side_effect = None
+
+    async def test_create_short_code_gives_up_after_max_attempts(
+        self, service, mock_url_repository
+    ):
+        # Arrange
+        mock_url_repository.upsert.side_effect = Duplicate(
+            message="Short code already exists."
+        )
+
+        # Act & Assert
+        with pytest.raises(Duplicate):
+            await service.create_short_code("https://newexample.com")
+
+        mock_url_repository.upsert.side_effect = None
+
+    async def test_create_short_codes(self, service, mock_url_repository, url_cache):
+        # Arrange
+        mock_url_repository.get_by_urls.return_value = [
+            URLMapping(id=1, original_url="https://example.com/", short_code="abc123")
+        ]
+        mock_url_repository.insert_many.reset_mock()
+        mock_url_repository.insert_many.side_effect = lambda mappings, expires_at: dict(
+            mappings
+        )
+
+        # Act
+        result = await service.create_short_codes(
+            ["https://new.com/", "https://example.com/", "https://new.com/"]
+        )
+
+        # Assert
+        assert [str(r.original_url) for r in result] == [
+            "https://new.com/",
+            "https://example.com/",
+            "https://new.com/",
+        ]
+        assert str(result[1].short_url) == f"{URL_PATH}abc123"
+        assert result[0].short_url == result[2].short_url
+        mock_url_repository.insert_many.assert_called_once()
+        assert list(mock_url_repository.insert_many.call_args[0][0]) == [
+            "https://new.com/"
+        ]
+        short_code = str(result[0].short_url).removeprefix(URL_PATH)
+        assert url_cache.local.get(short_code) == URLTarget("https://new.com/")
+        mock_url_repository.insert_many.side_effect = None
+
+    async def test_get_original_urls(
+        self, service, mock_url_repository, url_cache, cache_backend
+    ):
+        # Arrange
+        await url_cache.set("local1", "https://local.com/")
+        await cache_backend.set("shared1", "https://shared.com/", ttl=60)
+        mock_url_repository.get_by_short_codes.reset_mock()
+        mock_url_repository.get_by_short_codes.return_value = [
+            URLMapping(id=1, original_url="https://example.com/", short_code="abc123")
+        ]
+
+        # Act
+        result = await service.get_original_urls(
+            ["abc123", "local1", "missing", "shared1", "abc123"]
+        )
+
+        # Assert
+        assert [r.short_code for r in result] == [
+            "abc123",
+            "local1",
+            "missing",
+            "shared1",
+            "abc123",
+        ]
+        assert [r.original_url and str(r.original_url) for r in result] == [
+            "https://example.com/",
+            "https://local.com/",
+            None,
+            "https://shared.com/",
+            "https://example.com/",
+        ]
+        mock_url_repository.get_by_short_codes.assert_called_once_with(
+            ["abc123", "missing"]
+        )
+        assert url_cache.local.get("abc123") == URLTarget("https://example.com/")
+        assert url_cache.local.get("missing") is None
+
+    async def test_filter_rejects_unknown_short_codes(
+        self, service, mock_url_repository, url_filter
+    ):
+        # Arrange
+        url_filter.ready = True
+        url_filter.add("abc123", "https://example.com/")
+        mock_url_repository.get_target.reset_mock()
+        mock_url_repository.get_by_short_codes.reset_mock()
+        mock_url_repository.get_by_short_codes.return_value = []
+
+        # Act
+        with pytest.raises(Missing):
+            await service.get_original_url("unknown1")
+        await service.get_original_urls(["unknown2", "abc123"])
+
+        # Assert
+        mock_url_repository.get_target.assert_not_called()
+        mock_url_repository.get_by_short_codes.assert_called_once_with(["abc123"])
+
+    async def test_filter_skips_lookup_of_new_urls(
+        self, service, mock_url_repository, url_filter
+    ):
+        # Arrange
+        url_filter.ready = True
+        mock_url_repository.get_by_urls.reset_mock()
+        mock_url_repository.insert_many.side_effect = lambda mappings, expires_at: dict(
+            mappings
+        )
+
+        # Act
+        result = await service.create_short_codes(["https://new.com/"])
+
+        # Assert
+        mock_url_repository.get_by_urls.assert_not_called()
+        short_code = str(result[0].short_url).removeprefix(URL_PATH)
+        assert url_filter.might_contain_short_code(short_code)
+        assert url_filter.might_contain_url("https://new.com/")
+        mock_url_repository.insert_many.side_effect = None
+
+    async def test_create_short_code_added_to_filter(
+        self, service, mock_url_repository, url_filter
+    ):
+        # Arrange
+        url_filter.ready = True
+        mock_url_repository.upsert.return_value = "xyz789"
+
+        # Act
+        await service.create_short_code("https://newexample.com/")
+
+        # Assert
+        assert url_filter.might_contain_short_code("xyz789")
+
+    async def test_create_short_code_expiring(
+        self, service, mock_url_repository, url_cache
+    ):
+        # Arrange
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+            seconds=10
+        )
+        mock_url_repository.upsert.reset_mock()
+        mock_url_repository.insert_many.side_effect = lambda mappings, expires_at: dict(
+            mappings
+        )
+
+        # Act
+        result = await service.create_short_code("https://campaign.com/", expires_at)
+
+        # Assert
+        assert result.expires_at == expires_at
+        mock_url_repository.upsert.assert_not_called()
+        assert mock_url_repository.insert_many.call_args[0][1] == expires_at
+        short_code = str(result.short_url).removeprefix(URL_PATH)
+        _, cached_until = url_cache.local._data[short_code]
+        assert cached_until <= url_cache.local._clock() + 10
+        mock_url_repository.insert_many.side_effect = None
+
+    async def test_get_original_url_cached_until_expiry(
+        self, service, mock_url_repository, url_cache, cache_backend
+    ):
+        # Arrange
+        expires_at = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+            seconds=10
+        )
+        mock_url_repository.get_target.return_value = URLTarget(
+            "https://campaign.com/", expires_at
+        )
+
+        # Act
+        await service.get_original_url("expiring1")
+        url_cache.local.clear()
+        mock_url_repository.get_target.reset_mock()
+        result = await service.get_original_url("expiring1")
+
+        # Assert
+        assert str(result.original_url) == "https://campaign.com/"
+        mock_url_repository.get_target.assert_not_called()
+        # Read back from the shared backend, with its expiry
+        _, cached_until = url_cache.local._data["expiring1"]
+        assert cached_until <= url_cache.local._clock() + 10
+
+    async def test_expired_target_not_cached(
+        self, service, mock_url_repository, url_cache, cache_backend
+    ):
+        # Arrange
+        expires_at = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+            seconds=1
+        )
+        mock_url_repository.get_target.return_value = URLTarget(
+            "https://campaign.com/", expires_at
+        )
+
+        # Act
+        with (
+            patch.object(cache_backend, "set") as backend_set,
+            patch.object(cache_backend, "set_many") as backend_set_many,
+        ):
+            await service.get_original_url("expired1")
+            await url_cache.set("expired2", "https://campaign.com/", expires_at)
+
+        # Assert
+        assert "expired1" not in url_cache.local._data
+        backend_set.assert_not_called()
+        backend_set_many.assert_not_called()
+
+    async def test_list_url_mappings(self, service, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_page.return_value = [
+            URLMapping(id=1, original_url="https://example.com", short_code="abc123"),
+            URLMapping(id=2, original_url="https://test.com", short_code="def456"),
+        ]
+
+        # Act
+        page = await service.list_url_mappings(limit=1)
+
+        # Assert
+        assert [item.short_code for item in page.items] == ["abc123"]
+        assert page.next_cursor is not None
+        mock_url_repository.get_page.assert_called_with(2, None)
+
+        await service.list_url_mappings(limit=1, cursor=page.next_cursor)
+        mock_url_repository.get_page.assert_called_with(2, 1)
+
+    async def test_list_url_mappings_last_page(self, service, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_page.return_value = [
+            URLMapping(id=1, original_url="https://example.com", short_code="abc123")
+        ]
+
+        # Act
+        page = await service.list_url_mappings(limit=1)
+
+        # Assert
+        assert page.next_cursor is None
+
+    async def test_list_url_mappings_invalid_cursor(self, service):
+        # Act & Assert
+        with pytest.raises(Invalid):
+            await service.list_url_mappings(limit=1, cursor="not-a-cursor")
+
+    async def test_get_click_stats(
+        self, service, mock_url_repository, mock_click_repository
+    ):
+        # Arrange
+        clicked_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com")
+        mock_click_repository.get_by_short_code.return_value = URLClickCounter(
+            short_code="clicks1",
+            clicks=3,
+            first_clicked_at=clicked_at,
+            last_clicked_at=clicked_at,
+        )
+
+        # Act
+        result = await service.get_click_stats("clicks1")
+
+        # Assert
+        assert result.clicks == 3
+        assert result.last_clicked_at == clicked_at
+
+    async def test_get_click_stats_not_clicked(
+        self, service, mock_url_repository, mock_click_repository
+    ):
+        # Arrange
+        mock_url_repository.get_target.return_value = URLTarget("https://example.com")
+        mock_click_repository.get_by_short_code.return_value = None
+
+        # Act
+        result = await service.get_click_stats("clicks2")
+
+        # Assert
+        assert result.clicks == 0
+        assert result.first_clicked_at is None
+
+    async def test_get_click_stats_missing(self, service, mock_url_repository):
+        # Arrange
+        mock_url_repository.get_target.return_value = None
+
+        # Act & Assert
+        with pytest.raises(Missing):
+            await service.get_click_stats("clicks3")
@@ -0,0 +1,92 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.common import healthcheck
+from app.url.repositories import AsyncURLMappingRepository, URLTarget
+from app.url.warmup import CacheWarmer, entry_size
+
+HOTTEST = [(f"code{i}", URLTarget(f"https://example.com/{i}")) for i in range(5)]
+
+
+def stream(rows):
+    async def stream_hottest(limit, order, batch_size):
+        for row in rows[:limit]:
+            yield row
+
+    return stream_hottest
+
+
+@pytest.fixture
+def repository() -> AsyncMock:
+    repository = AsyncMock(spec=AsyncURLMappingRepository)
+    repository.stream_hottest = stream(HOTTEST)
+    return repository
+
+
+@pytest.mark.asyncio
+class TestCacheWarmer:
+    async def test_preloads_hottest_most_recently_used(self, url_cache, repository):
+        # Arrange
+        warmer = CacheWarmer(url_cache, repository, limit=3)
+
+        # Act
+        await warmer.run()
+
+        # Assert
+        assert warmer.stats.loaded == 3
+        assert list(url_cache.local._data) == ["code2", "code1", "code0"]
+        assert url_cache.local.get("code0") == URLTarget("https://example.com/0")
+
+    async def test_stops_at_memory_budget(self, url_cache, repository):
+        # Arrange
+        budget = sum(
+            entry_size(code, target.original_url) for code, target in HOTTEST[:2]
+        )
+        warmer = CacheWarmer(url_cache, repository, memory_budget=budget)
+
+        # Act
+        await warmer.run()
+
+        # Assert
+        assert warmer.stats.loaded == 2
+        assert warmer.stats.size <= budget
+        assert "code2" not in url_cache.local._data
+
+    async def test_reports_warming_until_done(self, url_cache, repository):
+        # Arrange
+        warmer = CacheWarmer(url_cache, repository)
+
+        # Act
+        task = warmer.start()
+        warming = set(healthcheck.warming)
+        assert task is not None
+        await task
+
+        # Assert
+        assert warming == {"url_cache"}
+        assert healthcheck.warming == set()
+
+    async def test_failure_stops_warming(self, url_cache, repository):
+        # Arrange
+        async def failing(*args):
+            raise ConnectionRefusedError()
+            yield
+
+        repository.stream_hottest = failing
+        warmer = CacheWarmer(url_cache, repository)
+
+        # Act
+        await warmer.run()
+
+        # Assert
+        assert healthcheck.warming == set()
+        assert len(url_cache.local) == 0
+
+    async def test_disabled(self, url_cache, repository):
+        # Act
+        task = CacheWarmer(url_cache, repository, order="none").start()
+
+        # Assert
+        assert task is None
+        assert healthcheck.warming == set()
@@ -0,0 +1,263 @@
+import datetime
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import asdict
+from typing import Awaitable, Callable, Generator, Mapping, Sequence
+
+from app.common.cache import MISSING, CacheStats, TTLCache
+from app.common.cache_backends import CacheBackend, create_cache_backend
+from app.common.config import config
+from app.common.healthcheck import Unhealthy, health_monitor
+from app.common.metrics import registry
+from app.common.singleflight import SingleFlight
+from app.url.repositories import URLTarget
+
+logger = logging.getLogger(__name__)
+
+# Stored in the shared backend for short codes known not to exist
+NEGATIVE = ""
+
+
+class URLLookupCache:
+    """
+    Read-through cache for short_code -> URLTarget lookups.
+
+    Lookups go through the in-process cache first, then the shared backend and
+    finally the loader. Concurrent misses for the same short code share one
+    load. Unavailable shared backends are logged and skipped. Entries of
+    expiring URLs are cached until they expire at the latest.
+    """
+
+    def __init__(
+        self,
+        local: TTLCache[str, URLTarget | None],
+        backend: CacheBackend,
+        ttl: float,
+        negative_ttl: float,
+    ):
+        self.local = local
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # Hits and misses of the shared backend, local ones are in local.stats
+        self.shared_stats = CacheStats()
+        self._inflight: SingleFlight[str, URLTarget | None] = SingleFlight()
+
+    async def get_or_load(
+        self, short_code: str, loader: Callable[[str], Awaitable[URLTarget | None]]
+    ) -> URLTarget | None:
+        """
+        The loader's result is shared with concurrent callers, so it must not
+        depend on the calling request, e.g. on its session
+        """
+        target = self.local.get(short_code)
+        if target is not MISSING:
+            return target
+
+        return await self._inflight.do(
+            short_code, lambda: self._load(short_code, loader)
+        )
+
+    async def get_many_or_load(
+        self,
+        short_codes: Sequence[str],
+        loader: Callable[[list[str]], Awaitable[Mapping[str, URLTarget]]],
+    ) -> dict[str, URLTarget | None]:
+        """
+        Batched read-through: local hits, then one backend round trip, then a
+        single loader call for the rest. Loaded results, including misses,
+        are written back to both tiers.
+        """
+        targets: dict[str, URLTarget | None] = {}
+        pending = []
+        for short_code in short_codes:
+            target = self.local.get(short_code)
+            if target is MISSING:
+                pending.append(short_code)
+            else:
+                targets[short_code] = target
+
+        if pending:
+            targets.update(await self._get_many_shared(pending))
+            pending = [code for code in pending if code not in targets]
+
+        if pending:
+            loaded = await loader(pending)
+            loaded_targets = {code: loaded.get(code) for code in pending}
+            await self._store(loaded_targets)
+            targets.update(loaded_targets)
+
+        return targets
+
+    async def set(
+        self,
+        short_code: str,
+        original_url: str | None,
+        expires_at: datetime.datetime | None = None,
+    ) -> None:
+        target = URLTarget(original_url, expires_at) if original_url else None
+        ttl = self.entry_ttl(target)
+        self.local.set(short_code, target, ttl=ttl)
+        # Already expired, dropped locally by TTLCache.set
+        if ttl <= 0:
+            return
+
+        try:
+            await self.backend.set(short_code, encode_target(target), ttl)
+        except Exception:
+            logger.warning("Cache backend write failed", exc_info=True)
+
+    async def set_many(
+        self,
+        original_urls: Mapping[str, str | None],
+        expires_at: datetime.datetime | None = None,
+    ) -> None:
+        await self._store(
+            {
+                code: URLTarget(url, expires_at) if url else None
+                for code, url in original_urls.items()
+            }
+        )
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def reset_after_fork(self) -> None:
+        """
+        Cached entries stay valid in a forked child, loads in flight and
+        backend connections belong to the parent
+        """
+        self._inflight = SingleFlight()
+        self.backend.reset_after_fork()
+
+    def entry_ttl(self, target: URLTarget | None) -> float:
+        """
+        Seconds to cache a target for, or a miss for when None
+        """
+        if target is None:
+            return self.negative_ttl
+        if target.expires_at is None:
+            return self.ttl
+        return min(self.ttl, target.expires_at.timestamp() - time.time())
+
+    async def _load(
+        self, short_code: str, loader: Callable[[str], Awaitable[URLTarget | None]]
+    ) -> URLTarget | None:
+        try:
+            cached = await self.backend.get(short_code)
+        except Exception:
+            logger.warning("Cache backend read failed", exc_info=True)
+            cached = None
+
+        if cached is None:
+            self.shared_stats.misses += 1
+            target = await loader(short_code)
+            await self._store({short_code: target})
+        else:
+            self.shared_stats.hits += 1
+            target = decode_target(cached)
+            self._store_local(short_code, target)
+
+        return target
+
+    async def _get_many_shared(
+        self, short_codes: Sequence[str]
+    ) -> dict[str, URLTarget | None]:
+        try:
+            cached = await self.backend.get_many(short_codes)
+        except Exception:
+            logger.warning("Cache backend read failed", exc_info=True)
+            return {}
+
+        self.shared_stats.hits += len(cached)
+        self.shared_stats.misses += len(short_codes) - len(cached)
+        targets: dict[str, URLTarget | None] = {}
+        for short_code, value in cached.items():
+            target = decode_target(value)
+            self._store_local(short_code, target)
+            targets[short_code] = target
+        return targets
+
+    async def _store(self, targets: Mapping[str, URLTarget | None]) -> None:
+        # Backend writes grouped by TTL, which differ for expiring URLs
+        by_ttl: defaultdict[float, dict[str, str]] = defaultdict(dict)
+        for short_code, target in targets.items():
+            self._store_local(short_code, target)
+            ttl = self.entry_ttl(target)
+            if ttl > 0:
+                by_ttl[ttl][short_code] = encode_target(target)
+
+        try:
+            for ttl, values in by_ttl.items():
+                await self.backend.set_many(values, ttl)
+        except Exception:
+            logger.warning("Cache backend write failed", exc_info=True)
+
+    def _store_local(self, short_code: str, target: URLTarget | None) -> None:
+        self.local.set(short_code, target, ttl=self.entry_ttl(target))
+
+
+def encode_target(target: URLTarget | None) -> str:
+    """
+    Shared backend value of a target. Expiring ones are prefixed with their
+    expiry timestamp, so workers reading them bound their local TTL too.
+    Normalized URLs contain no spaces.
+    """
+    if target is None:
+        return NEGATIVE
+    if target.expires_at is None:
+        return target.original_url
+    return f"{target.expires_at.timestamp()} {target.original_url}"
+
+
+def decode_target(value: str) -> URLTarget | None:
+    if not value:
+        return None
+    if " " not in value:
+        return URLTarget(value)
+    timestamp, original_url = value.split(" ", 1)
+    expires_at = datetime.datetime.fromtimestamp(float(timestamp), datetime.UTC)
+    return URLTarget(original_url, expires_at)
+
+
+url_cache = URLLookupCache(
+    local=TTLCache(maxsize=config.URL_CACHE_MAXSIZE, ttl=config.URL_CACHE_TTL),
+    backend=create_cache_backend(config),
+    ttl=config.URL_CACHE_TTL,
+    negative_ttl=config.URL_CACHE_NEGATIVE_TTL,
+)
+os.register_at_fork(after_in_child=url_cache.reset_after_fork)
+
+
+registry.gauges(
+    "url_cache",
+    "Short code lookup cache usage",
+    lambda: {
+        "size": len(url_cache.local),
+        "local_hit_ratio": url_cache.local.stats.hit_ratio,
+        "shared_hit_ratio": url_cache.shared_stats.hit_ratio,
+    },
+)
+registry.counters(
+    "url_cache",
+    "Short code lookup cache hits, misses and removals since startup",
+    lambda: {
+        **{f"local_{k}": v for k, v in asdict(url_cache.local.stats).items()},
+        **{f"shared_{k}": v for k, v in asdict(url_cache.shared_stats).items()},
+    },
+)
+
+
+async def check_cache_backend() -> None:
+    if not await url_cache.backend.ping():
+        raise Unhealthy("cache backend did not answer ping")
+
+
+# The URLs are still served from the database without it
+health_monitor.add_check("cache", check_cache_backend, critical=False)
+
+
+def get_url_cache() -> Generator[URLLookupCache, None, None]:
+    yield url_cache
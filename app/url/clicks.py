@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import logging
+from dataclasses import asdict, dataclass
+from typing import Generator, Literal
+
+from app.common.config import Config, config
+from app.common.db import database
+from app.common.metrics import registry
+from app.common.replicas import replica_set
+from app.url.repositories import AsyncClickCounterRepository, ClickCount
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClickTrackerStats:
+    recorded: int = 0
+    # Queue full, counted straight into the spill buffer instead
+    spilled: int = 0
+    # Queue and spill buffer full, lost
+    dropped: int = 0
+    flushed: int = 0
+    flush_errors: int = 0
+
+
+class ClickTracker:
+    """
+    Counts redirects off the request path.
+
+    record() only enqueues the click. A background task drains the bounded
+    queue every `flush_interval` seconds, aggregates the clicks per short code
+    and adds them to the counters table in batched upserts. When the queue is
+    full, clicks are dropped, or with the "spill" policy aggregated into a
+    buffer bounded to `spill_maxsize` short codes. Failed flushes are kept
+    in that buffer and retried, clicks beyond it are dropped.
+    """
+
+    def __init__(
+        self,
+        repository: AsyncClickCounterRepository,
+        maxsize: int = 100_000,
+        flush_interval: float = 1.0,
+        batch_size: int = 1000,
+        overflow: Literal["drop", "spill"] = "spill",
+        spill_maxsize: int = 100_000,
+        enabled: bool = True,
+    ):
+        self.repository = repository
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.spill_maxsize = spill_maxsize
+        self.stats = ClickTrackerStats()
+        self._queue: asyncio.Queue[tuple[str, datetime.datetime]] = asyncio.Queue(
+            maxsize
+        )
+        self._spill: dict[str, ClickCount] = {}
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() + sum(count.clicks for count in self._spill.values())
+
+    def record(self, short_code: str) -> None:
+        if not self.enabled:
+            return None
+
+        clicked_at = datetime.datetime.now(datetime.UTC)
+        try:
+            self._queue.put_nowait((short_code, clicked_at))
+        except asyncio.QueueFull:
+            if self.overflow == "spill" and self._add(
+                self._spill, short_code, ClickCount(1, clicked_at, clicked_at)
+            ):
+                self.stats.spilled += 1
+            else:
+                self.stats.dropped += 1
+            return None
+
+        self.stats.recorded += 1
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        counts, self._spill = self._spill, {}
+        while not self._queue.empty():
+            short_code, clicked_at = self._queue.get_nowait()
+            self._add(counts, short_code, ClickCount(1, clicked_at, clicked_at))
+
+        batch: dict[str, ClickCount] = {}
+        for short_code, count in counts.items():
+            batch[short_code] = count
+            if len(batch) >= self.batch_size:
+                await self._write(batch)
+                batch = {}
+        await self._write(batch)
+
+    async def _write(self, batch: dict[str, ClickCount]) -> None:
+        if not batch:
+            return None
+
+        try:
+            await self.repository.increment_many(batch)
+        except Exception:
+            self.stats.flush_errors += 1
+            logger.warning("Click counter flush failed", exc_info=True)
+            for short_code, count in batch.items():
+                if not self._add(self._spill, short_code, count):
+                    self.stats.dropped += count.clicks
+            return None
+
+        self.stats.flushed += sum(count.clicks for count in batch.values())
+
+    def _add(
+        self, counts: dict[str, ClickCount], short_code: str, count: ClickCount
+    ) -> bool:
+        if short_code in counts:
+            counts[short_code].merge(count)
+        elif counts is self._spill and len(counts) >= self.spill_maxsize:
+            return False
+        else:
+            counts[short_code] = count
+        return True
+
+
+def create_click_tracker(config: Config) -> ClickTracker:
+    return ClickTracker(
+        AsyncClickCounterRepository(database, replica_set),
+        maxsize=config.CLICK_QUEUE_MAXSIZE,
+        flush_interval=config.CLICK_FLUSH_INTERVAL,
+        batch_size=config.CLICK_FLUSH_BATCH_SIZE,
+        overflow=config.CLICK_OVERFLOW_POLICY,
+        spill_maxsize=config.CLICK_SPILL_MAXSIZE,
+        enabled=config.CLICK_TRACKING,
+    )
+
+
+click_tracker = create_click_tracker(config)
+registry.counters(
+    "click_tracker",
+    "Clicks recorded, spilled, dropped and flushed since startup",
+    lambda: asdict(click_tracker.stats),
+)
+registry.gauges(
+    "click_tracker",
+    "Clicks waiting to be flushed",
+    lambda: {"queued": click_tracker.queued},
+)
+
+
+def get_click_tracker() -> Generator[ClickTracker, None, None]:
+    yield click_tracker
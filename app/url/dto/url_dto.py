@@ -1,13 +1,69 @@
-from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+import datetime
+from typing import Annotated
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, HttpUrl, TypeAdapter
+
+_http_url_adapter: TypeAdapter[HttpUrl] = TypeAdapter(HttpUrl)
+
+
+def _normalize_url(url: str) -> str:
+    return str(_http_url_adapter.validate_python(url))
+
+
+# Validated and normalized like HttpUrl when a DTO is built normally. DTOs of
+# URLs the app stored or built itself skip that with model_construct().
+URL = Annotated[
+    str,
+    Field(max_length=2083, json_schema_extra={"format": "uri"}),
+    AfterValidator(_normalize_url),
+]
 
 
 class ShortURLSchema(BaseModel):
-    short_url: HttpUrl = Field(..., max_length=2083)
+    short_url: URL
+    expires_at: datetime.datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
 class OriginalURLSchema(BaseModel):
-    original_url: HttpUrl = Field(..., max_length=2083)
+    original_url: URL
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BulkShortURLSchema(BaseModel):
+    original_url: URL
+    short_url: URL
+    expires_at: datetime.datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ResolvedURLSchema(BaseModel):
+    short_code: str
+    original_url: URL | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class URLMappingSchema(BaseModel):
+    short_code: str
+    original_url: URL
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class URLMappingPageSchema(BaseModel):
+    items: list[URLMappingSchema]
+    # Pass as `cursor` to fetch the next page, null on the last page
+    next_cursor: str | None
+
+
+class ClickStatsSchema(BaseModel):
+    short_code: str
+    clicks: int = 0
+    first_clicked_at: datetime.datetime | None = None
+    last_clicked_at: datetime.datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
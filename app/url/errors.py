@@ -12,3 +12,11 @@ class Missing(Exception):
 
     def __str__(self) -> str:
         return self.message
+
+
+class Invalid(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __str__(self) -> str:
+        return self.message
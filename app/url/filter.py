@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from typing import Callable, Generator
+
+from app.common.bloom import BloomFilter
+from app.common.config import Config, config
+from app.common.db import database
+from app.common.metrics import registry
+from app.common.replicas import replica_set
+from app.models.urls import url_digest
+from app.url.repositories import AsyncURLMappingRepository
+
+logger = logging.getLogger(__name__)
+
+# Magic and the id the snapshot is synced up to
+_SNAPSHOT_HEADER = struct.Struct("<4sQ")
+_SNAPSHOT_MAGIC = b"URF1"
+
+
+def short_code_key(short_code: str) -> bytes:
+    return b"c:" + short_code.encode()
+
+
+def url_hash_key(url_hash: bytes) -> bytes:
+    return b"u:" + url_hash
+
+
+@dataclass
+class URLFilterStats:
+    short_codes_rejected: int = 0
+    urls_rejected: int = 0
+    synced: int = 0
+    sync_errors: int = 0
+
+
+class URLMappingFilter:
+    """
+    Bloom filter over the existing short codes and URL hashes, telling apart
+    lookups that can't match any URL mapping without a database round trip.
+
+    Starts from the snapshot at `snapshot_path` when there is one, then syncs
+    the rows inserted since in the background, and every `sync_interval`
+    seconds afterwards. Inserts made through this worker are added right
+    away, rows inserted elsewhere only on the next sync. Until a sync
+    succeeds, and after one fails, everything might exist.
+
+    Ids are taken on insert but rows only become visible on commit, so they
+    can show up below the highest id synced. Every sync therefore reads from
+    the highest id seen by the last sync started `sync_overlap` seconds ago
+    or earlier: rows are found as long as they become visible within about
+    `sync_overlap - sync_interval` seconds of taking their id.
+    """
+
+    def __init__(
+        self,
+        repository: AsyncURLMappingRepository,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.01,
+        sync_interval: float = 5.0,
+        sync_overlap: float = 60.0,
+        batch_size: int = 1000,
+        snapshot_path: str | None = None,
+        snapshot_interval: float = 300.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.repository = repository
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.batch_size = batch_size
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.enabled = enabled
+        self.clock = clock
+        self.ready = False
+        self.stats = URLFilterStats()
+        # A short code and a URL hash per mapping
+        self.bloom = BloomFilter(2 * capacity if enabled else 0, error_rate)
+        # Highest id synced, and the id the next sync reads from
+        self.synced_id = 0
+        self.settled_id = 0
+        # When recent syncs started, and the highest id synced by then
+        self._history: deque[tuple[float, int]] = deque()
+
+    def might_contain_short_code(self, short_code: str) -> bool:
+        if not self.ready or short_code_key(short_code) in self.bloom:
+            return True
+        self.stats.short_codes_rejected += 1
+        return False
+
+    def might_contain_url(self, original_url: str) -> bool:
+        if not self.ready or url_hash_key(url_digest(original_url)) in self.bloom:
+            return True
+        self.stats.urls_rejected += 1
+        return False
+
+    def add(self, short_code: str, original_url: str) -> None:
+        self.bloom.add(short_code_key(short_code))
+        self.bloom.add(url_hash_key(url_digest(original_url)))
+
+    def start(self) -> asyncio.Task[None] | None:
+        if not self.enabled:
+            return None
+
+        self.load_snapshot()
+        return asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        snapshot_at = time.monotonic()
+        while True:
+            try:
+                await self.sync()
+            except Exception:
+                self.ready = False
+                self.stats.sync_errors += 1
+                logger.warning("URL filter sync failed", exc_info=True)
+            else:
+                if not self.ready:
+                    logger.info(
+                        "URL filter synced up to id %d, about %d keys",
+                        self.synced_id,
+                        self.bloom.count,
+                    )
+                self.ready = True
+
+            if self.ready and time.monotonic() - snapshot_at >= self.snapshot_interval:
+                await self.save_snapshot()
+                snapshot_at = time.monotonic()
+
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self) -> None:
+        started = self.clock()
+        synced_id = self.synced_id
+        rows = self.repository.stream_keys(self.settled_id, self.batch_size)
+        async with aclosing(rows):
+            async for row_id, short_code, url_hash in rows:
+                self.bloom.add(short_code_key(short_code))
+                self.bloom.add(url_hash_key(url_hash))
+                synced_id = max(synced_id, row_id)
+                self.stats.synced += 1
+
+        self.synced_id = synced_id
+        self._history.append((started, synced_id))
+        settled_before = started - self.sync_overlap
+        while len(self._history) > 1 and self._history[1][0] <= settled_before:
+            self._history.popleft()
+        # Rows taking their id after that sync started have higher ids
+        if self._history[0][0] <= settled_before:
+            self.settled_id = self._history[0][1]
+
+    def load_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return None
+
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                data = memoryview(file.read())
+        except FileNotFoundError:
+            return None
+
+        try:
+            settled_id, bloom = _parse_snapshot(data)
+        except ValueError:
+            logger.warning("Ignored URL filter snapshot %s", self.snapshot_path)
+            return None
+
+        if (bloom.capacity, bloom.error_rate) != (
+            self.bloom.capacity,
+            self.bloom.error_rate,
+        ):
+            logger.info("URL filter settings changed, ignored its snapshot")
+            return None
+
+        self.bloom = bloom
+        self.synced_id = self.settled_id = settled_id
+        logger.info("Loaded URL filter snapshot up to id %d", settled_id)
+
+    async def save_snapshot(self) -> None:
+        """
+        Writes the filter as of its last sync, replacing the previous
+        snapshot atomically
+        """
+        if not self.snapshot_path or not self.ready:
+            return None
+
+        data = _SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, self.settled_id)
+        data += self.bloom.to_bytes()
+        try:
+            await asyncio.to_thread(_write_atomically, self.snapshot_path, data)
+        except OSError:
+            logger.warning("URL filter snapshot failed", exc_info=True)
+
+
+def _parse_snapshot(data: memoryview) -> tuple[int, BloomFilter]:
+    if len(data) < _SNAPSHOT_HEADER.size:
+        raise ValueError("Truncated URL filter snapshot")
+    magic, settled_id = _SNAPSHOT_HEADER.unpack_from(data)
+    if magic != _SNAPSHOT_MAGIC:
+        raise ValueError("Not a URL filter snapshot")
+    return settled_id, BloomFilter.from_bytes(data[_SNAPSHOT_HEADER.size :])
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    # Workers sharing the path each write their own temporary file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def create_url_filter(config: Config) -> URLMappingFilter:
+    return URLMappingFilter(
+        AsyncURLMappingRepository(database, replica_set),
+        capacity=config.URL_FILTER_CAPACITY,
+        error_rate=config.URL_FILTER_ERROR_RATE,
+        sync_interval=config.URL_FILTER_SYNC_INTERVAL,
+        sync_overlap=config.URL_FILTER_SYNC_OVERLAP,
+        batch_size=config.URL_FILTER_BATCH_SIZE,
+        snapshot_path=config.URL_FILTER_SNAPSHOT_PATH,
+        snapshot_interval=config.URL_FILTER_SNAPSHOT_INTERVAL,
+        enabled=config.URL_FILTER,
+    )
+
+
+url_filter = create_url_filter(config)
+registry.gauges(
+    "url_filter",
+    "Bloom filter over existing short codes and URLs",
+    lambda: {
+        "ready": url_filter.ready,
+        "bytes": url_filter.bloom.nbytes,
+        "keys": url_filter.bloom.count,
+        "false_positive_rate": url_filter.bloom.false_positive_rate,
+        "synced_id": url_filter.synced_id,
+    },
+)
+registry.counters(
+    "url_filter",
+    "Lookups rejected by the URL filter and its syncs since startup",
+    lambda: asdict(url_filter.stats),
+)
+
+
+def get_url_filter() -> Generator[URLMappingFilter, None, None]:
+    yield url_filter
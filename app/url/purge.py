@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+
+from app.common.config import Config, config
+from app.common.db import database
+from app.common.metrics import registry
+from app.common.replicas import replica_set
+from app.url.repositories import AsyncURLMappingRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PurgeStats:
+    purged: int = 0
+    batches: int = 0
+    errors: int = 0
+
+
+class ExpiredURLPurger:
+    """
+    Deletes expired URL mappings in the background, `batch_size` rows per
+    transaction so that no DELETE holds its locks for long. Full batches
+    follow each other at no more than `max_rate` rows per second, once fewer
+    are left the next check is `interval` seconds later. Workers purging at
+    the same time skip each other's rows.
+    """
+
+    def __init__(
+        self,
+        repository: AsyncURLMappingRepository,
+        interval: float = 60.0,
+        batch_size: int = 500,
+        max_rate: float = 1000.0,
+        enabled: bool = True,
+    ):
+        self.repository = repository
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_rate = max_rate
+        self.enabled = enabled
+        self.stats = PurgeStats()
+
+    def start(self) -> asyncio.Task[None] | None:
+        if not self.enabled:
+            return None
+
+        return asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                purged = await self.purge()
+            except Exception:
+                purged = 0
+                self.stats.errors += 1
+                logger.warning("Expired URL purge failed", exc_info=True)
+
+            await asyncio.sleep(self.delay(purged))
+
+    async def purge(self) -> int:
+        purged = await self.repository.purge_expired(self.batch_size)
+        self.stats.purged += purged
+        self.stats.batches += 1
+        return purged
+
+    def delay(self, purged: int) -> float:
+        """
+        Seconds to wait after a batch of `purged` rows
+        """
+        if purged < self.batch_size:
+            return self.interval
+        return purged / self.max_rate
+
+
+def create_url_purger(config: Config) -> ExpiredURLPurger:
+    return ExpiredURLPurger(
+        AsyncURLMappingRepository(database, replica_set),
+        interval=config.URL_PURGE_INTERVAL,
+        batch_size=config.URL_PURGE_BATCH_SIZE,
+        max_rate=config.URL_PURGE_MAX_RATE,
+        enabled=config.URL_PURGE,
+    )
+
+
+url_purger = create_url_purger(config)
+registry.counters(
+    "url_purge",
+    "Expired URL mappings deleted since startup",
+    lambda: asdict(url_purger.stats),
+)
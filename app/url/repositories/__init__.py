@@ -1 +1,7 @@
-from .url_repository import AsyncURLMappingRepository
+from .asyncpg_url_repository import (
+    AsyncpgURLMappingRepository,
+    URLMappingRecord,
+    get_url_repository,
+)
+from .click_repository import AsyncClickCounterRepository, ClickCount
+from .url_repository import AsyncURLMappingRepository, URLTarget
@@ -0,0 +1,149 @@
+import datetime
+import time
+from typing import Any, Sequence
+
+import asyncpg
+from fastapi import Depends
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.config import config
+from app.common.db import SessionFactory, get_request_session
+from app.common.metrics import record_query
+from app.common.replicas import ReplicaSet, get_replica_set
+from app.models.urls import url_digest
+from app.url.repositories.url_repository import AsyncURLMappingRepository, URLTarget
+
+# The connection itself is unusable after these, unlike after a failed query
+CONNECTION_ERRORS = (asyncpg.InterfaceError, asyncpg.PostgresConnectionError)
+
+
+class URLMappingRecord:
+    """
+    Read-only url_mappings row, without the ORM instance state of URLMapping
+    """
+
+    __slots__ = ("id", "original_url", "url_hash", "short_code", "expires_at")
+
+    def __init__(
+        self,
+        id: int,
+        original_url: str,
+        url_hash: bytes,
+        short_code: str,
+        expires_at: datetime.datetime | None = None,
+    ):
+        self.id = id
+        self.original_url = original_url
+        self.url_hash = url_hash
+        self.short_code = short_code
+        self.expires_at = expires_at
+
+    def __repr__(self) -> str:
+        return f"URLMappingRecord(id={self.id!r}, short_code={self.short_code!r})"
+
+
+_SELECT = f"SELECT {', '.join(URLMappingRecord.__slots__)} FROM url_mappings"
+_LIVE = "(expires_at IS NULL OR expires_at > now())"
+
+
+class AsyncpgURLMappingRepository(AsyncURLMappingRepository):
+    """
+    Runs the lookups directly on the session's asyncpg connection, skipping
+    statement compilation and ORM hydration. Statements are prepared once per
+    connection by asyncpg's statement cache, see DB_STATEMENT_CACHE_SIZE.
+    Writes and id based methods are inherited from the ORM repository.
+    """
+
+    async def get_by_url(  # type: ignore[override]
+        self, original_url: str
+    ) -> URLMappingRecord | None:
+        url_hash = url_digest(original_url)
+        row = await self._fetch(
+            "fetchrow",
+            f"{_SELECT} WHERE short_code = "
+            "(SELECT short_code FROM url_lookups WHERE url_hash = $1)",
+            [("url_hash", url_hash)],
+            url_hash,
+        )
+        return URLMappingRecord(*row) if row else None
+
+    async def get_by_urls(  # type: ignore[override]
+        self, original_urls: Sequence[str]
+    ) -> list[URLMappingRecord]:
+        url_hashes = [url_digest(original_url) for original_url in original_urls]
+        rows = await self._fetch(
+            "fetch",
+            f"{_SELECT} WHERE short_code = any(array("
+            "SELECT short_code FROM url_lookups WHERE url_hash = any($1::bytea[])))",
+            [("url_hash", url_hash) for url_hash in url_hashes],
+            url_hashes,
+        )
+        return [URLMappingRecord(*row) for row in rows]
+
+    async def get_by_short_code(  # type: ignore[override]
+        self, short_code: str
+    ) -> URLMappingRecord | None:
+        row = await self._fetch(
+            "fetchrow",
+            f"{_SELECT} WHERE short_code = $1 AND {_LIVE}",
+            [("short_code", short_code)],
+            short_code,
+        )
+        return URLMappingRecord(*row) if row else None
+
+    async def get_target(self, short_code: str) -> URLTarget | None:
+        row = await self._fetch(
+            "fetchrow",
+            "SELECT original_url, expires_at FROM url_mappings "
+            f"WHERE short_code = $1 AND {_LIVE}",
+            [("short_code", short_code)],
+            short_code,
+        )
+        return URLTarget(*row) if row else None
+
+    async def get_by_short_codes(  # type: ignore[override]
+        self, short_codes: Sequence[str]
+    ) -> list[URLMappingRecord]:
+        rows = await self._fetch(
+            "fetch",
+            f"{_SELECT} WHERE short_code = any($1::text[]) AND {_LIVE}",
+            [("short_code", short_code) for short_code in short_codes],
+            list(short_codes),
+        )
+        return [URLMappingRecord(*row) for row in rows]
+
+    async def _fetch(
+        self, method: str, sql: str, keys: Sequence[Any], *args: Any
+    ) -> Any:
+        """
+        Calls asyncpg's fetch, fetchrow or fetchval with the statement on the
+        connection of a replica or primary session, see _read
+        """
+
+        async def query(session: AsyncSession) -> Any:
+            conn = await session.connection()
+            raw = await conn.get_raw_connection()
+            started = time.perf_counter()
+            try:
+                return await getattr(raw.driver_connection, method)(sql, *args)
+            except CONNECTION_ERRORS as error:
+                await conn.invalidate(error)
+                raise exc.OperationalError(
+                    sql, args, error, connection_invalidated=True
+                ) from error
+            finally:
+                record_query(time.perf_counter() - started)
+
+        return await self._read(query, keys)
+
+
+def get_url_repository(
+    session: SessionFactory = Depends(get_request_session),
+    replicas: ReplicaSet = Depends(get_replica_set),
+) -> AsyncURLMappingRepository:
+    match config.URL_REPOSITORY:
+        case "asyncpg":
+            return AsyncpgURLMappingRepository(session, replicas)
+        case _:
+            return AsyncURLMappingRepository(session, replicas)
@@ -0,0 +1,75 @@
+import datetime
+from dataclasses import dataclass
+from typing import Mapping
+
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.common.base_repository import AsyncBaseRepository
+from app.common.db import SessionFactory, get_request_session
+from app.common.replicas import ReplicaSet, get_replica_set
+from app.models import URLClickCounter
+
+
+@dataclass
+class ClickCount:
+    clicks: int
+    first_clicked_at: datetime.datetime
+    last_clicked_at: datetime.datetime
+
+    def merge(self, other: "ClickCount") -> None:
+        self.clicks += other.clicks
+        self.first_clicked_at = min(self.first_clicked_at, other.first_clicked_at)
+        self.last_clicked_at = max(self.last_clicked_at, other.last_clicked_at)
+
+
+class AsyncClickCounterRepository(AsyncBaseRepository[URLClickCounter]):
+    def __init__(
+        self,
+        session: SessionFactory = Depends(get_request_session),
+        replicas: ReplicaSet = Depends(get_replica_set),
+    ):
+        super().__init__(URLClickCounter, session, replicas)
+
+    async def get_by_short_code(self, short_code: str) -> URLClickCounter | None:
+        stmt = select(URLClickCounter).where(URLClickCounter.short_code == short_code)
+        return await self._read_scalar(stmt, [("short_code", short_code)])
+
+    async def increment_many(self, counts: Mapping[str, ClickCount]) -> None:
+        """
+        Adds aggregated clicks to the counters with a single multi-row upsert
+        """
+        if not counts:
+            return None
+
+        insert_stmt = insert(URLClickCounter).values(
+            [
+                {
+                    "short_code": short_code,
+                    "clicks": count.clicks,
+                    "first_clicked_at": count.first_clicked_at,
+                    "last_clicked_at": count.last_clicked_at,
+                }
+                # Sorted, so concurrent flushes lock rows in the same order
+                for short_code, count in sorted(counts.items())
+            ]
+        )
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[URLClickCounter.short_code],
+            set_={
+                URLClickCounter.clicks: URLClickCounter.clicks
+                + insert_stmt.excluded.clicks,
+                URLClickCounter.first_clicked_at: func.least(
+                    URLClickCounter.first_clicked_at,
+                    insert_stmt.excluded.first_clicked_at,
+                ),
+                URLClickCounter.last_clicked_at: func.greatest(
+                    URLClickCounter.last_clicked_at,
+                    insert_stmt.excluded.last_clicked_at,
+                ),
+            },
+        )
+
+        async with self._async_session.begin() as session:
+            await session.execute(stmt)
@@ -1,26 +1,376 @@
+import datetime
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Hashable,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Sequence,
+)
+
 from fastapi import Depends
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import (
+    LargeBinary,
+    String,
+    any_,
+    bindparam,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.common.base_repository import AsyncBaseRepository
-from app.common.db import get_async_session
-from app.models import URLMapping
+from app.common.db import SessionFactory, get_request_session
+from app.common.replicas import ReplicaSet, get_replica_set
+from app.models import URLClickCounter, URLLookup, URLMapping
+from app.models.urls import short_code_block_seq, url_digest
+from app.url.errors import Duplicate
+
+
+class URLTarget(NamedTuple):
+    original_url: str
+    expires_at: datetime.datetime | None = None
+
+
+# Expired mappings are gone for lookups before they are purged
+LIVE = or_(URLMapping.expires_at.is_(None), URLMapping.expires_at > func.now())
 
 
 class AsyncURLMappingRepository(AsyncBaseRepository[URLMapping]):
     def __init__(
-        self, session: async_sessionmaker[AsyncSession] = Depends(get_async_session)
+        self,
+        session: SessionFactory = Depends(get_request_session),
+        replicas: ReplicaSet = Depends(get_replica_set),
     ):
-        super().__init__(URLMapping, session)
+        super().__init__(URLMapping, session, replicas)
 
     async def get_by_url(self, original_url: str) -> URLMapping | None:
-        async with self._async_session() as session:
-            stmt = select(URLMapping).where(URLMapping.original_url == original_url)
-            result = await session.execute(stmt)
-            return result.scalars().first()
+        """
+        Non-expiring mapping of the URL, expiring ones have no URLLookup
+        """
+        url_hash = url_digest(original_url)
+        # A subquery rather than a join, so Postgres prunes url_mappings down
+        # to the short code's partition once it is looked up
+        short_code = (
+            select(URLLookup.short_code)
+            .where(URLLookup.url_hash == url_hash)
+            .scalar_subquery()
+        )
+        stmt = select(URLMapping).where(URLMapping.short_code == short_code)
+        return await self._read_scalar(stmt, [("url_hash", url_hash)])
+
+    async def get_by_urls(self, original_urls: Sequence[str]) -> Sequence[URLMapping]:
+        url_hashes = [url_digest(original_url) for original_url in original_urls]
+        short_codes = func.array(
+            select(URLLookup.short_code)
+            .where(
+                URLLookup.url_hash
+                == any_(bindparam("url_hashes", url_hashes, ARRAY(LargeBinary)))
+            )
+            .scalar_subquery(),
+            type_=ARRAY(String),
+        )
+        stmt = select(URLMapping).where(URLMapping.short_code == any_(short_codes))
+        return await self._read_scalars(
+            stmt, [("url_hash", url_hash) for url_hash in url_hashes]
+        )
 
     async def get_by_short_code(self, short_code: str) -> URLMapping | None:
+        stmt = select(URLMapping).where(URLMapping.short_code == short_code, LIVE)
+        return await self._read_scalar(stmt, [("short_code", short_code)])
+
+    async def get_target(self, short_code: str) -> URLTarget | None:
+        stmt = select(URLMapping.original_url, URLMapping.expires_at).where(
+            URLMapping.short_code == short_code, LIVE
+        )
+        row = await self._read_first(stmt, [("short_code", short_code)])
+        return URLTarget(*row) if row else None
+
+    async def get_by_short_codes(
+        self, short_codes: Sequence[str]
+    ) -> Sequence[URLMapping]:
+        stmt = select(URLMapping).where(
+            URLMapping.short_code
+            == any_(bindparam("short_codes", short_codes, ARRAY(String))),
+            LIVE,
+        )
+        return await self._read_scalars(
+            stmt, [("short_code", short_code) for short_code in short_codes]
+        )
+
+    async def get_page(
+        self, limit: int, after_id: int | None = None
+    ) -> Sequence[URLMapping]:
+        """
+        As AsyncBaseRepository.get_page, without expired rows
+        """
+        stmt = select(URLMapping).where(LIVE).order_by(URLMapping.id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(URLMapping.id > after_id)
+        return await self._read_scalars(stmt)
+
+    async def stream_all(self, batch_size: int = 1000) -> AsyncIterator[URLMapping]:
+        """
+        As AsyncBaseRepository.stream_all, without expired rows
+        """
+        stmt = select(URLMapping).where(LIVE).order_by(URLMapping.id)
+        async for (mapping,) in self._stream(stmt, batch_size):
+            yield mapping
+
+    async def stream_hottest(
+        self,
+        limit: int,
+        order: Literal["clicks", "recent"] = "clicks",
+        batch_size: int = 1000,
+    ) -> AsyncGenerator[tuple[str, URLTarget], None]:
+        """
+        Yields up to `limit` live short codes and their targets, most clicked
+        or most recently created first
+        """
+        stmt = (
+            select(
+                URLMapping.short_code, URLMapping.original_url, URLMapping.expires_at
+            )
+            .where(LIVE)
+            .limit(limit)
+        )
+        if order == "clicks":
+            stmt = stmt.join(
+                URLClickCounter, URLClickCounter.short_code == URLMapping.short_code
+            ).order_by(URLClickCounter.clicks.desc())
+        else:
+            stmt = stmt.order_by(URLMapping.id.desc())
+
+        async for short_code, original_url, expires_at in self._stream(
+            stmt, batch_size
+        ):
+            yield short_code, URLTarget(original_url, expires_at)
+
+    async def stream_keys(
+        self, after_id: int = 0, batch_size: int = 1000
+    ) -> AsyncGenerator[tuple[int, str, bytes], None]:
+        """
+        Yields (id, short_code, url_hash) of the rows after `after_id`,
+        ordered by id
+        """
+        stmt = (
+            select(URLMapping.id, URLMapping.short_code, URLMapping.url_hash)
+            .where(URLMapping.id > after_id)
+            .order_by(URLMapping.id)
+        )
+        async for row_id, short_code, url_hash in self._stream(stmt, batch_size):
+            yield row_id, short_code, url_hash
+
+    async def next_short_code_block(self) -> int:
+        async with self._async_session() as session:
+            stmt = select(short_code_block_seq.next_value())
+            return (await session.execute(stmt)).scalar_one()
+
+    async def upsert(self, original_url: str, short_code: str) -> str:
+        """
+        Inserts the mapping unless the URL is already shortened and returns the
+        short code the URL is mapped to, in a single round trip.
+
+        Raises Duplicate if the short code is taken by another URL.
+        """
+        url_hash = url_digest(original_url)
+        lookup_stmt = insert(URLLookup).values(url_hash=url_hash, short_code=short_code)
+        # A no-op update instead of DO NOTHING, so RETURNING also yields the
+        # existing row on conflict
+        lookup = (
+            lookup_stmt.on_conflict_do_update(
+                index_elements=[URLLookup.url_hash],
+                set_={URLLookup.url_hash: lookup_stmt.excluded.url_hash},
+            )
+            .returning(URLLookup.short_code)
+            .cte("lookup")
+        )
+        # Only inserted when the lookup is new, in the same statement so both
+        # rows are written or neither
+        mapping = (
+            insert(URLMapping)
+            .from_select(
+                ["original_url", "url_hash", "short_code"],
+                select(
+                    literal(original_url), literal(url_hash), lookup.c.short_code
+                ).where(lookup.c.short_code == short_code),
+            )
+            .cte("mapping")
+        )
+        stmt = select(lookup.c.short_code).add_cte(mapping)
+
+        try:
+            async with self._async_session.begin() as session:
+                stored_code = (await session.execute(stmt)).scalar_one()
+        except IntegrityError:
+            raise Duplicate(message="Short code already exists.")
+
+        self._replicas.stick(self._mapping_keys({original_url: stored_code}))
+        return stored_code
+
+    async def insert_many(
+        self,
+        mappings: Mapping[str, str],
+        expires_at: datetime.datetime | None = None,
+    ) -> dict[str, str]:
+        """
+        Inserts original_url -> short_code mappings in one transaction and
+        returns the ones that were inserted. Mappings of taken short codes are
+        skipped, and unless they expire, those of already shortened URLs.
+        """
+        if not mappings:
+            return {}
+
+        # In a consistent order, so concurrent batches don't deadlock
+        rows = sorted(
+            (url_digest(original_url), original_url, short_code)
+            for original_url, short_code in mappings.items()
+        )
+        async with self._async_session.begin() as session:
+            if expires_at is None:
+                inserted = await self._insert_deduplicated(session, rows)
+            else:
+                inserted = await self._insert_mappings(session, rows, expires_at)
+
+        # Including the skipped ones, whose conflicting rows the caller is
+        # likely to look up next
+        self._replicas.stick(self._mapping_keys(mappings))
+        return inserted
+
+    async def purge_expired(self, batch_size: int = 500) -> int:
+        """
+        Deletes up to `batch_size` expired mappings, soonest expired first,
+        along with their click counters. Rows locked by a concurrent purge
+        are skipped rather than waited for. Returns the number deleted.
+        """
+        expired = (
+            select(URLMapping.short_code)
+            .where(URLMapping.expires_at <= func.now())
+            .order_by(URLMapping.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("expired")
+        )
+        deleted = (
+            delete(URLMapping)
+            .where(URLMapping.short_code.in_(select(expired.c.short_code)))
+            .returning(URLMapping.short_code, URLMapping.url_hash)
+            .cte("deleted")
+        )
+        lookups = (
+            delete(URLLookup)
+            .where(
+                tuple_(URLLookup.url_hash, URLLookup.short_code).in_(
+                    select(deleted.c.url_hash, deleted.c.short_code)
+                )
+            )
+            .cte("lookups")
+        )
+        clicks = (
+            delete(URLClickCounter)
+            .where(URLClickCounter.short_code.in_(select(deleted.c.short_code)))
+            .cte("clicks")
+        )
+        stmt = select(func.count()).select_from(deleted).add_cte(lookups, clicks)
+
+        async with self._async_session.begin() as session:
+            return (await session.execute(stmt)).scalar_one()
+
+    async def add(self, obj: URLMapping) -> URLMapping:
+        obj.url_hash = obj.url_hash or url_digest(obj.original_url)
         async with self._async_session() as session:
-            stmt = select(URLMapping).where(URLMapping.short_code == short_code)
-            result = await session.execute(stmt)
-            return result.scalars().first()
+            session.add(obj)
+            if obj.expires_at is None:
+                session.add(URLLookup(url_hash=obj.url_hash, short_code=obj.short_code))
+            await session.commit()
+            await session.refresh(obj)
+        self._replicas.stick([self._id_key(obj.id)])
+        return obj
+
+    async def delete(self, obj: URLMapping) -> None:
+        async with self._async_session.begin() as session:
+            await session.delete(obj)
+            await session.execute(
+                delete(URLLookup).where(
+                    URLLookup.url_hash == obj.url_hash,
+                    URLLookup.short_code == obj.short_code,
+                )
+            )
+        self._replicas.stick([self._id_key(obj.id)])
+        return None
+
+    @classmethod
+    async def _insert_deduplicated(
+        cls, session: AsyncSession, rows: Sequence[tuple[bytes, str, str]]
+    ) -> dict[str, str]:
+        """
+        Inserts the lookups of URLs not shortened yet, then their mappings.
+        Lookups whose short code turns out to be taken are removed again.
+        """
+        stmt = (
+            insert(URLLookup)
+            .values(
+                [
+                    {"url_hash": url_hash, "short_code": short_code}
+                    for url_hash, _, short_code in rows
+                ]
+            )
+            .on_conflict_do_nothing()
+            .returning(URLLookup.url_hash)
+        )
+        new = set((await session.scalars(stmt)).all())
+        rows = [row for row in rows if row[0] in new]
+        inserted = await cls._insert_mappings(session, rows)
+
+        taken = [url_hash for url_hash, url, _ in rows if url not in inserted]
+        if taken:
+            await session.execute(
+                delete(URLLookup).where(
+                    URLLookup.url_hash
+                    == any_(bindparam("url_hashes", taken, ARRAY(LargeBinary)))
+                )
+            )
+        return inserted
+
+    @staticmethod
+    async def _insert_mappings(
+        session: AsyncSession,
+        rows: Sequence[tuple[bytes, str, str]],
+        expires_at: datetime.datetime | None = None,
+    ) -> dict[str, str]:
+        if not rows:
+            return {}
+
+        stmt = (
+            insert(URLMapping)
+            .values(
+                [
+                    {
+                        "original_url": original_url,
+                        "url_hash": url_hash,
+                        "short_code": short_code,
+                        "expires_at": expires_at,
+                    }
+                    for url_hash, original_url, short_code in rows
+                ]
+            )
+            .on_conflict_do_nothing()
+            .returning(URLMapping.original_url, URLMapping.short_code)
+        )
+        result = await session.execute(stmt)
+        return {original_url: short_code for original_url, short_code in result}
+
+    @staticmethod
+    def _mapping_keys(mappings: Mapping[str, str]) -> list[Hashable]:
+        keys: list[Hashable] = []
+        for original_url, short_code in mappings.items():
+            keys.append(("url_hash", url_digest(original_url)))
+            keys.append(("short_code", short_code))
+        return keys
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 
+from .url_route import ROUTE_PRIORITIES as url_route_priorities
 from .url_route import router as _url_router
 
 url_router = APIRouter(prefix="", tags=["URL"])
@@ -1,31 +1,193 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
-from pydantic import HttpUrl
+import csv
+import datetime
+import io
+import json
+from email.utils import format_datetime
+from typing import Annotated, AsyncIterator, Iterator, Literal
 
-from app.url.dto.url_dto import OriginalURLSchema, ShortURLSchema
-from app.url.errors import Duplicate, Missing
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    status,
+)
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import (
+    AfterValidator,
+    AwareDatetime,
+    Field,
+    HttpUrl,
+    StringConstraints,
+    TypeAdapter,
+    ValidationError,
+)
+
+from app.common.admission import Priority
+from app.common.config import config
+from app.common.fastapi_utils import ModelResponse
+from app.url.clicks import ClickTracker, get_click_tracker
+from app.url.dto.url_dto import (
+    BulkShortURLSchema,
+    ClickStatsSchema,
+    OriginalURLSchema,
+    ResolvedURLSchema,
+    ShortURLSchema,
+    URLMappingPageSchema,
+    URLMappingSchema,
+)
+from app.url.errors import Duplicate, Invalid, Missing
+from app.url.repositories import URLTarget
 from app.url.services import URLMappingService
 
+NDJSON = "application/x-ndjson"
+
+OriginalURL = Annotated[HttpUrl, Field(max_length=2083)]
+original_url_adapter: TypeAdapter[HttpUrl] = TypeAdapter(OriginalURL)
+original_urls_adapter: TypeAdapter[list[HttpUrl]] = TypeAdapter(list[OriginalURL])
+
+ShortCode = Annotated[
+    str, StringConstraints(max_length=2083, pattern=r"^[a-zA-Z0-9]+$")
+]
+
+
+def _in_future(expires_at: datetime.datetime) -> datetime.datetime:
+    if expires_at <= datetime.datetime.now(datetime.UTC):
+        raise ValueError("expires_at must be in the future")
+    return expires_at
+
+
+ExpiresAt = Annotated[AwareDatetime, AfterValidator(_in_future)]
+EXPIRES_AT_DESCRIPTION = (
+    "When the short URL stops resolving, with a UTC offset. Expiring URLs "
+    "always get a new short code."
+)
+
 router = APIRouter()
 
+# Admission priorities of the DB bound routes, by route name
+ROUTE_PRIORITIES = {
+    "redirect_url": Priority.HIGH,
+    "create_short_code": Priority.LOW,
+    "create_short_codes": Priority.LOW,
+}
+
+
+# Declared before /{short_code}, which would otherwise match them
+@router.get(
+    path="/short-url",
+    response_model=URLMappingPageSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def list_url_mappings(
+    limit: int = Query(config.PAGE_DEFAULT_LIMIT, ge=1, le=config.PAGE_MAX_LIMIT),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    url_service: URLMappingService = Depends(),
+):
+    """
+    Lists URL mappings in creation order, a page at a time
+    """
+    try:
+        return ModelResponse(await url_service.list_url_mappings(limit, cursor))
+    except Invalid as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=e.message,
+        )
+
+
+@router.get(
+    path="/short-url/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {"content": {NDJSON: {}, "text/csv": {}}},
+    },
+)
+async def export_url_mappings(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    url_service: URLMappingService = Depends(),
+):
+    """
+    Streams all URL mappings as NDJSON or CSV, in constant memory
+    """
+    mappings = url_service.export_url_mappings()
+    if format == "csv":
+        return StreamingResponse(
+            _csv_lines(mappings),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="short-urls.csv"'},
+        )
+
+    return StreamingResponse(_ndjson_lines(mappings), media_type=NDJSON)
+
 
 @router.get(
     "/{short_code}",
     response_model=OriginalURLSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_302_FOUND: {"description": "Redirect to the original URL"}},
 )
 async def redirect_url(
     short_code: str = Path(..., max_length=2083, pattern=r"^[a-zA-Z0-9]+$"),
+    redirect: bool | None = Query(
+        None, description="Redirect instead of returning JSON, see REDIRECT_MODE"
+    ),
     url_service: URLMappingService = Depends(),
+    click_tracker: ClickTracker = Depends(get_click_tracker),
 ):
     try:
-        original_url = await url_service.get_original_url(short_code)
+        target = await url_service.resolve_short_code(short_code)
     except Missing as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=e.message,
         )
 
-    return original_url
+    click_tracker.record(short_code)
+
+    if redirect is None:
+        redirect = config.REDIRECT_MODE == "redirect"
+
+    if redirect:
+        return Response(
+            status_code=config.REDIRECT_STATUS_CODE,
+            headers={
+                "Location": target.original_url,
+                **_cache_headers(config.REDIRECT_CACHE_CONTROL, target),
+            },
+        )
+
+    return ModelResponse(
+        OriginalURLSchema.model_construct(original_url=target.original_url),
+        headers=_cache_headers(config.RESOLVE_CACHE_CONTROL, target),
+    )
+
+
+@router.get(
+    path="/short-url/{short_code}/stats",
+    response_model=ClickStatsSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def get_click_stats(
+    short_code: str = Path(..., max_length=2083, pattern=r"^[a-zA-Z0-9]+$"),
+    url_service: URLMappingService = Depends(),
+):
+    """
+    Redirect counts of a short code. Clicks are written in batches, so the
+    latest ones may take CLICK_FLUSH_INTERVAL seconds to show up.
+    """
+    try:
+        return ModelResponse(await url_service.get_click_stats(short_code))
+    except Missing as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=e.message,
+        )
 
 
 @router.post(
@@ -35,14 +197,188 @@ async def redirect_url(
 )
 async def create_short_code(
     original_url: HttpUrl = Query(..., max_length=2083),
+    expires_at: ExpiresAt | None = Query(None, description=EXPIRES_AT_DESCRIPTION),
+    url_service: URLMappingService = Depends(),
+):
+    try:
+        short_code = await url_service.create_short_code(str(original_url), expires_at)
+    except Duplicate as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=e.message,
+        )
+
+    return ModelResponse(short_code, status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    path="/short-url/bulk",
+    response_model=list[BulkShortURLSchema],
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"type": "string", "format": "uri", "maxLength": 2083},
+                    }
+                },
+                NDJSON: {"schema": {"type": "string", "format": "uri"}},
+            },
+        }
+    },
+)
+async def create_short_codes(
+    request: Request,
+    expires_at: ExpiresAt | None = Query(None, description=EXPIRES_AT_DESCRIPTION),
     url_service: URLMappingService = Depends(),
 ):
+    """
+    Shortens a JSON array of URLs, or NDJSON with one JSON string per line.
+    Results are returned in input order. NDJSON requests, and requests
+    accepting NDJSON, get them streamed back as NDJSON.
+    """
+    ndjson_request = request.headers.get("content-type", "").startswith(NDJSON)
+
+    if ndjson_request:
+        original_urls = await _read_ndjson_urls(request)
+    else:
+        original_urls = await _read_json_urls(request)
+
+    if len(original_urls) > config.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {config.BULK_MAX_ITEMS} URLs per request.",
+        )
+
+    if ndjson_request or NDJSON in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_short_codes(original_urls, expires_at, url_service),
+            status_code=status.HTTP_201_CREATED,
+            media_type=NDJSON,
+        )
+
     try:
-        short_code = await url_service.create_short_code(str(original_url))
+        results = [
+            result
+            for chunk in _chunk(original_urls)
+            for result in await url_service.create_short_codes(chunk, expires_at)
+        ]
     except Duplicate as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=e.message,
         )
 
-    return short_code
+    return ModelResponse(results, status_code=status.HTTP_201_CREATED)
+
+
+@router.post(
+    path="/short-url/resolve",
+    response_model=list[ResolvedURLSchema],
+    status_code=status.HTTP_200_OK,
+)
+async def resolve_short_codes(
+    short_codes: list[ShortCode] = Body(..., max_length=config.BULK_RESOLVE_MAX_ITEMS),
+    url_service: URLMappingService = Depends(),
+):
+    """
+    Resolves a batch of short codes in input order. Unknown short codes are
+    reported with a null original_url.
+    """
+    return ModelResponse(await url_service.get_original_urls(short_codes))
+
+
+def _cache_headers(cache_control: str, target: URLTarget) -> dict[str, str]:
+    # Expiring URLs are not stored by caches, so none keeps serving them past
+    # their expiry
+    if target.expires_at is None:
+        return {"Cache-Control": cache_control}
+
+    expires_at = target.expires_at.astimezone(datetime.UTC)
+    return {
+        "Cache-Control": "private, no-store",
+        "Expires": format_datetime(expires_at, usegmt=True),
+    }
+
+
+async def _read_json_urls(request: Request) -> list[str]:
+    try:
+        original_urls = original_urls_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()]
+        )
+
+    return [str(original_url) for original_url in original_urls]
+
+
+async def _read_ndjson_urls(request: Request) -> list[str]:
+    original_urls: list[str] = []
+    async for line in _read_lines(request):
+        # One past the limit is enough to reject the request
+        if len(original_urls) > config.BULK_MAX_ITEMS:
+            break
+
+        try:
+            original_urls.append(str(original_url_adapter.validate_json(line)))
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", len(original_urls))} for error in e.errors()]
+            )
+
+    return original_urls
+
+
+async def _read_lines(request: Request) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for data in request.stream():
+        *lines, buffer = (buffer + data).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+
+    if buffer.strip():
+        yield buffer
+
+
+def _chunk(original_urls: list[str]) -> Iterator[list[str]]:
+    for start in range(0, len(original_urls), config.BULK_CHUNK_SIZE):
+        yield original_urls[start : start + config.BULK_CHUNK_SIZE]
+
+
+async def _ndjson_lines(
+    mappings: AsyncIterator[URLMappingSchema],
+) -> AsyncIterator[str]:
+    async for mapping in mappings:
+        yield mapping.model_dump_json() + "\n"
+
+
+async def _csv_lines(mappings: AsyncIterator[URLMappingSchema]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["short_code", "original_url"])
+    yield buffer.getvalue()
+
+    async for mapping in mappings:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([mapping.short_code, mapping.original_url])
+        yield buffer.getvalue()
+
+
+async def _stream_short_codes(
+    original_urls: list[str],
+    expires_at: datetime.datetime | None,
+    url_service: URLMappingService,
+) -> AsyncIterator[str]:
+    # The status line is already sent once streaming starts, so errors are
+    # reported as a final NDJSON line
+    try:
+        for chunk in _chunk(original_urls):
+            for result in await url_service.create_short_codes(chunk, expires_at):
+                yield result.model_dump_json() + "\n"
+    except Duplicate as e:
+        yield json.dumps({"detail": e.message}) + "\n"
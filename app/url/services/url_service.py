@@ -1,55 +1,262 @@
-import random
-import string
+import datetime
+from typing import AsyncIterator, Sequence
 
 from fastapi import Depends
 
 from app.common.config import config
+from app.common.db import database
+from app.common.pagination import decode_cursor, encode_cursor
 from app.models import URLMapping
-from app.url.dto.url_dto import OriginalURLSchema, ShortURLSchema
-from app.url.errors import Missing
-from app.url.repositories import AsyncURLMappingRepository
+from app.url.cache import URLLookupCache, get_url_cache
+from app.url.dto.url_dto import (
+    BulkShortURLSchema,
+    ClickStatsSchema,
+    OriginalURLSchema,
+    ResolvedURLSchema,
+    ShortURLSchema,
+    URLMappingPageSchema,
+    URLMappingSchema,
+)
+from app.url.errors import Duplicate, Invalid, Missing
+from app.url.filter import URLMappingFilter, get_url_filter
+from app.url.repositories import (
+    AsyncClickCounterRepository,
+    AsyncURLMappingRepository,
+    URLTarget,
+    get_url_repository,
+)
+from app.url.short_codes import ShortCodeGenerator, get_short_code_generator
 
+# Built once from the validated SERVER_HOST, so short URLs appending a short
+# code to it are trusted by the DTOs
 URL_PATH = f"{config.SERVER_HOST}{config.API_PREFIX}/"
 
 
 class URLMappingService:
     def __init__(
         self,
-        url_repository: AsyncURLMappingRepository = Depends(),
+        url_repository: AsyncURLMappingRepository = Depends(get_url_repository),
+        url_cache: URLLookupCache = Depends(get_url_cache),
+        short_code_generator: ShortCodeGenerator = Depends(get_short_code_generator),
+        click_repository: AsyncClickCounterRepository = Depends(),
+        url_filter: URLMappingFilter = Depends(get_url_filter),
     ):
         self.url_repository = url_repository
+        self.click_repository = click_repository
+        self.url_cache = url_cache
+        self.url_filter = url_filter
+        self.short_code_generator = short_code_generator
 
     async def get_original_url(self, short_code: str) -> OriginalURLSchema | None:
-        original_url = await self.url_repository.get_by_short_code(
-            short_code=short_code
-        )
+        target = await self.resolve_short_code(short_code)
+
+        return OriginalURLSchema.model_construct(original_url=target.original_url)
+
+    async def resolve_short_code(self, short_code: str) -> URLTarget:
+        """
+        Returns the original URL as stored, already validated on insert, with
+        its expiry
+        """
+        target = await self.url_cache.get_or_load(short_code, self.__load_original_url)
 
-        if not original_url:
+        if not target:
             raise Missing(message="Short code not found.")
 
-        return OriginalURLSchema.model_validate(original_url)
+        return target
+
+    async def get_original_urls(
+        self, short_codes: Sequence[str]
+    ) -> list[ResolvedURLSchema]:
+        """
+        Resolves a batch of short codes in input order. Unknown short codes
+        resolve to None.
+        """
+        targets = await self.url_cache.get_many_or_load(
+            list(dict.fromkeys(short_codes)), self.__find_original_urls
+        )
+        original_urls = {
+            code: target.original_url for code, target in targets.items() if target
+        }
+
+        return [
+            ResolvedURLSchema.model_construct(
+                short_code=short_code, original_url=original_urls.get(short_code)
+            )
+            for short_code in short_codes
+        ]
+
+    async def get_click_stats(self, short_code: str) -> ClickStatsSchema:
+        """
+        Click counts as of the click tracker's last flush
+        """
+        await self.resolve_short_code(short_code)
+
+        counter = await self.click_repository.get_by_short_code(short_code)
+        if counter is None:
+            return ClickStatsSchema.model_construct(short_code=short_code)
+
+        return ClickStatsSchema.model_construct(
+            short_code=counter.short_code,
+            clicks=counter.clicks,
+            first_clicked_at=counter.first_clicked_at,
+            last_clicked_at=counter.last_clicked_at,
+        )
+
+    async def list_url_mappings(
+        self, limit: int, cursor: str | None = None
+    ) -> URLMappingPageSchema:
+        try:
+            after_id = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise Invalid(message="Invalid cursor.")
+
+        # One extra row tells whether there is a next page
+        url_mappings = await self.url_repository.get_page(limit + 1, after_id)
+        items = url_mappings[:limit]
+        next_cursor = encode_cursor(items[-1].id) if len(url_mappings) > limit else None
+
+        return URLMappingPageSchema.model_construct(
+            items=[self.__mapping_schema(mapping) for mapping in items],
+            next_cursor=next_cursor,
+        )
+
+    async def export_url_mappings(self) -> AsyncIterator[URLMappingSchema]:
+        async for mapping in self.url_repository.stream_all(config.EXPORT_BATCH_SIZE):
+            yield self.__mapping_schema(mapping)
+
+    async def create_short_code(
+        self, original_url: str, expires_at: datetime.datetime | None = None
+    ) -> ShortURLSchema:
+        """
+        Shortens a URL, reusing its existing mapping unless the new one expires
+        """
+        for _ in range(config.SHORT_CODE_MAX_ATTEMPTS):
+            short_code = await self.__insert(
+                original_url, await self.__create_short_code(), expires_at
+            )
+            if short_code is None:
+                continue
+
+            self.url_filter.add(short_code, original_url)
+            await self.url_cache.set(short_code, original_url, expires_at)
+
+            return ShortURLSchema.model_construct(
+                short_url=f"{URL_PATH}{short_code}", expires_at=expires_at
+            )
 
-    async def create_short_code(self, original_url: str) -> ShortURLSchema:
-        existing_url = await self.url_repository.get_by_url(original_url)
+        raise Duplicate(message="Could not generate a unique short code.")
+
+    async def create_short_codes(
+        self, original_urls: Sequence[str], expires_at: datetime.datetime | None = None
+    ) -> list[BulkShortURLSchema]:
+        """
+        Shortens a batch of URLs, reusing existing mappings unless the new ones
+        expire. Results are in input order, duplicated URLs get the same short
+        code.
+        """
+        unique_urls = list(dict.fromkeys(original_urls))
+        short_codes = {}
+        if expires_at is None:
+            short_codes = await self.__find_short_codes(
+                [url for url in unique_urls if self.url_filter.might_contain_url(url)]
+            )
+
+        for _ in range(config.SHORT_CODE_MAX_ATTEMPTS):
+            pending = [url for url in unique_urls if url not in short_codes]
+            if not pending:
+                break
+
+            inserted = await self.url_repository.insert_many(
+                {url: await self.__create_short_code() for url in pending},
+                expires_at,
+            )
+            for url, short_code in inserted.items():
+                self.url_filter.add(short_code, url)
+            await self.url_cache.set_many(
+                {short_code: url for url, short_code in inserted.items()}, expires_at
+            )
+            short_codes.update(inserted)
 
-        if existing_url:
-            return ShortURLSchema(short_url=f"{URL_PATH}{existing_url.short_code}")
+            # Lost to a concurrent insert of the same URL or a taken short code
+            lost = [url for url in pending if url not in inserted]
+            if expires_at is None:
+                short_codes.update(await self.__find_short_codes(lost))
 
-        short_code = self.__create_short_code()
+        if len(short_codes) < len(unique_urls):
+            raise Duplicate(message="Could not generate unique short codes.")
 
-        if await self.url_repository.get_by_short_code(short_code):
-            short_code = self.__create_short_code()
+        return [
+            BulkShortURLSchema.model_construct(
+                original_url=url,
+                short_url=f"{URL_PATH}{short_codes[url]}",
+                expires_at=expires_at,
+            )
+            for url in original_urls
+        ]
 
-        url_mapping = URLMapping(original_url=original_url, short_code=short_code)
-        url_mapping = await self.url_repository.add(url_mapping)
+    @staticmethod
+    def __mapping_schema(mapping: URLMapping) -> URLMappingSchema:
+        return URLMappingSchema.model_construct(
+            short_code=mapping.short_code, original_url=mapping.original_url
+        )
 
-        short_url = f"{URL_PATH}{url_mapping.short_code}"
+    async def __find_short_codes(self, original_urls: Sequence[str]) -> dict[str, str]:
+        if not original_urls:
+            return {}
 
-        return ShortURLSchema(short_url=short_url)
+        url_mappings = await self.url_repository.get_by_urls(original_urls)
+        return {mapping.original_url: mapping.short_code for mapping in url_mappings}
 
-    def __create_short_code(self) -> str:
-        return "".join(
-            random.choices(
-                string.ascii_letters + string.digits, k=config.SHORT_CODE_LENGTH
+    async def __insert(
+        self,
+        original_url: str,
+        short_code: str,
+        expires_at: datetime.datetime | None,
+    ) -> str | None:
+        """
+        Returns the short code the URL is mapped to, None if the short code
+        is taken
+        """
+        if expires_at is not None:
+            inserted = await self.url_repository.insert_many(
+                {original_url: short_code}, expires_at
             )
+            return inserted.get(original_url)
+
+        try:
+            return await self.url_repository.upsert(original_url, short_code)
+        except Duplicate:
+            return None
+
+    async def __load_original_url(self, short_code: str) -> URLTarget | None:
+        # After both cache tiers, so short codes just created by other workers
+        # are still found in the shared cache before the filter has synced
+        if not self.url_filter.might_contain_short_code(short_code):
+            return None
+
+        # Concurrent lookups of the short code share this load, so it runs on
+        # a session of its own rather than on the first request's
+        repository = self.url_repository.with_session(database)
+        return await repository.get_target(short_code)
+
+    async def __find_original_urls(
+        self, short_codes: list[str]
+    ) -> dict[str, URLTarget]:
+        short_codes = [
+            code
+            for code in short_codes
+            if self.url_filter.might_contain_short_code(code)
+        ]
+        if not short_codes:
+            return {}
+
+        url_mappings = await self.url_repository.get_by_short_codes(short_codes)
+        return {
+            mapping.short_code: URLTarget(mapping.original_url, mapping.expires_at)
+            for mapping in url_mappings
+        }
+
+    async def __create_short_code(self) -> str:
+        return await self.short_code_generator.generate(
+            self.url_repository.next_short_code_block
         )
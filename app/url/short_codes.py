@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+import random
+import string
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Generator
+
+from app.common.config import Config, config
+
+ALPHABET = string.ascii_letters + string.digits
+
+# Rounds of the Feistel network scrambling block ids, four make it a
+# pseudorandom permutation
+_FEISTEL_ROUNDS = 4
+
+BlockLease = Callable[[], Awaitable[int]]
+
+
+class ShortCodeGenerator(ABC):
+    def __init__(self, length: int):
+        self.length = length
+
+    @abstractmethod
+    async def generate(self, lease: BlockLease) -> str:
+        raise NotImplementedError
+
+
+class RandomShortCodeGenerator(ShortCodeGenerator):
+    """
+    Draws codes at random. Codes may collide and must be checked.
+    """
+
+    async def generate(self, lease: BlockLease) -> str:
+        return "".join(random.choices(ALPHABET, k=self.length))
+
+
+class BlockShortCodeGenerator(ShortCodeGenerator):
+    """
+    Derives codes from unique ids leased in blocks from a database sequence.
+
+    Every lease hands out `block_size` ids, which are mapped one-to-one onto
+    the code space by a Feistel network keyed with `key`. Without the key,
+    codes reveal neither their id nor the codes created before or after them.
+    All workers must share the key, and it must never change.
+    """
+
+    def __init__(self, length: int, block_size: int, key: str):
+        super().__init__(length)
+        self.block_size = block_size
+        self._space = len(ALPHABET) ** length
+        self._key = hashlib.blake2b(key.encode()).digest()
+        # The network permutes the smallest even bit width covering the space
+        self._half_bits = ((self._space - 1).bit_length() + 1) // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._next_id = 0
+        self._block_end = 0
+        self._lock = asyncio.Lock()
+
+    async def generate(self, lease: BlockLease) -> str:
+        if self._next_id >= self._block_end:
+            async with self._lock:
+                if self._next_id >= self._block_end:
+                    block = await lease()
+                    self._next_id = block * self.block_size
+                    self._block_end = self._next_id + self.block_size
+
+        code_id = self._next_id
+        self._next_id += 1
+        return self.encode(code_id)
+
+    def encode(self, code_id: int) -> str:
+        if code_id >= self._space:
+            raise OverflowError("Short code space exhausted, increase the length.")
+
+        # Cycle walking: permuting again until the value falls into the code
+        # space keeps the mapping one-to-one
+        value = self._permute(code_id)
+        while value >= self._space:
+            value = self._permute(value)
+
+        chars = []
+        for _ in range(self.length):
+            value, digit = divmod(value, len(ALPHABET))
+            chars.append(ALPHABET[digit])
+        return "".join(reversed(chars))
+
+    def _permute(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._half_mask
+        for index in range(_FEISTEL_ROUNDS):
+            left, right = right, left ^ self._round(index, right)
+        return (left << self._half_bits) | right
+
+    def _round(self, index: int, half: int) -> int:
+        data = bytes([index]) + half.to_bytes((self._half_bits + 7) // 8)
+        digest = hashlib.blake2b(data, key=self._key, digest_size=16).digest()
+        return int.from_bytes(digest) & self._half_mask
+
+    def reset(self) -> None:
+        # Forked workers must not keep handing out the parent's block
+        self._next_id = self._block_end = 0
+        self._lock = asyncio.Lock()
+
+
+def create_short_code_generator(config: Config) -> ShortCodeGenerator:
+    match config.SHORT_CODE_GENERATOR:
+        case "block":
+            if not config.SHORT_CODE_KEY:
+                raise ValueError("SHORT_CODE_GENERATOR=block requires SHORT_CODE_KEY")
+            generator = BlockShortCodeGenerator(
+                config.SHORT_CODE_LENGTH,
+                config.SHORT_CODE_BLOCK_SIZE,
+                config.SHORT_CODE_KEY,
+            )
+            os.register_at_fork(after_in_child=generator.reset)
+            return generator
+        case _:
+            return RandomShortCodeGenerator(config.SHORT_CODE_LENGTH)
+
+
+short_code_generator = create_short_code_generator(config)
+
+
+def get_short_code_generator() -> Generator[ShortCodeGenerator, None, None]:
+    yield short_code_generator
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import random
+import sys
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Literal
+
+from app.common import healthcheck
+from app.common.config import Config, config
+from app.common.db import database
+from app.common.replicas import replica_set
+from app.url.cache import URLLookupCache, url_cache
+from app.url.repositories import AsyncURLMappingRepository, URLTarget
+
+logger = logging.getLogger(__name__)
+
+# Rough size of an in-process cache entry besides its strings: the LRU dict
+# slot and node, the value tuple, the URLTarget and the expiry float
+ENTRY_OVERHEAD = 260
+
+
+def entry_size(short_code: str, original_url: str) -> int:
+    return sys.getsizeof(short_code) + sys.getsizeof(original_url) + ENTRY_OVERHEAD
+
+
+@dataclass
+class WarmupStats:
+    loaded: int = 0
+    size: int = 0
+    duration: float = 0.0
+
+
+class CacheWarmer:
+    """
+    Preloads the hottest short codes into the in-process lookup cache, until
+    `limit` entries, `memory_budget` bytes or the cache's maxsize is reached.
+    /healthcheck reports "warming" while it runs.
+    """
+
+    def __init__(
+        self,
+        cache: URLLookupCache,
+        repository: AsyncURLMappingRepository,
+        order: Literal["none", "clicks", "recent"] = "clicks",
+        limit: int = 10_000,
+        memory_budget: int = 16 * 1024 * 1024,
+        batch_size: int = 1000,
+    ):
+        self.cache = cache
+        self.repository = repository
+        self.order = order
+        self.limit = limit
+        self.memory_budget = memory_budget
+        self.batch_size = batch_size
+        self.stats = WarmupStats()
+
+    def start(self) -> asyncio.Task[None] | None:
+        if self.order == "none":
+            return None
+
+        healthcheck.warming.add("url_cache")
+        return asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+        try:
+            await self.warm()
+        except Exception:
+            logger.warning("Cache warm-up failed", exc_info=True)
+        finally:
+            healthcheck.warming.discard("url_cache")
+            self.stats.duration = time.perf_counter() - started
+
+        logger.info(
+            "Preloaded %d short codes, about %d bytes, in %.1fs",
+            self.stats.loaded,
+            self.stats.size,
+            self.stats.duration,
+        )
+
+    async def warm(self) -> None:
+        if self.order == "none":
+            return None
+
+        limit = min(self.limit, self.cache.local.maxsize)
+        entries: list[tuple[str, URLTarget]] = []
+        rows = self.repository.stream_hottest(limit, self.order, self.batch_size)
+        async with aclosing(rows):
+            async for short_code, target in rows:
+                size = entry_size(short_code, target.original_url)
+                if self.stats.size + size > self.memory_budget:
+                    break
+                entries.append((short_code, target))
+                self.stats.size += size
+
+        # Coldest first, so the hottest end up most recently used. TTLs are
+        # spread out so the preloaded entries do not all expire at once.
+        for short_code, target in reversed(entries):
+            ttl = self.cache.ttl * random.uniform(0.5, 1.0)
+            ttl = min(ttl, self.cache.entry_ttl(target))
+            self.cache.local.set(short_code, target, ttl=ttl)
+        self.stats.loaded = len(entries)
+
+
+def create_cache_warmer(config: Config) -> CacheWarmer:
+    return CacheWarmer(
+        url_cache,
+        AsyncURLMappingRepository(database, replica_set),
+        order=config.CACHE_WARMUP,
+        limit=config.CACHE_WARMUP_LIMIT,
+        memory_budget=config.CACHE_WARMUP_MEMORY_BUDGET,
+        batch_size=config.CACHE_WARMUP_BATCH_SIZE,
+    )
+
+
+cache_warmer = create_cache_warmer(config)
@@ -0,0 +1,129 @@
+"""
+CPU cost of building and rendering URL endpoint responses, without I/O.
+
+Compares FastAPI's default path, DTOs validated on construction and rendered
+through response_model handling and the stdlib JSONResponse, with trusted
+model_construct() DTOs rendered by each installed JSON_ENCODER, for a single
+short URL and a bulk response.
+
+    ENV=.env python -m benchmarks.responses --bulk-size 1000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.common.serialization import (
+    JSONEncoder,
+    msgspec_encoder,
+    orjson_encoder,
+    stdlib_encoder,
+)
+from app.url.dto.url_dto import BulkShortURLSchema, ShortURLSchema
+from app.url.services.url_service import URL_PATH
+
+Build = Callable[[], Awaitable[Any]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--bulk-size", type=int, default=1000)
+    parser.add_argument(
+        "--repeat", type=int, default=20_000, help="Single responses to time"
+    )
+    return parser.parse_args()
+
+
+def encoders() -> dict[str, JSONEncoder]:
+    available = {"stdlib": stdlib_encoder()}
+    for name, factory in (("orjson", orjson_encoder), ("msgspec", msgspec_encoder)):
+        try:
+            available[name] = factory()
+        except ImportError:
+            print(f"{name} is not installed, skipped")
+    return available
+
+
+def single_response(encode: JSONEncoder | None) -> Build:
+    field = create_model_field("response", ShortURLSchema, mode="serialization")
+
+    async def build() -> Any:
+        if encode is None:
+            content = ShortURLSchema(short_url=f"{URL_PATH}bm1")
+            return JSONResponse(
+                await serialize_response(field=field, response_content=content)
+            )
+        return encode(ShortURLSchema.model_construct(short_url=f"{URL_PATH}bm1"))
+
+    return build
+
+
+def bulk_response(encode: JSONEncoder | None, size: int) -> Build:
+    field = create_model_field(
+        "response", list[BulkShortURLSchema], mode="serialization"
+    )
+    mappings = [(f"https://bench.example/{i}", f"{URL_PATH}bm{i}") for i in range(size)]
+
+    async def build() -> Any:
+        if encode is None:
+            content = [
+                BulkShortURLSchema(original_url=original_url, short_url=short_url)
+                for original_url, short_url in mappings
+            ]
+            return JSONResponse(
+                await serialize_response(field=field, response_content=content)
+            )
+        return encode(
+            [
+                BulkShortURLSchema.model_construct(
+                    original_url=original_url, short_url=short_url
+                )
+                for original_url, short_url in mappings
+            ]
+        )
+
+    return build
+
+
+async def time_per_call(build: Build, repeat: int) -> float:
+    await build()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await build()
+    return (time.perf_counter() - started) / repeat
+
+
+async def benchmark(args: argparse.Namespace) -> None:
+    # None stands for FastAPI's default path
+    variants: dict[str, JSONEncoder | None] = {"fastapi": None, **encoders()}
+    responses: dict[str, tuple[int, Callable[[JSONEncoder | None], Build]]] = {
+        "single": (1, single_response),
+        f"bulk {args.bulk_size}": (
+            args.bulk_size,
+            lambda encode: bulk_response(encode, args.bulk_size),
+        ),
+    }
+
+    print(f"{'response':<12}{'encoder':<10}{'us':>12}{'saved':>8}")
+    for name, (items, response) in responses.items():
+        repeat = max(args.repeat // items, 10)
+        baseline = None
+        for variant, encode in variants.items():
+            elapsed = await time_per_call(response(encode), repeat) * 1e6
+            baseline = baseline or elapsed
+            print(
+                f"{name:<12}{variant:<10}{elapsed:>12.1f}{1 - elapsed / baseline:>8.1%}"
+            )
+
+
+def main() -> None:
+    asyncio.run(benchmark(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Load test of the redirect and create endpoints.
+
+Seeds the database with --mappings rows, drives the ASGI app in process with
+--concurrency async clients for --duration seconds and writes latency
+percentiles, RPS and DB queries per request to a JSON file. Runs against a
+throwaway testcontainers Postgres unless --database-uri is given.
+
+    python -m benchmarks.run --mappings 1000000 --write-ratio 0.05
+    python -m benchmarks.run --baseline benchmarks/results/before.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.workload import (
+    EndpointStats,
+    ZipfSampler,
+    seed_mappings,
+    server_timing_queries,
+    short_code,
+)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--mappings", type=int, default=1_000_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.01, help="Share of create requests"
+    )
+    parser.add_argument(
+        "--zipf", type=float, default=1.1, help="Skew of short code popularity"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the in-process URL cache"
+    )
+    parser.add_argument(
+        "--repository",
+        choices=["orm", "asyncpg"],
+        default="orm",
+        help="URL repository implementation, see URL_REPOSITORY",
+    )
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-uri", help="Use this database instead of a testcontainer"
+    )
+    parser.add_argument("--output", type=Path, help="Defaults to benchmarks/results/")
+    parser.add_argument("--baseline", type=Path, help="Results to compare against")
+    return parser.parse_args()
+
+
+async def run_clients(
+    client: httpx.AsyncClient,
+    sampler: ZipfSampler,
+    args: argparse.Namespace,
+    duration: float,
+    seed: int,
+) -> dict[str, EndpointStats]:
+    stats = {"redirect": EndpointStats(), "create": EndpointStats()}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(rng: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if rng.random() < args.write_ratio:
+                endpoint = "create"
+                response = await client.post(
+                    "/short-url",
+                    params={"original_url": f"https://new.example/{uuid.uuid4().hex}"},
+                )
+            else:
+                endpoint = "redirect"
+                response = await client.get(f"/{short_code(sampler.sample(rng))}")
+
+            stats[endpoint].record(
+                time.perf_counter() - started,
+                response.status_code,
+                server_timing_queries(response.headers.get("server-timing")),
+            )
+
+    await asyncio.gather(
+        *(
+            client_loop(random.Random(seed * 100_003 + i))
+            for i in range(args.concurrency)
+        )
+    )
+    return stats
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    # Imported once the environment points the app at the benchmark database
+    from app.common.cache import CacheStats
+    from app.common.config import config
+    from app.common.db import Base, database, pool_metrics
+    from app.main import app
+    from app.url.cache import url_cache
+
+    # Per request access logs would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    if not args.skip_seed:
+        started = time.perf_counter()
+        await seed_mappings(database.engine, args.mappings)
+        print(
+            f"Seeded {args.mappings} mappings in {time.perf_counter() - started:.1f}s"
+        )
+
+    sampler = ZipfSampler(args.mappings, args.zipf)
+    transport = httpx.ASGITransport(app=app)
+    base_url = f"http://benchmark/{config.API_PREFIX}"
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+            if args.warmup:
+                await run_clients(client, sampler, args, args.warmup, args.seed + 1)
+            url_cache.local.stats = CacheStats()
+
+            started = time.perf_counter()
+            stats = await run_clients(client, sampler, args, args.duration, args.seed)
+            duration = time.perf_counter() - started
+
+        cache_stats = url_cache.local.stats
+        return {
+            "endpoints": {
+                name: endpoint.summary(duration) for name, endpoint in stats.items()
+            },
+            "total_rps": sum(len(s.latencies) for s in stats.values()) / duration,
+            "cache": {
+                "hits": cache_stats.hits,
+                "misses": cache_stats.misses,
+                "hit_ratio": cache_stats.hit_ratio,
+            },
+            "pool": pool_metrics.snapshot(),
+        }
+
+
+def describe_run(args: argparse.Namespace) -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "started_at": datetime.datetime.now(datetime.UTC).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("database_uri", "output", "baseline")
+        },
+    }
+
+
+def print_results(results: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    print(f"{'endpoint':<10}{'metric':<10}{'current':>12}{'baseline':>12}{'change':>9}")
+    for name, current in results["endpoints"].items():
+        previous = (baseline or {}).get("endpoints", {}).get(name, {})
+        metrics = {
+            "rps": (current["rps"], previous.get("rps")),
+            "queries": (
+                current["queries_per_request"],
+                previous.get("queries_per_request"),
+            ),
+            **{
+                f"{p} ms": (
+                    current["latency_ms"][p],
+                    previous.get("latency_ms", {}).get(p),
+                )
+                for p in ("p50", "p95", "p99")
+            },
+        }
+        for metric, (value, before) in metrics.items():
+            line = f"{name:<10}{metric:<10}{value:>12.2f}"
+            if before:
+                line += f"{before:>12.2f}{(value - before) / before:>+9.1%}"
+            print(line)
+
+
+def main() -> None:
+    args = parse_args()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    with ExitStack() as stack:
+        database_uri = args.database_uri
+        if database_uri is None:
+            from testcontainers.postgres import PostgresContainer
+
+            postgres = stack.enter_context(
+                PostgresContainer("postgres:16-alpine", dbname="benchmark", driver=None)
+            )
+            database_uri = postgres.get_connection_url()
+
+        os.environ["DATABASE_URI"] = database_uri
+        os.environ["URL_REPOSITORY"] = args.repository
+        os.environ["SERVER_TIMING"] = "true"
+        if args.no_cache:
+            os.environ["URL_CACHE_MAXSIZE"] = "0"
+
+        results = {**describe_run(args), **asyncio.run(benchmark(args))}
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    print_results(results, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Throughput of the production server by number of workers.
+
+Starts docker/gunicorn.conf.py's server once per --workers count and drives
+redirects of seeded short codes at it from --loaders load generating
+processes, each keeping --connections keep-alive connections busy. Prints
+the RPS, speedup over the first count and latency per worker count and
+writes them to a JSON file. The load generators share the machine with the
+server, leave them enough cores when reading the results. Runs against a
+throwaway testcontainers Postgres unless --database-uri is given.
+
+    python -m benchmarks.scaling --workers 1,2,4 --loaders 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Opens no connections, the servers read their settings from the environment
+# set up in main()
+from app.common.db import Base
+from app.common.server import available_cpus
+from benchmarks.workload import ZipfSampler, percentile, seed_mappings, short_code
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--workers",
+        type=lambda value: [int(count) for count in value.split(",")],
+        help="Comma separated worker counts, defaults to powers of two up to "
+        "the available CPUs",
+    )
+    parser.add_argument("--mappings", type=int, default=100_000)
+    parser.add_argument("--loaders", type=int, default=max(available_cpus() // 2, 1))
+    parser.add_argument(
+        "--connections", type=int, default=32, help="Connections per loader"
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument(
+        "--zipf", type=float, default=1.1, help="Skew of short code popularity"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the in-process URL cache"
+    )
+    parser.add_argument(
+        "--database-uri", help="Use this database instead of a testcontainer"
+    )
+    parser.add_argument("--output", type=Path, help="Defaults to benchmarks/results/")
+    return parser.parse_args()
+
+
+def worker_counts() -> list[int]:
+    counts = [1]
+    while counts[-1] * 2 <= available_cpus():
+        counts.append(counts[-1] * 2)
+    return counts
+
+
+async def prepare_database(database_uri: str, mappings: int) -> None:
+    engine = create_async_engine(
+        database_uri.replace("postgresql://", "postgresql+asyncpg://", 1)
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await seed_mappings(engine, mappings)
+    await engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen[bytes]:
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers)}
+    env["SERVER_BIND"] = f"127.0.0.1:{port}"
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            "docker/gunicorn.conf.py",
+            "app.main:app",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def connection_loop(
+    port: int, path_prefix: str, sampler: ZipfSampler, seed: int, deadline: float
+) -> list[float]:
+    """
+    Sends redirects over one keep-alive connection until the deadline and
+    returns their latencies. Raw HTTP/1.1, so that the load generator is not
+    the bottleneck.
+    """
+    rng = random.Random(seed)
+    latencies = []
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            path = f"{path_prefix}/{short_code(sampler.sample(rng))}"
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: benchmark\r\n\r\n".encode())
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in headers.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if not headers.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(headers.split(b"\r\n", 1)[0].decode())
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+    return latencies
+
+
+def load(
+    port: int, path_prefix: str, args: argparse.Namespace, duration: float, seed: int
+) -> list[float]:
+    """
+    One load generating process, runs --connections connection loops
+    """
+    sampler = ZipfSampler(args.mappings, args.zipf)
+
+    async def run() -> list[float]:
+        deadline = time.perf_counter() + duration
+        results = await asyncio.gather(
+            *(
+                connection_loop(port, path_prefix, sampler, seed * 1000 + i, deadline)
+                for i in range(args.connections)
+            )
+        )
+        return [latency for latencies in results for latency in latencies]
+
+    return asyncio.run(run())
+
+
+def drive(
+    pool: ProcessPoolExecutor,
+    port: int,
+    path_prefix: str,
+    args: argparse.Namespace,
+    duration: float,
+) -> list[float]:
+    futures = [
+        pool.submit(load, port, path_prefix, args, duration, seed)
+        for seed in range(args.loaders)
+    ]
+    return [latency for future in futures for latency in future.result()]
+
+
+def measure(
+    workers: int, pool: ProcessPoolExecutor, args: argparse.Namespace
+) -> dict[str, Any]:
+    port = free_port()
+    path_prefix = f"/{os.environ.get('API_PREFIX', 'api/v1')}"
+    server = start_server(workers, port)
+    try:
+        wait_ready(f"http://127.0.0.1:{port}{path_prefix}/readyz")
+        if args.warmup:
+            drive(pool, port, path_prefix, args, args.warmup)
+        latencies = sorted(drive(pool, port, path_prefix, args, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / args.duration,
+        "latency_ms": {
+            p: 1000 * percentile(latencies, int(p[1:])) for p in ("p50", "p99")
+        },
+    }
+
+
+def print_results(results: list[dict[str, Any]]) -> None:
+    print(f"{'workers':>8}{'rps':>12}{'speedup':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for result in results:
+        speedup = result["rps"] / results[0]["rps"]
+        print(
+            f"{result['workers']:>8}{result['rps']:>12.0f}{speedup:>8.2f}x"
+            f"{result['latency_ms']['p50']:>9.2f}{result['latency_ms']['p99']:>9.2f}"
+        )
+
+
+def main() -> None:
+    args = parse_args()
+
+    with ExitStack() as stack:
+        database_uri = args.database_uri
+        if database_uri is None:
+            from testcontainers.postgres import PostgresContainer
+
+            postgres = stack.enter_context(
+                PostgresContainer("postgres:16-alpine", dbname="benchmark", driver=None)
+            )
+            database_uri = postgres.get_connection_url()
+
+        # Inherited by the servers started below
+        os.environ["DATABASE_URI"] = database_uri
+        os.environ["CACHE_WARMUP"] = "none"
+        if args.no_cache:
+            os.environ["URL_CACHE_MAXSIZE"] = "0"
+
+        asyncio.run(prepare_database(database_uri, args.mappings))
+        pool = stack.enter_context(ProcessPoolExecutor(args.loaders))
+        results = [
+            measure(workers, pool, args) for workers in args.workers or worker_counts()
+        ]
+
+    output = (
+        args.output or RESULTS_DIR / f"scaling-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "cpus": available_cpus(),
+                "parameters": {
+                    key: value
+                    for key, value in vars(args).items()
+                    if key not in ("database_uri", "output")
+                },
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+    print_results(results)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
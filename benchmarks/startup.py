@@ -0,0 +1,96 @@
+"""
+Cold start cost of a worker: importing the app in a fresh interpreter.
+
+Runs --repeat interpreters that each import app.main, and reports the import
+time and the interpreter's total run time, and whether the import created a
+database engine. With --top, also lists the modules slowest to import
+according to python -X importtime.
+
+    ENV=.env python -m benchmarks.startup --repeat 10 --top 15
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Run in each fresh interpreter, prints its measurements as JSON
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+from app.common.db import database
+print(json.dumps({"import": imported, "engine": database._engine is not None}))
+"""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--top", type=int, default=0, help="Slowest modules to list, 0 for none"
+    )
+    return parser.parse_args()
+
+
+def probe() -> tuple[float, float, bool]:
+    """
+    Returns the import time, total run time and whether an engine was created
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True
+    )
+    total = time.perf_counter() - started
+    measured = json.loads(result.stdout.splitlines()[-1])
+    return measured["import"], total, measured["engine"]
+
+
+def slowest_imports(top: int) -> list[tuple[float, str]]:
+    """
+    Modules by cumulative import time in seconds, slowest first
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    # Lines look like "import time:   self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        modules.append((int(cumulative) / 1e6, module.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main() -> None:
+    args = parse_args()
+    # Warms the file system cache and bytecode, as on a restarted worker
+    probe()
+    runs = [probe() for _ in range(args.repeat)]
+
+    print(f"{'metric':<12}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for name, values in (
+        ("import", [imported for imported, _, _ in runs]),
+        ("process", [total for _, total, _ in runs]),
+    ):
+        print(
+            f"{name:<12}{statistics.median(values) * 1e3:>12.1f}"
+            f"{min(values) * 1e3:>12.1f}{max(values) * 1e3:>12.1f}"
+        )
+    print(f"Engine created on import: {'yes' if runs[0][2] else 'no'}")
+
+    if args.top:
+        print(f"\n{'cumulative ms':>14}  module")
+        for cumulative, module in slowest_imports(args.top):
+            print(f"{cumulative * 1e3:>14.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
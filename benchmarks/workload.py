@@ -0,0 +1,127 @@
+import bisect
+import itertools
+import random
+import re
+from array import array
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# Prime, spreads popular ranks over the whole id range instead of the first rows
+_RANK_SCRAMBLE = 2_654_435_761
+
+SEED_URL_PREFIX = "https://bench.example/"
+SEED_CODE_PREFIX = "bm"
+
+
+def short_code(mapping_id: int) -> str:
+    return f"{SEED_CODE_PREFIX}{mapping_id}"
+
+
+class ZipfSampler:
+    """
+    Draws ids 1..n where the k-th most popular id is drawn with probability
+    proportional to 1 / k**s
+    """
+
+    def __init__(self, n: int, s: float):
+        self.n = n
+        self._cdf = array("d", itertools.accumulate(1 / k**s for k in range(1, n + 1)))
+
+    def sample(self, rng: random.Random) -> int:
+        rank = bisect.bisect_left(self._cdf, rng.random() * self._cdf[-1])
+        return (rank * _RANK_SCRAMBLE) % self.n + 1
+
+
+def server_timing_queries(header: str | None) -> int:
+    """
+    Query count reported in the app's Server-Timing header, which unlike
+    engine events also covers statements run directly on asyncpg
+    """
+    match = _QUERIES.search(header or "")
+    return int(match.group(1)) if match else 0
+
+
+async def seed_mappings(engine: AsyncEngine, total: int, batch: int = 1_000_000):
+    """
+    Inserts mappings 1..total with predictable URLs and short codes, see
+    short_code(). Already seeded rows are kept, so reruns are cheap.
+    """
+    stmt = text(
+        """
+        WITH mappings AS (
+            INSERT INTO url_mappings (original_url, url_hash, short_code)
+            SELECT url, sha256(convert_to(url, 'UTF8')), :code_prefix || i
+            FROM (
+                SELECT i, :url_prefix || i AS url
+                FROM generate_series(CAST(:start AS bigint), :stop) AS i
+            ) AS seed
+            ON CONFLICT DO NOTHING
+            RETURNING url_hash, short_code
+        )
+        INSERT INTO url_lookups (url_hash, short_code)
+        SELECT url_hash, short_code FROM mappings
+        ON CONFLICT DO NOTHING
+        """
+    )
+    for start in range(1, total + 1, batch):
+        async with engine.begin() as conn:
+            await conn.execute(
+                stmt,
+                {
+                    "code_prefix": SEED_CODE_PREFIX,
+                    "url_prefix": SEED_URL_PREFIX,
+                    "start": start,
+                    "stop": min(start + batch - 1, total),
+                },
+            )
+
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE url_mappings, url_lookups"))
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    queries: int = 0
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status: int, queries: int) -> None:
+        self.latencies.append(latency)
+        self.queries += queries
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def summary(self, duration: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "statuses": {str(code): n for code, n in sorted(self.statuses.items())},
+            "rps": requests / duration if duration else 0.0,
+            "queries_per_request": self.queries / requests if requests else 0.0,
+            "latency_ms": {
+                "mean": 1000 * sum(latencies) / requests if requests else 0.0,
+                "p50": 1000 * percentile(latencies, 50),
+                "p95": 1000 * percentile(latencies, 95),
+                "p99": 1000 * percentile(latencies, 99),
+                "max": 1000 * latencies[-1] if latencies else 0.0,
+            },
+        }
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not ordered:
+        return 0.0
+    rank = max(int(-(-p * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
@@ -4,5 +4,11 @@ set -e
 echo "Running migrations"
 poetry run alembic upgrade head
 
+# "serve" runs the production server, other commands run as they are
+if [ "$1" = "serve" ]; then
+    shift
+    set -- gunicorn --config docker/gunicorn.conf.py "$@" app.main:app
+fi
+
 echo "Starting application"
 exec "$@"
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings of the production server, `docker/entrypoint.sh serve`.
+
+The app is imported once in the master and forked into the workers, which
+share its listening socket. Engines and cache connections are created in
+each worker after the fork, see app.common.db.Database.
+"""
+
+from app.common.config import get_config
+from app.common.server import worker_count
+
+# Not "config", which gunicorn would take for its own setting
+app_config = get_config()
+
+bind = app_config.SERVER_BIND
+reuse_port = app_config.SERVER_REUSE_PORT
+workers = worker_count(app_config)
+worker_class = "app.common.server.UvicornWorker"
+preload_app = True
+
+graceful_timeout = app_config.SERVER_GRACEFUL_TIMEOUT
+max_requests = app_config.SERVER_MAX_REQUESTS
+# Workers started together are not all replaced at once
+max_requests_jitter = app_config.SERVER_MAX_REQUESTS // 10
+# Heartbeat files in memory, as /tmp can be a disk backed overlay in Docker
+worker_tmp_dir = "/dev/shm"
@@ -0,0 +1,137 @@
+"""
+Backfills the hash partitioned url_mappings tables online.
+
+Copies the url_mappings rows that predate migration 7243f446da48 into
+url_mappings_partitioned and url_lookups in short transactions of
+--batch-size rows, while the application keeps serving. Writes since the
+migration are mirrored by its trigger. Progress is stored in the database, so
+an interrupted backfill resumes where it stopped. Run it between
+
+    alembic upgrade 7243f446da48
+    python -m tools.backfill_url_partitions --batch-size 5000
+    alembic upgrade head
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+logger = logging.getLogger("backfill_url_partitions")
+
+LOCK_NOT_AVAILABLE = "55P03"
+
+# Locks only the batch's rows against deletes and key updates, reads and
+# inserts of other rows go on meanwhile
+BACKFILL_BATCH = text(
+    """
+    WITH batch AS (
+        SELECT id, original_url, url_hash, short_code
+        FROM url_mappings
+        WHERE id > :last_id AND id <= :until_id
+        ORDER BY id
+        LIMIT :batch_size
+        FOR KEY SHARE
+    ), mappings AS (
+        INSERT INTO url_mappings_partitioned (id, original_url, url_hash, short_code)
+        SELECT id, original_url, url_hash, short_code FROM batch
+        ON CONFLICT DO NOTHING
+    ), lookups AS (
+        INSERT INTO url_lookups (url_hash, short_code)
+        SELECT url_hash, short_code FROM batch
+        ON CONFLICT DO NOTHING
+    )
+    UPDATE url_mappings_backfill
+    SET last_id = coalesce((SELECT max(id) FROM batch), until_id)
+    RETURNING last_id
+    """
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+    )
+    parser.add_argument(
+        "--lock-timeout", type=str, default="1s", help="Per batch, as in Postgres"
+    )
+    parser.add_argument(
+        "--database-uri",
+        help="SQLAlchemy async URI, defaults to the app's DATABASE_URI",
+    )
+    return parser.parse_args()
+
+
+async def backfill_batch(
+    conn: AsyncConnection, batch_size: int, lock_timeout: str
+) -> tuple[int, int]:
+    """
+    Copies the next batch and returns the id backfilled up to, and the id to
+    backfill up to
+    """
+    async with conn.begin():
+        await conn.execute(
+            text("SELECT set_config('lock_timeout', :timeout, true)"),
+            {"timeout": lock_timeout},
+        )
+        last_id, until_id = (
+            await conn.execute(
+                text("SELECT last_id, until_id FROM url_mappings_backfill FOR UPDATE")
+            )
+        ).one()
+        if last_id < until_id:
+            params = {"last_id": last_id, "until_id": until_id}
+            last_id = (
+                await conn.execute(BACKFILL_BATCH, {**params, "batch_size": batch_size})
+            ).scalar_one()
+    return last_id, until_id
+
+
+async def backfill_batches(conn: AsyncConnection, args: argparse.Namespace) -> None:
+    last_id, until_id = 0, 1
+    while last_id < until_id:
+        try:
+            last_id, until_id = await backfill_batch(
+                conn, args.batch_size, args.lock_timeout
+            )
+        except DBAPIError as e:
+            # Anything but lock_not_available, which retries the batch
+            if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                raise
+            logger.warning("Lock timeout, retrying the batch")
+            await asyncio.sleep(max(args.pause, 1.0))
+            continue
+
+        logger.info("Backfilled up to id %d of %d", last_id, until_id)
+        await asyncio.sleep(args.pause)
+
+
+async def backfill(args: argparse.Namespace) -> None:
+    if args.database_uri is None:
+        from app.common.config import get_config
+
+        args.database_uri = get_config().ASYNC_DATABASE_URI
+
+    engine = create_async_engine(str(args.database_uri))
+    started = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            await backfill_batches(conn, args)
+    finally:
+        await engine.dispose()
+    logger.info("Backfill done in %.1fs", time.perf_counter() - started)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(backfill(parse_args()))
+
+
+if __name__ == "__main__":
+    main()